@@ -1,12 +1,30 @@
 import streamlit as st
-import PyPDF2
-import json
-import os
 from datetime import datetime
+from contract_analysis import ContractAnalyzer
+from contract_store import get_store, load_saved_contracts, save_analysis
+from extraction_cache import get_cache
+from pdf_extraction import iter_pdf_pages
 
 # ------------------------------
 # Sign In and Sign Up Pages
 # ------------------------------
+@st.fragment
+def auth_section():
+    # Switching between the forms and typing only rerun this section; a successful
+    # sign in reruns the whole app once to show the main page
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Sign In"):
+            st.session_state["auth_mode"] = "login"
+    with col2:
+        if st.button("Sign Up"):
+            st.session_state["auth_mode"] = "signup"
+
+    if st.session_state["auth_mode"] == "login":
+        login()
+    elif st.session_state["auth_mode"] == "signup":
+        signup()
+
 def login():
     st.subheader("Sign In")
     username = st.text_input("Username", key="login_username")
@@ -15,7 +33,7 @@ def login():
         if username and password:
             st.session_state["authenticated"] = True
             st.session_state["username"] = username
-            st.success("Logged in successfully!")
+            st.rerun()
         else:
             st.error("Please enter both username and password")
 
@@ -27,80 +45,131 @@ def signup():
         if new_username and new_password:
             st.session_state["authenticated"] = True
             st.session_state["username"] = new_username
-            st.success("Account created and logged in!")
+            st.rerun()
         else:
             st.error("Please enter both a username and password")
 
-# ------------------------------
-# Extract Text from PDF
-# ------------------------------
-def extract_pdf_text(file):
-    pdf_reader = PyPDF2.PdfReader(file)
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text()
-    return text.strip()
-
 # ------------------------------
 # Analyze Contract and Generate JSON
 # ------------------------------
-def analyze_contract(text):
-    word_count = len(text.split())
-    result = {
-        "word_count": word_count,
-        "summary": text[:300],  # First 300 characters
-        "contract_health": "Healthy" if word_count > 200 else "Unhealthy"
-    }
-    return result
-
-# ------------------------------
-# Save Analysis
-# ------------------------------
-def save_analysis(username, result):
-    os.makedirs("saved_contracts", exist_ok=True)
-    filename = f"saved_contracts/{username}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(filename, "w") as f:
-        json.dump(result, f, indent=4)
-    st.success(f"Contract saved as: {filename}")
+def analyze_uploaded_contract(uploaded_file):
+    progress = st.progress(0.0, text="Reading PDF...")
+    analyzer = ContractAnalyzer()
+    for page_number, page_count, page_text in iter_pdf_pages(uploaded_file):
+        analyzer.add_page(page_text)
+        progress.progress(page_number / page_count, text=f"Page {page_number}/{page_count} · {analyzer.word_count:,} words")
+    progress.empty()
+    return analyzer.result()
 
 # ------------------------------
 # View Saved Contracts
 # ------------------------------
 def view_saved_contracts(username):
     st.subheader("Saved Evaluated Contracts")
-    os.makedirs("saved_contracts", exist_ok=True)
-    files = [f for f in os.listdir("saved_contracts") if f.startswith(username)]
-    if not files:
+    contracts = load_saved_contracts(username)
+    if not contracts:
         st.info("No saved contracts found.")
     else:
-        for file in sorted(files, reverse=True):
-            with open(os.path.join("saved_contracts", file), "r") as f:
-                data = json.load(f)
-                with st.expander(file):
-                    st.json(data)
+        for idx in reversed(range(len(contracts))):
+            with st.expander(f"Contract {idx+1}"):
+                st.json(contracts[idx])
 
 # ------------------------------
 # Admin Panel
 # ------------------------------
 def admin_panel():
     st.title("Admin Dashboard")
-    os.makedirs("saved_contracts", exist_ok=True)
-    all_files = os.listdir("saved_contracts")
-    total_contracts = len(all_files)
-    users = set([f.split("_")[0] for f in all_files])
-    st.metric("Total Contracts Evaluated", total_contracts)
-    st.metric("Total Users", len(users))
+    store = get_store()
+    totals = store.totals()
+    users = store.users()
+    st.metric("Total Contracts Evaluated", totals["evaluations"])
+    st.metric("Total Users", totals["users"])
+
+    st.subheader("Extraction Cache")
+    cache_stats = get_cache().stats()
+    st.metric("Cache Hits", cache_stats["memory_hits"] + cache_stats["disk_hits"])
+    st.metric("Cache Misses", cache_stats["misses"])
 
     st.subheader("Login Records")
     st.write("Logged in as:", st.session_state.get("username"))
     st.write("Logged in at:", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
 
     st.subheader("All Evaluated Contracts")
-    for file in sorted(all_files, reverse=True):
-        with open(os.path.join("saved_contracts", file), "r") as f:
-            data = json.load(f)
-            with st.expander(file):
-                st.json(data)
+    contract_browser(store, users)
+
+# ------------------------------
+# Admin Contract Browser
+# ------------------------------
+@st.fragment
+def contract_browser(store, users):
+    # One page of metadata at a time; a full evaluation is only loaded when its row is selected
+    c1, c2, c3 = st.columns(3)
+    user = c1.selectbox("User", ["All users"] + users, key="browser_user")
+    health = c2.selectbox("Health", ["Any", "Healthy", "Unhealthy"], key="browser_health")
+    page_size = c3.selectbox("Rows per page", [25, 50, 100], key="browser_page_size")
+    username = None if user == "All users" else user
+    health = None if health == "Any" else health
+
+    total = store.count(username, health)
+    pages = max(1, -(-total // page_size))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key="browser_page")
+    rows = store.list_evaluations(username, health, limit=page_size, offset=(page - 1) * page_size)
+    if not rows:
+        st.info("No evaluations match these filters.")
+        return
+
+    selection = st.dataframe(
+        [
+            {
+                "ID": row["id"],
+                "User": row["username"],
+                "Saved At": row["created_at"],
+                "Word Count": row["word_count"],
+                "Health": row["contract_health"]
+            }
+            for row in rows
+        ],
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key="browser_table"
+    )
+    st.caption(f"Showing {len(rows)} of {total} evaluations. Select a row to open it.")
+    if selection.selection.rows:
+        row = rows[selection.selection.rows[0]]
+        st.subheader(f"Evaluation #{row['id']} by {row['username']}")
+        st.json(store.get(row["id"]))
+
+# ------------------------------
+# Evaluate New Contract
+# ------------------------------
+@st.fragment
+def evaluate_section():
+    # Uploading, analyzing, evaluating and saving rerun only this section, not the whole app
+    uploaded_file = st.file_uploader("Upload your Contract (PDF)", type="pdf")
+
+    if uploaded_file:
+        st.success("PDF uploaded successfully.")
+
+        if st.button("Analyze"):
+            st.session_state["analysis_result"] = analyze_uploaded_contract(uploaded_file)
+            st.session_state.pop("evaluated", None)
+            st.success("Analysis complete.")
+
+    if "analysis_result" in st.session_state:
+        st.json(st.session_state["analysis_result"])
+
+        # Buttons are only True for the rerun they trigger, so remember the click in state
+        if st.button("Evaluate"):
+            st.session_state["evaluated"] = True
+
+        if st.session_state.get("evaluated"):
+            health = st.session_state["analysis_result"].get("contract_health", "Unknown")
+            st.markdown(f"### Contract Health: **{health}**")
+
+            if st.button("Save Evaluation"):
+                evaluation_id = save_analysis(st.session_state["username"], st.session_state["analysis_result"])
+                st.success(f"Contract saved as evaluation #{evaluation_id}")
 
 # ------------------------------
 # Main App Flow
@@ -115,26 +184,7 @@ def main():
     option = st.radio("Choose an action", ["Evaluate New Contract", "View Saved Contracts"])
 
     if option == "Evaluate New Contract":
-        uploaded_file = st.file_uploader("Upload your Contract (PDF)", type="pdf")
-
-        if uploaded_file:
-            st.success("PDF uploaded successfully.")
-
-            if st.button("Analyze"):
-                with st.spinner("Analyzing contract..."):
-                    text = extract_pdf_text(uploaded_file)
-                    st.session_state["analysis_result"] = analyze_contract(text)
-                    st.success("Analysis complete.")
-
-        if "analysis_result" in st.session_state:
-            st.json(st.session_state["analysis_result"])
-
-            if st.button("Evaluate"):
-                health = st.session_state["analysis_result"].get("contract_health", "Unknown")
-                st.markdown(f"### Contract Health: **{health}**")
-
-                if st.button("Save Evaluation"):
-                    save_analysis(st.session_state["username"], st.session_state["analysis_result"])
+        evaluate_section()
 
     elif option == "View Saved Contracts":
         view_saved_contracts(st.session_state["username"])
@@ -150,18 +200,7 @@ if "auth_mode" not in st.session_state:
 
 if not st.session_state["authenticated"]:
     st.title("Welcome")
-    col1, col2 = st.columns(2)
-    with col1:
-        if st.button("Sign In"):
-            st.session_state["auth_mode"] = "login"
-    with col2:
-        if st.button("Sign Up"):
-            st.session_state["auth_mode"] = "signup"
-
-    if st.session_state["auth_mode"] == "login":
-        login()
-    elif st.session_state["auth_mode"] == "signup":
-        signup()
+    auth_section()
 else:
     main()
 
@@ -1,10 +1,13 @@
-﻿import streamlit as st
-import json
-import os
+﻿import sqlite3
+import streamlit as st
 from datetime import datetime, timedelta
-import PyPDF2
 from streamlit_extras.add_vertical_space import add_vertical_space
 from streamlit_extras.mention import mention
+from contract_analysis import ContractAnalyzer
+from contract_store import get_store, load_saved_contracts, save_analysis
+from event_log import get_event_log, log_event
+from extraction_cache import get_cache
+from pdf_extraction import iter_pdf_pages
 
 st.set_page_config(page_title="Contract Eval", layout="centered", page_icon="📄")
 st.markdown("""
@@ -36,6 +39,23 @@ st.markdown("""
 # ------------------------------
 # Sign In and Sign Up Pages
 # ------------------------------
+@st.fragment
+def auth_section():
+    # Switching between the forms and typing only rerun this section; a successful
+    # sign in reruns the whole app once to show the main page
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🔐 Sign In"):
+            st.session_state["auth_mode"] = "login"
+    with col2:
+        if st.button("📝 Sign Up"):
+            st.session_state["auth_mode"] = "signup"
+
+    if st.session_state["auth_mode"] == "login":
+        login()
+    elif st.session_state["auth_mode"] == "signup":
+        signup()
+
 def login():
     st.markdown("## 🔐 Sign In")
     username = st.text_input("👤 Username", key="login_username")
@@ -45,7 +65,8 @@ def login():
             st.session_state["authenticated"] = True
             st.session_state["username"] = username
             st.session_state["session_start"] = datetime.now()
-            st.success("✅ Logged in successfully!")
+            log_event(username, "login")
+            st.rerun()
         else:
             st.error("❌ Please enter both username and password")
 
@@ -58,82 +79,129 @@ def signup():
             st.session_state["authenticated"] = True
             st.session_state["username"] = new_username
             st.session_state["session_start"] = datetime.now()
-            st.success("✅ Account created and logged in!")
+            log_event(new_username, "signup")
+            st.rerun()
         else:
             st.error("❌ Please enter both a username and password")
 
-# ------------------------------
-# Extract PDF Text
-# ------------------------------
-def extract_pdf_text(file):
-    reader = PyPDF2.PdfReader(file)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text()
-    return text.strip()
-
 # ------------------------------
 # Analyze Contract
 # ------------------------------
-def analyze_contract(text):
-    word_count = len(text.split())
-    summary = text[:300]
-    health = "Healthy" if word_count > 200 else "Unhealthy"
-    return {
-        "word_count": word_count,
-        "summary": summary,
-        "contract_health": health
-    }
-
-# ------------------------------
-# Save Analysis
-# ------------------------------
-def save_analysis(username, result):
-    os.makedirs("saved_contracts", exist_ok=True)
-    filename = f"saved_contracts/{username}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(filename, "w") as f:
-        json.dump(result, f, indent=4)
-    return filename
-
-# ------------------------------
-# Load Saved Contracts
-# ------------------------------
-def load_saved_contracts(username):
-    os.makedirs("saved_contracts", exist_ok=True)
-    files = [f for f in os.listdir("saved_contracts") if f.startswith(username)]
-    contracts = []
-    for file in sorted(files):
-        with open(os.path.join("saved_contracts", file), "r") as f:
-            contracts.append(json.load(f))
-    return contracts
+def analyze_uploaded_contract(uploaded_file):
+    progress = st.progress(0.0, text="Reading PDF...")
+    analyzer = ContractAnalyzer()
+    for page_number, page_count, page_text in iter_pdf_pages(uploaded_file):
+        analyzer.add_page(page_text)
+        progress.progress(page_number / page_count, text=f"Page {page_number}/{page_count} · {analyzer.word_count:,} words")
+    progress.empty()
+    return analyzer.result()
 
 # ------------------------------
 # Admin Panel
 # ------------------------------
 def admin_panel():
     st.markdown("# 🛠️ Admin Dashboard")
-    files = os.listdir("saved_contracts") if os.path.exists("saved_contracts") else []
-    users = set(f.split("_")[0] for f in files)
-    st.metric("📄 Total Contracts Evaluated", len(files))
-    st.metric("👥 Total Users", len(users))
+    store = get_store()
+    totals = store.totals()
+    users = store.users()
+    st.metric("📄 Total Contracts Evaluated", totals["evaluations"])
+    st.metric("👥 Total Users", totals["users"])
+
+    st.markdown("### ⚡ Extraction Cache")
+    cache_stats = get_cache().stats()
+    st.metric("🎯 Cache Hits", cache_stats["memory_hits"] + cache_stats["disk_hits"])
+    st.metric("🐢 Cache Misses", cache_stats["misses"])
 
     st.markdown("### 🕒 Session Logs")
-    st.write("_These are mock logs. Actual logging will be implemented via API._")
+    try:
+        get_event_log().flush()
+    except sqlite3.Error:
+        # The database is busy (a compaction, for example); the newest events stay buffered
+        st.caption("Recent events are still buffered and will appear once the database is free.")
+    st.metric("🟢 Active Users Today", store.active_user_count(datetime.now().strftime("%Y-%m-%d")))
     st.dataframe([
-        {"User": "user1", "Login Time": "2024-07-05 09:00", "Session Length": "15 min"},
-        {"User": "user2", "Login Time": "2024-07-05 09:20", "Session Length": "23 min"},
-        {"User": "admin", "Login Time": "2024-07-05 10:00", "Session Length": "35 min"}
+        {"User": event["username"], "Time": event["occurred_at"], "Event": event["event"], "Detail": event["detail"] or ""}
+        for event in store.list_events(limit=25)
     ])
 
     st.markdown("### 📂 All Evaluated Contracts")
-    for user in users:
-        with st.expander(f"👤 {user}'s Contracts"):
-            user_contracts = [f for f in files if f.startswith(user)]
-            for idx, filename in enumerate(user_contracts):
-                with open(os.path.join("saved_contracts", filename), "r") as f:
-                    contract = json.load(f)
-                    with st.expander(f"📄 Contract {idx+1}"):
-                        st.json(contract)
+    contract_browser(store, users)
+
+# ------------------------------
+# Admin Contract Browser
+# ------------------------------
+@st.fragment
+def contract_browser(store, users):
+    # One page of metadata at a time; a full evaluation is only loaded when its row is selected
+    c1, c2, c3 = st.columns(3)
+    user = c1.selectbox("👤 User", ["All users"] + users, key="browser_user")
+    health = c2.selectbox("🩺 Health", ["Any", "Healthy", "Unhealthy"], key="browser_health")
+    page_size = c3.selectbox("📄 Rows per page", [25, 50, 100], key="browser_page_size")
+    username = None if user == "All users" else user
+    health = None if health == "Any" else health
+
+    total = store.count(username, health)
+    pages = max(1, -(-total // page_size))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key="browser_page")
+    rows = store.list_evaluations(username, health, limit=page_size, offset=(page - 1) * page_size)
+    if not rows:
+        st.info("No evaluations match these filters.")
+        return
+
+    selection = st.dataframe(
+        [
+            {
+                "ID": row["id"],
+                "User": row["username"],
+                "Saved At": row["created_at"],
+                "Word Count": row["word_count"],
+                "Health": row["contract_health"]
+            }
+            for row in rows
+        ],
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key="browser_table"
+    )
+    st.caption(f"Showing {len(rows)} of {total} evaluations. Select a row to open it.")
+    if selection.selection.rows:
+        row = rows[selection.selection.rows[0]]
+        st.markdown(f"#### 📄 Evaluation #{row['id']} by {row['username']}")
+        st.json(store.get(row["id"]))
+
+# ------------------------------
+# Evaluate New Contract
+# ------------------------------
+@st.fragment
+def evaluate_section():
+    # Uploading, analyzing, evaluating and saving rerun only this section, not the whole app
+    uploaded_file = st.file_uploader("📤 Upload your Contract (PDF)", type="pdf")
+
+    if uploaded_file:
+        st.success("✅ PDF uploaded successfully.")
+
+        if st.button("🔍 Analyze"):
+            st.session_state["analysis_result"] = analyze_uploaded_contract(uploaded_file)
+            st.session_state.pop("evaluated", None)
+            log_event(st.session_state["username"], "analysis", detail=uploaded_file.name)
+            st.success("✅ Analysis complete.")
+
+    if "analysis_result" in st.session_state:
+        st.json(st.session_state["analysis_result"])
+
+        # Buttons are only True for the rerun they trigger, so remember the click in state
+        if st.button("✅ Evaluate Contract"):
+            st.session_state["evaluated"] = True
+
+        if st.session_state.get("evaluated"):
+            result = st.session_state["analysis_result"]
+            st.markdown(f"### 🩺 Contract Health: **{result['contract_health']}**")
+
+            if st.button("💾 Save Evaluation"):
+                evaluation_id = save_analysis(st.session_state["username"], result)
+                log_event(st.session_state["username"], "save", detail=f"#{evaluation_id}")
+                st.success(f"💾 Contract saved as evaluation #{evaluation_id}")
 
 # ------------------------------
 # Main App Flow
@@ -148,26 +216,7 @@ def main():
     option = st.radio("🚀 What would you like to do?", ["Evaluate New Contract", "View Saved Contracts"])
 
     if option == "Evaluate New Contract":
-        uploaded_file = st.file_uploader("📤 Upload your Contract (PDF)", type="pdf")
-
-        if uploaded_file:
-            st.success("✅ PDF uploaded successfully.")
-
-            if st.button("🔍 Analyze"):
-                text = extract_pdf_text(uploaded_file)
-                st.session_state["analysis_result"] = analyze_contract(text)
-                st.success("✅ Analysis complete.")
-
-        if "analysis_result" in st.session_state:
-            st.json(st.session_state["analysis_result"])
-
-            if st.button("✅ Evaluate Contract"):
-                result = st.session_state["analysis_result"]
-                st.markdown(f"### 🩺 Contract Health: **{result['contract_health']}**")
-
-                if st.button("💾 Save Evaluation"):
-                    filename = save_analysis(st.session_state["username"], result)
-                    st.success(f"💾 Contract saved as: `{filename}`")
+        evaluate_section()
 
     elif option == "View Saved Contracts":
         contracts = load_saved_contracts(st.session_state["username"])
@@ -190,18 +239,7 @@ if not st.session_state["authenticated"]:
     st.markdown("# 🎯 Welcome to ContractEval")
     st.write("An intelligent assistant to evaluate and review your contracts.")
     add_vertical_space(1)
-    col1, col2 = st.columns(2)
-    with col1:
-        if st.button("🔐 Sign In"):
-            st.session_state["auth_mode"] = "login"
-    with col2:
-        if st.button("📝 Sign Up"):
-            st.session_state["auth_mode"] = "signup"
-
-    if st.session_state["auth_mode"] == "login":
-        login()
-    elif st.session_state["auth_mode"] == "signup":
-        signup()
+    auth_section()
 else:
     main()
 
@@ -1,9 +1,18 @@
+import html
+import sqlite3
+import uuid
 import streamlit as st
-import json
-import os
 from datetime import datetime, timedelta
-import PyPDF2
-import time
+from analysis_jobs import get_job, submit_analysis_job
+from batch_evaluation import iter_batch_evaluations
+from clause_detection import clause_label
+from contract_diff import compare_results, compare_texts, word_diff
+from contract_store import get_store, load_saved_contracts, save_analyses, save_analysis
+from evaluation_export import EXPORT_CHUNK_ROWS, EXPORT_FORMATS, MIME_TYPES, export_chunk_bytes
+from event_log import get_event_log, log_event
+from extraction_cache import get_cache
+from pdf_extraction import extract_pdf_pages
+from telemetry import get_telemetry, prometheus_text
 
 st.set_page_config(page_title="Contract Eval", layout="wide", page_icon="📄")
 
@@ -52,6 +61,23 @@ st.markdown("""
 # ------------------------------
 # Sign In and Sign Up Pages
 # ------------------------------
+@st.fragment
+def auth_section():
+    # Switching between the forms and typing only rerun this section; a successful
+    # sign in reruns the whole app once to show the main page
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🔐 Sign In"):
+            st.session_state["auth_mode"] = "login"
+    with col2:
+        if st.button("📝 Sign Up"):
+            st.session_state["auth_mode"] = "signup"
+
+    if st.session_state["auth_mode"] == "login":
+        login()
+    elif st.session_state["auth_mode"] == "signup":
+        signup()
+
 def login():
     st.markdown("## 🔐 Sign In")
     username = st.text_input("Username", key="login_username")
@@ -61,9 +87,9 @@ def login():
             st.session_state["authenticated"] = True
             st.session_state["username"] = username
             st.session_state["session_start"] = datetime.now()
-            with st.spinner("Logging in..."):
-                time.sleep(1)
-            st.success("Logged in successfully!")
+            st.session_state["session_id"] = uuid.uuid4().hex
+            log_event(username, "login", st.session_state["session_id"])
+            st.rerun()
         else:
             st.error("Please enter both username and password")
 
@@ -76,82 +102,650 @@ def signup():
             st.session_state["authenticated"] = True
             st.session_state["username"] = new_username
             st.session_state["session_start"] = datetime.now()
-            with st.spinner("Creating your account..."):
-                time.sleep(1)
-            st.success("Account created and logged in!")
+            st.session_state["session_id"] = uuid.uuid4().hex
+            log_event(new_username, "signup", st.session_state["session_id"])
+            st.rerun()
         else:
             st.error("Please enter both a username and password")
 
 # ------------------------------
-# Extract PDF Text
+# Analyze Contract (Background Job)
 # ------------------------------
-def extract_pdf_text(file):
-    reader = PyPDF2.PdfReader(file)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text()
-    return text.strip()
+@st.fragment(run_every=0.5)
+def analysis_job_status():
+    # Only this fragment reruns while the job is in flight; the full app reruns once at the end
+    job = get_job(st.session_state["analysis_job"])
+    if job is None:
+        del st.session_state["analysis_job"]
+        st.warning("The analysis job expired. Please analyze the contract again.")
+        return
+    if job.status == "queued":
+        st.info(f"⏳ {job.name} is queued for analysis...")
+    elif job.status == "running":
+        progress = job.page / job.page_count if job.page_count else 0.0
+        st.progress(progress, text=f"Page {job.page}/{job.page_count} · {job.word_count:,} words")
+    else:
+        del st.session_state["analysis_job"]
+        if job.preflight and job.preflight["verdict"] == "warn":
+            st.session_state["analysis_warnings"] = job.preflight["reasons"]
+        if job.status == "done":
+            st.session_state["analysis_result"] = job.result
+            st.session_state["similar_evaluations"] = get_store().find_similar(job.signature)
+            st.session_state["page_fingerprints"] = job.fingerprints
+            if job.revision is not None:
+                st.session_state["revision"] = {**job.revision, "reused_pages": job.reused_pages}
+            log_event(st.session_state["username"], "analysis", st.session_state.get("session_id"), detail=job.name)
+        elif job.status == "rejected":
+            st.session_state["analysis_error"] = f"{job.name} was rejected before extraction: {job.error}"
+        else:
+            st.session_state["analysis_error"] = f"Analysis failed: {job.error}"
+        st.rerun()
 
 # ------------------------------
-# Analyze Contract
+# Operations Telemetry
 # ------------------------------
-def analyze_contract(text):
-    word_count = len(text.split())
-    summary = text[:300]
-    return {
-        "word_count": word_count,
-        "summary": summary
-    }
+@st.fragment
+def operations_section():
+    telemetry = get_telemetry()
+    try:
+        telemetry.flush()
+    except sqlite3.Error:
+        # The database is busy; the newest spans stay buffered for the background flusher
+        st.caption("Recent activity is still buffered and will appear once the database is free.")
+    stages = telemetry.stage_summary()
+    if not stages:
+        st.info("No pipeline activity recorded yet.")
+        return
+    st.dataframe([
+        {
+            "Stage": row["stage"],
+            "Count": row["count"],
+            "p50 (ms)": round(row["p50_ms"], 1),
+            "p95 (ms)": round(row["p95_ms"], 1),
+            "p99 (ms)": round(row["p99_ms"], 1)
+        }
+        for row in stages
+    ], hide_index=True)
+
+    slowest = telemetry.slowest_documents()
+    if slowest:
+        st.markdown("**🐌 Slowest Documents**")
+        st.dataframe([
+            {
+                "Document": row["document"],
+                "Pages": row["pages"],
+                "Seconds": round(row["duration_ms"] / 1000, 2),
+                "Analyzed At": datetime.fromtimestamp(row["started_at"]).strftime("%Y-%m-%d %H:%M:%S")
+            }
+            for row in slowest
+        ], hide_index=True)
+
+    throughput = telemetry.throughput()
+    if throughput:
+        st.markdown("**🚀 Documents Analyzed per 5 Minutes**")
+        st.line_chart(
+            {datetime.fromtimestamp(row["bucket"]): row["documents"] for row in throughput},
+            x_label="Time", y_label="Documents"
+        )
+    if telemetry.dropped:
+        st.warning(f"{telemetry.dropped:,} spans were dropped because the telemetry buffer was full.")
+    st.download_button("⬇️ Prometheus Metrics", prometheus_text(telemetry), file_name="contract_metrics.prom", mime="text/plain")
 
 # ------------------------------
-# Save Analysis
+# Admin Panel
 # ------------------------------
-def save_analysis(username, result):
-    os.makedirs("saved_contracts", exist_ok=True)
-    filename = f"saved_contracts/{username}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-    with open(filename, "w") as f:
-        json.dump(result, f, indent=4)
-    return filename
+def admin_panel():
+    st.markdown("# 🛠️ Admin Dashboard")
+    store = get_store()
+    totals = store.totals()
+    users = store.users()
+    today = store.daily_rollup(datetime.now().strftime("%Y-%m-%d"))
+    c1, c2, c3 = st.columns(3)
+    c1.metric("📄 Total Contracts Evaluated", totals["evaluations"])
+    c2.metric("👥 Total Users", totals["users"])
+    c3.metric("📅 Saved Today", today["evaluations"])
+
+    st.markdown("### 📊 Trends")
+    analytics_section(store)
+
+    st.markdown("### ⚡ Extraction Cache")
+    cache_stats = get_cache().stats()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("🧠 Memory Hits", cache_stats["memory_hits"])
+    c2.metric("💽 Disk Hits", cache_stats["disk_hits"])
+    c3.metric("🐢 Misses", cache_stats["misses"])
+    c4.metric("🎯 Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+
+    st.markdown("### 🗜️ Stored Contract Text")
+    storage = store.text_storage()
+    c1, c2, c3 = st.columns(3)
+    c1.metric("📝 Raw Text", f"{storage['raw_bytes'] / 1e6:.1f} MB")
+    c2.metric("💾 On Disk", f"{storage['compressed_bytes'] / 1e6:.1f} MB")
+    c3.metric("📉 Compression", f"{storage['ratio']:.1f}×" if storage["ratio"] else "—")
+
+    st.markdown("### 📈 Operations (last 24h)")
+    operations_section()
+
+    st.markdown("### 🕒 Session Logs")
+    session_log_section(store)
+
+    st.markdown("### 🧬 Near-Duplicate Contracts")
+    duplicate_clusters_section(store)
+
+    st.markdown("### 🔎 Search All Contracts")
+    search_section(store)
+
+    st.markdown("### 📂 All Evaluated Contracts")
+    contract_browser(store, users)
+
+    st.markdown("### 🆚 Compare Evaluations")
+    compare_section(store)
+
+    st.markdown("### 📤 Export Evaluations")
+    export_section(store, users)
 
 # ------------------------------
-# Load Saved Contracts
+# Trend Dashboard
 # ------------------------------
-def load_saved_contracts(username):
-    os.makedirs("saved_contracts", exist_ok=True)
-    files = [f for f in os.listdir("saved_contracts") if f.startswith(username)]
-    contracts = []
-    for file in sorted(files):
-        with open(os.path.join("saved_contracts", file), "r") as f:
-            contracts.append(json.load(f))
-    return contracts
+@st.fragment
+def analytics_section(store):
+    # Every chart reads the rollup tables kept up to date at save time, never raw evaluations
+    window = st.radio("Window", ["Last 90 days", "Last 72 hours"], horizontal=True, key="analytics_window")
+    granularity, periods = ("day", 90) if window == "Last 90 days" else ("hour", 72)
+    series = store.activity_series(granularity, periods)
+    labels = [row["period"] if granularity == "day" else row["period"][5:] + ":00" for row in series]
+
+    c1, c2 = st.columns(2)
+    c1.markdown("**Evaluations saved**")
+    c1.bar_chart(
+        {
+            "Period": labels,
+            "Healthy": [row["healthy"] for row in series],
+            "Unhealthy": [row["evaluations"] - row["healthy"] for row in series]
+        },
+        x="Period", y=["Healthy", "Unhealthy"], color=["#2e7d32", "#c62828"]
+    )
+    c2.markdown("**Healthy share**")
+    c2.line_chart(
+        {
+            "Period": labels,
+            "Healthy %": [round(100 * row["healthy"] / row["evaluations"], 1) if row["evaluations"] else None for row in series]
+        },
+        x="Period", y="Healthy %"
+    )
+
+    c1, c2 = st.columns(2)
+    c1.markdown("**Mean processing time (s)**")
+    c1.line_chart(
+        {
+            "Period": labels,
+            "Seconds": [round(row["processing_ms"] / row["processed"] / 1000, 2) if row["processed"] else None for row in series]
+        },
+        x="Period", y="Seconds"
+    )
+    c2.markdown("**Word count distribution (all time)**")
+    distribution = store.word_count_distribution()
+    c2.bar_chart(
+        {
+            "Words": [f"{row['bucket_words']:,}+" for row in distribution],
+            "Evaluations": [row["evaluations"] for row in distribution]
+        },
+        x="Words", y="Evaluations", sort=False
+    )
+
+    st.markdown("**Evaluations per user (last 30 days)**")
+    by_user = store.user_activity_series(days=30)
+    names = sorted({name for counts in by_user.values() for name in counts}, key=lambda name: (name == "Other", name))
+    if names:
+        days = sorted(by_user)
+        st.bar_chart({"Day": days, **{name: [by_user[day].get(name, 0) for day in days] for name in names}}, x="Day", y=names)
+    else:
+        st.info("No evaluations saved in the last 30 days.")
 
 # ------------------------------
-# Admin Panel
+# Session and Activity Log
 # ------------------------------
-def admin_panel():
-    st.markdown("# 🛠️ Admin Dashboard")
-    files = os.listdir("saved_contracts") if os.path.exists("saved_contracts") else []
-    users = set(f.split("_")[0] for f in files)
+@st.fragment
+def session_log_section(store):
+    try:
+        get_event_log().flush()
+    except sqlite3.Error:
+        # The database is busy (a compaction, for example); the newest events stay buffered
+        st.caption("Recent events are still buffered and will appear once the database is free.")
+    today = datetime.now()
+    c1, c2, c3 = st.columns(3)
+    c1.metric("🟢 Active Today", store.active_user_count(today.strftime("%Y-%m-%d")))
+    c2.metric("📆 Active (7 days)", store.active_user_count((today - timedelta(days=6)).strftime("%Y-%m-%d")))
+    c3.metric("🧾 Events Logged", store.count_events())
+
     c1, c2 = st.columns(2)
-    c1.metric("📄 Total Contracts Evaluated", len(files))
-    c2.metric("👥 Total Users", len(users))
+    activity = store.active_users(days=30)
+    if activity:
+        c1.markdown("**👥 Active Users per Day**")
+        c1.bar_chart({row["day"]: row["users"] for row in activity}, x_label="Day", y_label="Users")
+    sessions = store.session_length_distribution()
+    if sessions:
+        c2.markdown("**⏱️ Session Length**")
+        c2.bar_chart(
+            {row["bucket_minutes"]: row["sessions"] for row in sessions},
+            x_label="Minutes (bucket start)", y_label="Sessions"
+        )
 
-    st.markdown("### 🕒 Session Logs (Mock Data)")
+    c1, c2 = st.columns(2)
+    user = c1.selectbox("👤 User", ["All users"] + store.active_usernames(), key="events_user")
+    page_size = c2.selectbox("📄 Rows per page", [25, 50, 100], key="events_page_size")
+    username = None if user == "All users" else user
+    total = store.count_events(username)
+    pages = max(1, -(-total // page_size))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key="events_page")
+    events = store.list_events(username, limit=page_size, offset=(page - 1) * page_size)
+    if not events:
+        st.info("No events recorded yet.")
+        return
     st.dataframe([
-        {"User": "user1", "Login Time": "2024-07-05 09:00", "Session Length": "15 min"},
-        {"User": "user2", "Login Time": "2024-07-05 09:20", "Session Length": "23 min"},
-        {"User": "admin", "Login Time": "2024-07-05 10:00", "Session Length": "35 min"}
-    ])
+        {
+            "Time": event["occurred_at"],
+            "User": event["username"],
+            "Event": event["event"],
+            "Session Length": f"{event['duration_seconds'] / 60:.1f} min" if event["duration_seconds"] is not None else "",
+            "Detail": event["detail"] or ""
+        }
+        for event in events
+    ], hide_index=True)
 
-    st.markdown("### 📂 All Evaluated Contracts")
-    for user in users:
-        with st.expander(f"👤 {user}'s Contracts"):
-            user_contracts = [f for f in files if f.startswith(user)]
-            for idx, filename in enumerate(user_contracts):
-                with open(os.path.join("saved_contracts", filename), "r") as f:
-                    contract = json.load(f)
-                    with st.expander(f"📄 Contract {idx+1}"):
-                        st.json(contract)
+# ------------------------------
+# Near-Duplicate Clusters
+# ------------------------------
+@st.fragment
+def duplicate_clusters_section(store):
+    if not st.toggle("Find duplicate clusters across the store", key="show_duplicate_clusters"):
+        return
+    clusters = store.duplicate_clusters()
+    if not clusters:
+        st.info("No near-duplicate contracts found.")
+        return
+    st.dataframe([
+        {
+            "Cluster": number,
+            "Contracts": len(cluster["ids"]),
+            "Evaluation IDs": ", ".join(f"#{evaluation_id}" for evaluation_id in cluster["ids"][:20]) + (" …" if len(cluster["ids"]) > 20 else ""),
+            "Users": ", ".join(cluster["users"])
+        }
+        for number, cluster in enumerate(clusters, start=1)
+    ], hide_index=True)
+
+# ------------------------------
+# Contract Search
+# ------------------------------
+@st.fragment
+def search_section(store, username=None):
+    query = st.text_input("Search contracts", placeholder='e.g. indemnif* "governing law" Acme', key="search_query")
+    if not query:
+        return
+    results = store.search(query, username)
+    if not results:
+        st.info("No contracts match your search.")
+        return
+    for result in results:
+        owner = "" if username else f" · 👤 {result['username']}"
+        st.markdown(f"**📄 Evaluation #{result['id']}**{owner} · {result['created_at']} · {result['contract_health']}")
+        st.markdown(f"> {result['snippet']}")
+        if st.toggle("Open", key=f"search_open_{result['id']}"):
+            st.json(store.get(result["id"]))
+
+# ------------------------------
+# Admin Contract Browser
+# ------------------------------
+@st.fragment
+def contract_browser(store, users):
+    c1, c2, c3 = st.columns(3)
+    user = c1.selectbox("👤 User", ["All users"] + users, key="browser_user")
+    health = c2.selectbox("🩺 Health", ["Any", "Healthy", "Unhealthy"], key="browser_health")
+    page_size = c3.selectbox("📄 Rows per page", [25, 50, 100], key="browser_page_size")
+    username = None if user == "All users" else user
+    health = None if health == "Any" else health
+
+    total = store.count(username, health)
+    pages = max(1, -(-total // page_size))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key="browser_page")
+    rows = store.list_evaluations(username, health, limit=page_size, offset=(page - 1) * page_size)
+    if not rows:
+        st.info("No evaluations match these filters.")
+        return
+
+    selection = st.dataframe(
+        [
+            {
+                "ID": row["id"],
+                "User": row["username"],
+                "Saved At": row["created_at"],
+                "Word Count": row["word_count"],
+                "Health": row["contract_health"]
+            }
+            for row in rows
+        ],
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key="browser_table"
+    )
+    st.caption(f"Showing {len(rows)} of {total} evaluations. Select a row to open it.")
+    if selection.selection.rows:
+        row = rows[selection.selection.rows[0]]
+        st.markdown(f"#### 📄 Evaluation #{row['id']} by {row['username']}")
+        st.json(store.get(row["id"]))
+
+# ------------------------------
+# Bulk Export
+# ------------------------------
+@st.fragment
+def export_section(store, users):
+    first_day, last_day = store.date_range()
+    if first_day is None:
+        st.info("No evaluations to export yet.")
+        return
+    c1, c2, c3 = st.columns(3)
+    user = c1.selectbox("👤 User", ["All users"] + users, key="export_user")
+    days = c2.date_input(
+        "📅 Saved between",
+        value=(datetime.strptime(first_day, "%Y-%m-%d"), datetime.strptime(last_day, "%Y-%m-%d")),
+        key="export_days"
+    )
+    export_format = c3.selectbox("🗂️ Format", EXPORT_FORMATS, format_func=str.upper, key="export_format")
+    if "parquet" not in EXPORT_FORMATS:
+        st.caption("Install pyarrow to export Parquet.")
+    if len(days) != 2:
+        st.info("Pick a start and an end day.")
+        return
+    username = None if user == "All users" else user
+    since, until = (day.strftime("%Y-%m-%d") for day in days)
+
+    # Only id boundaries are computed here; each file is generated when its button is clicked
+    chunks = store.export_chunks(username, since, until, EXPORT_CHUNK_ROWS)
+    if not chunks:
+        st.info("No evaluations match these filters.")
+        return
+    st.caption(f"{sum(rows for _, _, rows in chunks):,} evaluations in {len(chunks)} file(s) of up to {EXPORT_CHUNK_ROWS:,}.")
+    for part, (first_id, last_id, rows) in enumerate(chunks, start=1):
+        st.download_button(
+            f"⬇️ Part {part}: evaluations #{first_id}–#{last_id} ({rows:,})",
+            data=lambda first_id=first_id, last_id=last_id: export_chunk_bytes(export_format, username, since, until, first_id, last_id),
+            file_name=f"evaluations_{user.replace(' ', '_').lower()}_{since}_{until}_part{part}.{export_format}",
+            mime=MIME_TYPES[export_format],
+            on_click="ignore",
+            key=f"export_part_{part}"
+        )
+
+# ------------------------------
+# Compare Two Evaluations
+# ------------------------------
+COMPARE_CHOICES = 200
+CHANGES_PER_PAGE = 10
+
+def highlight_changes(segments, side):
+    # side is "old" or "new"; each side shows the shared words plus its own removals or additions
+    own = "delete" if side == "old" else "insert"
+    style = "background:#fdd; text-decoration:line-through" if side == "old" else "background:#dfd"
+    return " ".join(
+        f"<span style='{style}'>{html.escape(text)}</span>" if tag == own else html.escape(text)
+        for tag, text in segments
+        if tag in ("equal", own)
+    )
+
+def compare_picker(column, store, username, label, key):
+    # Lists the COMPARE_CHOICES newest evaluations saved up to the chosen day, so older ones
+    # are reached by moving the day back rather than by listing everything
+    until = column.date_input(f"{label} saved by", value=None, key=f"{key}_until", help="Leave empty to list the newest")
+    rows = store.list_evaluations(username, limit=COMPARE_CHOICES, until=until.isoformat() if until else None)
+    labels = {row["id"]: f"#{row['id']} · {row['created_at']} · {row['username']} · {row['contract_health']}" for row in rows}
+    return column.selectbox(label, list(labels), index=None, format_func=labels.get, placeholder="Choose an evaluation", key=key)
+
+@st.fragment
+def compare_section(store, username=None):
+    # username limits the choices to one user's evaluations; admins compare across everyone.
+    # Nothing is selected up front, so no text is decompressed or diffed until both sides are picked.
+    if store.count(username) < 2:
+        st.info("Save at least two evaluations to compare them.")
+        return
+    key = username or "all"
+    c1, c2 = st.columns(2)
+    old_id = compare_picker(c1, store, username, "Earlier version", f"compare_old_{key}")
+    new_id = compare_picker(c2, store, username, "Later version", f"compare_new_{key}")
+    if old_id is None or new_id is None:
+        st.caption("Pick an evaluation on each side to compare them.")
+        return
+    if old_id == new_id:
+        st.info("Pick two different evaluations.")
+        return
+
+    # The comparison is kept for paging; texts are only decompressed when the pair changes
+    comparison = st.session_state.get(f"comparison_{key}")
+    if comparison is None or comparison["pair"] != (old_id, new_id):
+        comparison = {
+            "pair": (old_id, new_id),
+            "deltas": compare_results(store.get(old_id), store.get(new_id)),
+            **compare_texts(store.text(old_id) or "", store.text(new_id) or "")
+        }
+        st.session_state[f"comparison_{key}"] = comparison
+    deltas = comparison["deltas"]
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("📝 Word Count Change", f"{deltas['word_count_delta']:+,}")
+    c2.metric("🩺 Health", deltas["health_after"] or "—", None if deltas["health_after"] == deltas["health_before"] else f"was {deltas['health_before']}", delta_color="off")
+    c3.metric("📋 Clause Score Change", f"{deltas['clause_score_delta']:+.0%}")
+    c4.metric("✏️ Paragraphs Changed", comparison["changed_blocks"] + comparison["added_blocks"] + comparison["removed_blocks"])
+    if deltas["clauses_gained"] or deltas["clauses_lost"]:
+        st.caption(
+            f"Clauses gained: {', '.join(clause_label(name) for name in deltas['clauses_gained']) or 'none'} · "
+            f"Clauses lost: {', '.join(clause_label(name) for name in deltas['clauses_lost']) or 'none'}"
+        )
+
+    hunks = comparison["hunks"]
+    if not hunks:
+        st.success("The stored texts are identical.")
+        return
+    pages = max(1, -(-len(hunks) // CHANGES_PER_PAGE))
+    page = st.number_input(f"Changes page (of {pages})", min_value=1, max_value=pages, value=1, key=f"compare_page_{key}")
+    titles = {"replace": "✏️ Changed", "insert": "➕ Added", "delete": "➖ Removed"}
+    for hunk in hunks[(page - 1) * CHANGES_PER_PAGE:page * CHANGES_PER_PAGE]:
+        clauses = ", ".join(clause_label(name) for name in hunk["clauses"])
+        where = f"paragraph {hunk['old_start'] + 1} of the earlier version" if hunk["tag"] == "delete" else f"paragraph {hunk['new_start'] + 1}"
+        st.markdown(f"**{titles[hunk['tag']]}** · {where}" + (f" · {clauses}" if clauses else ""))
+        old_text, new_text = " ".join(hunk["old_blocks"]), " ".join(hunk["new_blocks"])
+        # Word-level highlighting is worked out only for the changes on this page
+        segments = word_diff(old_text, new_text) if hunk["tag"] == "replace" else None
+        c1, c2 = st.columns(2)
+        if segments is not None:
+            c1.markdown(highlight_changes(segments, "old"), unsafe_allow_html=True)
+            c2.markdown(highlight_changes(segments, "new"), unsafe_allow_html=True)
+        else:
+            c1.markdown(highlight_changes([("delete", old_text)], "old") if old_text else "—", unsafe_allow_html=True)
+            c2.markdown(highlight_changes([("insert", new_text)], "new") if new_text else "—", unsafe_allow_html=True)
+
+# ------------------------------
+# Batch Evaluation
+# ------------------------------
+def batch_row(evaluation):
+    result = evaluation["result"] or {}
+    return {
+        "File": evaluation["file"],
+        "Pages": evaluation["pages"],
+        "Word Count": result.get("word_count"),
+        "Health": result.get("contract_health", "Failed"),
+        "Seconds": round(evaluation["seconds"], 2),
+        "Error": evaluation.get("error", "")
+    }
+
+@st.fragment
+def batch_evaluation_section():
+    uploaded_files = st.file_uploader("Upload Contracts (PDF)", type="pdf", accept_multiple_files=True, key="batch_uploader")
+    table = st.empty()
+
+    if uploaded_files and st.button(f"🔍 Analyze {len(uploaded_files)} Contracts"):
+        progress = st.progress(0.0, text="Queued...")
+        evaluations = []
+        # Text is kept with each result, so Save stores what was analyzed even if the uploads change
+        for evaluation in iter_batch_evaluations(uploaded_files, with_text=True):
+            evaluations.append(evaluation)
+            table.dataframe([batch_row(e) for e in evaluations])
+            progress.progress(len(evaluations) / len(uploaded_files), text=f"{len(evaluations)}/{len(uploaded_files)} contracts analyzed")
+        progress.empty()
+        st.session_state["batch_evaluations"] = evaluations
+
+    if "batch_evaluations" in st.session_state:
+        evaluations = st.session_state["batch_evaluations"]
+        table.dataframe([batch_row(e) for e in evaluations])
+        succeeded = [e for e in evaluations if e["result"]]
+        if succeeded and st.button(f"💾 Save {len(succeeded)} Evaluations"):
+            texts = [e["text"] for e in succeeded]
+            evaluation_ids = save_analyses(st.session_state["username"], [e["result"] for e in succeeded], texts)
+            for evaluation_id in evaluation_ids:
+                log_event(st.session_state["username"], "save", st.session_state.get("session_id"), detail=f"#{evaluation_id}")
+            st.success(f"Saved {len(evaluation_ids)} contracts.")
+            del st.session_state["batch_evaluations"]
+
+# ------------------------------
+# Evaluate a Single Contract
+# ------------------------------
+@st.fragment
+def evaluate_section():
+    # Uploading and analyzing rerun only this section, not the whole app
+    uploaded_file = st.file_uploader("Upload a Contract (PDF)", type="pdf", key="contract_upload")
+
+    if uploaded_file:
+        st.success("PDF uploaded successfully.")
+
+        if st.button("🔍 Analyze"):
+            st.session_state["analysis_job"] = submit_analysis_job(uploaded_file, st.session_state["username"])
+            for key in ("analysis_result", "analysis_warnings", "evaluated", "saved_evaluation_id", "similar_evaluations",
+                        "page_fingerprints", "revision"):
+                st.session_state.pop(key, None)
+
+    if "analysis_job" in st.session_state:
+        analysis_job_status()
+
+    if "analysis_error" in st.session_state:
+        st.error(st.session_state.pop("analysis_error"))
+
+    for warning in st.session_state.get("analysis_warnings", []):
+        st.warning(f"⚠️ {warning}")
+
+    if "analysis_result" in st.session_state:
+        results_card()
+
+def revision_summary(revision):
+    changes = []
+    for kind, suffix in (("changed", "changed"), ("added", "added"), ("removed", "of the earlier version removed")):
+        if revision[kind]:
+            noun = "page" if len(revision[kind]) == 1 else "pages"
+            changes.append(f"{noun} {revision[kind + '_ranges']} {suffix}")
+    st.info(
+        f"📝 Revision of your contract #{revision['id']} saved on {revision['created_at'][:10]}: "
+        + ("; ".join(changes) if changes else "no pages changed")
+        + f". {revision['reused_pages']} of {revision['page_count']} pages were reused without re-extracting."
+    )
+    with st.expander("📄 Page Changes"):
+        st.dataframe([
+            {"Change": "Changed", "Pages": revision["changed_ranges"] or "—", "Count": len(revision["changed"])},
+            {"Change": "Added", "Pages": revision["added_ranges"] or "—", "Count": len(revision["added"])},
+            {"Change": "Removed", "Pages": revision["removed_ranges"] or "—", "Count": len(revision["removed"])},
+            {"Change": "Unchanged", "Pages": "", "Count": revision["unchanged"]}
+        ], hide_index=True)
+
+@st.fragment
+def results_card():
+    # Evaluate and Save are separate reruns, so each step is recorded in session state
+    # instead of nesting one button inside the other
+    st.subheader("🧾 Analysis Summary")
+    result = st.session_state["analysis_result"]
+    st.write(f"**Word Count:** {result['word_count']}")
+    st.write(f"**Summary Preview:** {result['summary']}...")
+
+    for match in st.session_state.get("similar_evaluations", [])[:1]:
+        st.info(
+            f"🔁 {match['similarity']:.0%} similar to contract #{match['id']} saved by "
+            f"{match['username']} on {match['created_at'][:10]} ({match['contract_health']})"
+        )
+        if st.button("♻️ Reuse its evaluation", key=f"reuse_{match['id']}"):
+            st.session_state["analysis_result"] = result = get_store().get(match["id"])
+            st.session_state["similar_evaluations"] = []
+            st.session_state["evaluated"] = True
+
+    revision = st.session_state.get("revision")
+    if revision:
+        revision_summary(revision)
+
+    if st.button("✅ Evaluate Contract"):
+        st.session_state["evaluated"] = True
+    if not st.session_state.get("evaluated"):
+        return
+
+    health = result["contract_health"]
+    icon = "✅" if health == "Healthy" else "❌"
+    color = "green" if health == "Healthy" else "red"
+    missing = ", ".join(clause_label(name) for name in result.get("clauses_missing", []))
+    message = (
+        "The contract appears to be comprehensive. No immediate red flags detected."
+        if health == "Healthy"
+        else "The contract may lack important clauses. Review is recommended."
+    )
+    if missing:
+        message += f" Missing: {missing}."
+
+    st.markdown(
+        f"""
+        <div style='
+            border: 1px solid {color};
+            background-color: #fefefe;
+            padding: 1rem;
+            border-radius: 10px;
+            margin-top: 1rem;
+            box-shadow: 0 2px 6px rgba(0,0,0,0.05);
+        '>
+            <h4 style='color:{color}; margin-bottom: 0.5rem;'>{icon} Contract Health: <strong>{health}</strong> ({result.get("clause_score", 0):.0%} of key clauses)</h4>
+            <p style='color:#444;'>{message}</p>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+    if "saved_evaluation_id" not in st.session_state and st.button("💾 Save Evaluation"):
+        uploaded_file = st.session_state.get("contract_upload")
+        # Page texts come back from the extraction cache and are stored with their fingerprints
+        # so the next revision of this contract only extracts the pages that changed
+        page_texts = extract_pdf_pages(uploaded_file) if uploaded_file else []
+        fingerprints = st.session_state.get("page_fingerprints") or []
+        pages = list(zip(fingerprints, page_texts)) if len(fingerprints) == len(page_texts) else None
+        text = "".join(page_texts).strip() if uploaded_file else None
+        evaluation_id = save_analysis(st.session_state["username"], result, text, pages=pages)
+        log_event(st.session_state["username"], "save", st.session_state.get("session_id"), detail=f"#{evaluation_id}")
+        st.session_state["saved_evaluation_id"] = evaluation_id
+    if "saved_evaluation_id" in st.session_state:
+        st.success(f"Contract saved as evaluation #{st.session_state['saved_evaluation_id']}")
+
+# ------------------------------
+# Saved Contracts
+# ------------------------------
+SAVED_PAGE_SIZE = 20
+
+@st.fragment
+def saved_contracts_section():
+    # Paged, so rendering cost stays flat however many evaluations the user has saved
+    store = get_store()
+    username = st.session_state["username"]
+    search_section(store, username)
+    with st.expander("🆚 Compare Two Versions"):
+        compare_section(store, username)
+    total = store.count(username)
+    if not total:
+        st.info("No saved contracts found.")
+        return
+    pages = max(1, -(-total // SAVED_PAGE_SIZE))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key="saved_page")
+    offset = (page - 1) * SAVED_PAGE_SIZE
+    for idx, data in enumerate(load_saved_contracts(username, SAVED_PAGE_SIZE, offset), start=offset):
+        with st.expander(f"📄 Contract {idx+1}"):
+            st.json(data)
 
 # ------------------------------
 # Main App Flow
@@ -168,8 +762,11 @@ def main():
     """, unsafe_allow_html=True)
 
     if st.button("🚪 Logout", key="logout_button"):
+        session_start = st.session_state.get("session_start")
+        duration = (datetime.now() - session_start).total_seconds() if session_start else None
+        log_event(st.session_state["username"], "logout", st.session_state.get("session_id"), duration)
         st.session_state.clear()
-        st.experimental_rerun()
+        st.rerun()
     st.markdown("# 🤖 Contract Evaluation App")
 
     if st.session_state["username"] == "admin":
@@ -178,65 +775,14 @@ def main():
 
     option = st.radio("Choose an action:", ["📤 Evaluate New Contract", "📁 View Saved Contracts"], horizontal=True)
 
-    if option == "📤 Evaluate New Contract":
-        uploaded_file = st.file_uploader("Upload a Contract (PDF)", type="pdf")
-
-        if uploaded_file:
-            st.success("PDF uploaded successfully.")
-
-            if st.button("🔍 Analyze"):
-                with st.spinner("Analyzing contract..."):
-                    time.sleep(1.5)
-                    text = extract_pdf_text(uploaded_file)
-                    st.session_state["analysis_result"] = analyze_contract(text)
-                st.success("Analysis complete.")
-
-        if "analysis_result" in st.session_state:
-            st.subheader("🧾 Analysis Summary")
-            result = st.session_state["analysis_result"]
-            st.write(f"**Word Count:** {result['word_count']}")
-            st.write(f"**Summary Preview:** {result['summary']}...")
-
-            if st.button("✅ Evaluate Contract"):
-                word_count = result["word_count"]
-                health = "Healthy" if word_count > 200 else "Unhealthy"
-                result["contract_health"] = health
-                icon = "✅" if health == "Healthy" else "❌"
-                color = "green" if health == "Healthy" else "red"
-                message = (
-                    "The contract appears to be comprehensive. No immediate red flags detected."
-                    if health == "Healthy"
-                    else "The contract may lack important clauses. Review is recommended."
-                )
-
-                st.markdown(
-                    f"""
-                    <div style='
-                        border: 1px solid {color};
-                        background-color: #fefefe;
-                        padding: 1rem;
-                        border-radius: 10px;
-                        margin-top: 1rem;
-                        box-shadow: 0 2px 6px rgba(0,0,0,0.05);
-                    '>
-                        <h4 style='color:{color}; margin-bottom: 0.5rem;'>{icon} Contract Health: <strong>{health}</strong></h4>
-                        <p style='color:#444;'>{message}</p>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-
-                if st.button("💾 Save Evaluation"):
-                    filename = save_analysis(st.session_state["username"], result)
-                    st.success(f"Contract saved as: `{filename}`")
+    if option == "📤 Evaluate New Contract" and st.toggle("📚 Batch mode (multiple PDFs)"):
+        batch_evaluation_section()
+
+    elif option == "📤 Evaluate New Contract":
+        evaluate_section()
 
     elif option == "📁 View Saved Contracts":
-        contracts = load_saved_contracts(st.session_state["username"])
-        if not contracts:
-            st.info("No saved contracts found.")
-        for idx, data in enumerate(contracts):
-            with st.expander(f"📄 Contract {idx+1}"):
-                st.json(data)
+        saved_contracts_section()
 
 # ------------------------------
 # App Entry Point
@@ -255,17 +801,6 @@ if not st.session_state["authenticated"]:
         <p style='font-size:1.1rem;'>An intelligent assistant to evaluate and review your contracts with ease.</p>
         <hr style='margin-top: 1rem; margin-bottom: 2rem; border: none; height: 2px; background: #e50914;'>
     """, unsafe_allow_html=True)
-    col1, col2 = st.columns(2)
-    with col1:
-        if st.button("🔐 Sign In"):
-            st.session_state["auth_mode"] = "login"
-    with col2:
-        if st.button("📝 Sign Up"):
-            st.session_state["auth_mode"] = "signup"
-
-    if st.session_state["auth_mode"] == "login":
-        login()
-    elif st.session_state["auth_mode"] == "signup":
-        signup()
+    auth_section()
 else:
     main()
@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contract_analysis import ContractAnalyzer
+from contract_store import get_store
+from near_duplicates import MinHasher
+from pdf_extraction import (
+    cached_document, compare_page_fingerprints, document_digest, iter_pdf_pages, pdf_page_fingerprints,
+    read_pdf_bytes, remember_document_info, remove_spooled, replay_pages, spool_pdf
+)
+from pdf_preflight import preflight_pdf
+from telemetry import get_telemetry
+
+# Worker threads only coordinate; large documents still fan out to the extraction process pool
+JOB_WORKERS = int(os.environ.get("CONTRACT_JOB_WORKERS", "4"))
+# Finished jobs are kept this long so a session can pick up its result after reruns
+JOB_TTL_SECONDS = int(os.environ.get("CONTRACT_JOB_TTL_SECONDS", "3600"))
+
+# ------------------------------
+# Analysis Job
+# ------------------------------
+class AnalysisJob:
+    def __init__(self, name, source, spooled=False, username=None):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.username = username  # earlier versions are only looked up among this user's evaluations
+        self.status = "queued"  # queued -> running -> done | failed | rejected
+        self.page = 0
+        self.page_count = 0
+        self.word_count = 0
+        self.result = None
+        self.error = None
+        self.preflight = None
+        self.signature = None  # MinHash of the text, for near-duplicate lookups
+        self.fingerprints = None  # per-page content stream hashes, saved with the evaluation
+        self.revision = None  # the earlier saved version this upload revises, and what changed
+        self.reused_pages = 0
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self._source = source  # bytes, or a path to the PDF on disk
+        self._spooled = spooled  # the path is a temp copy this job owns
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed", "rejected")
+
+    def run(self):
+        self.status = "running"
+        status = "failed"
+        started = time.perf_counter()
+        try:
+            # Cache first: a document seen before skips preflight, fingerprinting and extraction
+            digest = document_digest(self._source)
+            cached_pages, info = cached_document(digest)
+            self.preflight = info.get("preflight") or preflight_pdf(self._source)
+            if "preflight" not in info:
+                remember_document_info(digest, preflight=self.preflight)
+            if self.preflight["verdict"] == "reject":
+                self.error = "; ".join(self.preflight["reasons"])
+                status = "rejected"
+                return
+            self.page_count = self.preflight["page_count"]
+            self.fingerprints = info.get("fingerprints") or pdf_page_fingerprints(self._source)
+            if "fingerprints" not in info:
+                remember_document_info(digest, fingerprints=self.fingerprints)
+            previous = None
+            if self.username:
+                previous = get_store().find_previous_version(self.fingerprints, self.username, with_pages=cached_pages is None)
+            known_pages = None
+            if previous is not None:
+                # Unchanged pages come from the earlier version; only the rest are extracted.
+                # On a cache hit no page text is needed, but the unchanged pages still count.
+                known_pages = previous["pages"]
+                unchanged = set(previous["fingerprints"])
+                self.reused_pages = sum(1 for fingerprint in self.fingerprints if fingerprint in unchanged)
+                self.revision = {
+                    "id": previous["id"],
+                    "username": previous["username"],
+                    "created_at": previous["created_at"],
+                    **compare_page_fingerprints(previous["fingerprints"], self.fingerprints)
+                }
+            analyzer = ContractAnalyzer()
+            minhash = MinHasher()
+            if cached_pages is not None:
+                pages = replay_pages(cached_pages)
+            else:
+                parallel = None if self.reused_pages else self.preflight["parallel"]
+                pages = iter_pdf_pages(self._source, parallel=parallel, known_pages=known_pages, digest=digest,
+                                       fingerprints=self.fingerprints)
+            for page_number, page_count, page_text in pages:
+                analyzer.add_page(page_text)
+                minhash.add_page(page_text)
+                self.page, self.page_count, self.word_count = page_number, page_count, analyzer.word_count
+            self.result = analyzer.result()
+            self.result["processing_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            self.signature = minhash.signature()
+            status = "done"
+            get_telemetry().record("analysis", self.result["processing_ms"], self.name, self.page_count)
+        except Exception as error:
+            self.error = str(error)
+        finally:
+            if self._spooled:
+                remove_spooled(self._source, None)
+            self._source = None
+            # finished_at is set before the final status so a job never looks done without it
+            self.finished_at = time.time()
+            self.status = status
+
+# ------------------------------
+# Shared Job Runner
+# ------------------------------
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="analysis-job")
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+def _expire_jobs():
+    cutoff = time.time() - JOB_TTL_SECONDS
+    for job_id in [job_id for job_id, job in _jobs.items() if job.done and job.finished_at is not None and job.finished_at < cutoff]:
+        del _jobs[job_id]
+
+def submit_analysis_job(file, username=None):
+    # A Streamlit upload is already held in memory and getvalue() returns those same bytes
+    # without a copy, so every step of the job reads them in place; writing them to a temp
+    # file would only add disk I/O. Upload size is bounded by Streamlit's server.maxUploadSize.
+    source = read_pdf_bytes(file) if hasattr(file, "getvalue") else spool_pdf(file)
+    job = AnalysisJob(getattr(file, "name", "contract.pdf"), source, spooled=source is not file and isinstance(source, str), username=username)
+    with _jobs_lock:
+        _expire_jobs()
+        _jobs[job.id] = job
+    _executor.submit(job.run)
+    return job.id
+
+def get_job(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
@@ -0,0 +1,211 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contract_analysis import ContractAnalyzer
+from extraction_cache import content_hash
+from pdf_extraction import (
+    UPLOAD_MEMORY_CAP_MB, cached_document, document_digest, get_extraction_pool, iter_pdf_pages, remember_document,
+    remove_spooled, replay_pages, spool_pdf
+)
+from pdf_preflight import preflight_pdf
+from telemetry import get_telemetry
+
+# At most this many files are queued on the pool at once, so a 200-file upload
+# never copies every PDF into the worker queue up front
+BATCH_MAX_IN_FLIGHT = int(os.environ.get("CONTRACT_BATCH_MAX_IN_FLIGHT", str(2 * (os.cpu_count() or 1))))
+
+# ------------------------------
+# Evaluate One PDF (runs in a pool worker)
+# ------------------------------
+def evaluate_pdf(name, source, with_text=False):
+    # source is either the PDF bytes or a path the worker reads itself. The worker only reads
+    # the extraction cache; anything new is returned under "cache" for the parent to store.
+    started = time.perf_counter()
+    # Cache first, so re-evaluating a known document costs a hash rather than a parse
+    digest = document_digest(source)
+    cached_pages, info = cached_document(digest)
+    preflight = info.get("preflight") or preflight_pdf(source)
+    cache_update = {"digest": digest, "pages": None, "info": {} if "preflight" in info else {"preflight": preflight}}
+    if preflight["verdict"] == "reject":
+        return {
+            "file": name,
+            "pages": preflight["page_count"],
+            "result": None,
+            "seconds": time.perf_counter() - started,
+            "error": "Rejected: " + "; ".join(preflight["reasons"]),
+            "cache": cache_update
+        }
+    analyzer = ContractAnalyzer()
+    pages = []
+    page_iter = replay_pages(cached_pages) if cached_pages is not None else iter_pdf_pages(source, parallel=False, use_cache=False)
+    for _, _, page_text in page_iter:
+        analyzer.add_page(page_text)
+        pages.append(page_text)
+    if cached_pages is None:
+        cache_update["pages"] = pages
+    evaluation = {
+        "file": name,
+        "pages": analyzer.page_count,
+        "result": analyzer.result(),
+        "seconds": time.perf_counter() - started,
+        "cache": cache_update
+    }
+    evaluation["result"]["processing_ms"] = round(evaluation["seconds"] * 1000, 1)
+    get_telemetry().record("analysis", evaluation["seconds"] * 1000, name, analyzer.page_count)
+    if with_text:
+        evaluation["text"] = "".join(pages).strip()
+    return evaluation
+
+# ------------------------------
+# Evaluate Many PDFs Concurrently
+# ------------------------------
+def iter_batch_evaluations(files, max_in_flight=BATCH_MAX_IN_FLIGHT, pool=None, with_text=False,
+                           memory_cap_bytes=UPLOAD_MEMORY_CAP_MB * 1024 * 1024):
+    # Yields one evaluation per file in completion order, tagged with the file's
+    # position in the input; failures are reported, not raised. Uploads held in memory
+    # for queued work share memory_cap_bytes; anything that doesn't fit is spooled to disk.
+    pool = pool or get_extraction_pool()
+    pending = {}
+    in_memory = 0
+    files = enumerate(files)
+    exhausted = False
+    while pending or not exhausted:
+        while not exhausted and len(pending) < max_in_flight:
+            index, file = next(files, (None, None))
+            if file is None:
+                exhausted = True
+                break
+            is_path = isinstance(file, (str, os.PathLike))
+            name = getattr(file, "name", None) or (str(file) if is_path else f"document-{index + 1}")
+            source = spool_pdf(file, memory_cap_bytes - in_memory)
+            if isinstance(source, bytes):
+                in_memory += len(source)
+            pending[pool.submit(evaluate_pdf, name, source, with_text)] = (index, name, file, source)
+        if not pending:
+            break
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            index, name, file, source = pending.pop(future)
+            if isinstance(source, bytes):
+                in_memory -= len(source)
+            remove_spooled(source, file)
+            try:
+                evaluation = dict(future.result(), index=index)
+            except Exception as error:
+                yield {"file": name, "index": index, "pages": 0, "result": None, "seconds": 0.0, "error": str(error)}
+                continue
+            remember_document(**evaluation.pop("cache"))
+            yield evaluation
+
+# ------------------------------
+# Headless Command Line
+# ------------------------------
+def find_pdfs(patterns):
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, names in os.walk(pattern):
+                paths.extend(os.path.join(root, name) for name in names if name.lower().endswith(".pdf"))
+        else:
+            paths.extend(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+    return sorted(set(paths))
+
+def load_processed_hashes(jsonl_path, store):
+    if store is not None:
+        return store.known_content_hashes()
+    hashes = set()
+    if os.path.exists(jsonl_path):
+        with open(jsonl_path, "r") as f:
+            for line in f:
+                try:
+                    hashes.add(json.loads(line)["content_hash"])
+                except (ValueError, KeyError):
+                    continue  # a line cut short by an interrupted run
+    return hashes
+
+def iter_pending_files(paths, processed, hashes, stats):
+    # Hashing happens lazily so the first workers start before the whole tree is read
+    for path in paths:
+        with open(path, "rb") as f:
+            digest = content_hash(f.read())
+        if digest in processed:
+            stats["skipped"] += 1
+            continue
+        processed.add(digest)
+        hashes[path] = digest
+        yield path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate a directory or glob of contract PDFs without the UI.")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns")
+    parser.add_argument("--jsonl", default="evaluations.jsonl", help="append results to this JSONL file (default)")
+    parser.add_argument("--store", action="store_true", help="save results into the evaluation store instead")
+    parser.add_argument("--username", default="batch", help="owner of evaluations saved with --store")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    args = parser.parse_args(argv)
+
+    store = None
+    if args.store:
+        from contract_store import get_store
+        store = get_store()
+    paths = find_pdfs(args.inputs)
+    processed = load_processed_hashes(args.jsonl, store)
+    stats = {"done": 0, "failed": 0, "skipped": 0, "pages": 0}
+    hashes = {}
+    pending_saves = []
+
+    def flush_saves():
+        if pending_saves:
+            store.save_many(
+                args.username,
+                [e["result"] for e in pending_saves],
+                [e["text"] for e in pending_saves],
+                [hashes[e["file"]] for e in pending_saves],
+            )
+            pending_saves.clear()
+
+    print(f"Found {len(paths)} PDFs, {len(processed)} already processed")
+    started = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"))
+    output = None if store is not None else open(args.jsonl, "a")
+    try:
+        files = iter_pending_files(paths, processed, hashes, stats)
+        for evaluation in iter_batch_evaluations(files, 2 * args.workers, pool, with_text=store is not None):
+            if evaluation["result"] is None:
+                stats["failed"] += 1
+                print(f"FAILED {evaluation['file']}: {evaluation['error']}", file=sys.stderr)
+                continue
+            stats["done"] += 1
+            stats["pages"] += evaluation["pages"]
+            if store is not None:
+                pending_saves.append(evaluation)
+                if len(pending_saves) >= 100:
+                    flush_saves()
+            else:
+                record = {"file": evaluation["file"], "content_hash": hashes[evaluation["file"]], "pages": evaluation["pages"]}
+                record.update(evaluation["result"])
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+    except KeyboardInterrupt:
+        print("Interrupted; re-run the same command to resume.", file=sys.stderr)
+    finally:
+        if store is not None:
+            flush_saves()
+        if output is not None:
+            output.close()
+        pool.shutdown(cancel_futures=True)
+
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    print(
+        f"Evaluated {stats['done']} documents ({stats['pages']} pages) in {elapsed:.1f}s; "
+        f"skipped {stats['skipped']}, failed {stats['failed']}"
+    )
+    print(f"Throughput: {stats['done'] / elapsed:.2f} docs/s, {stats['pages'] / elapsed:.1f} pages/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from contract_analysis import ContractAnalyzer, analyze_contract
+import extraction_cache
+from contract_store import ContractStore
+from extraction_cache import ExtractionCache
+from pdf_extraction import EXTRACTOR_VERSION, extract_pdf_pages, extract_pdf_text
+
+# ------------------------------
+# Synthetic Contract Corpus
+# ------------------------------
+CLAUSES = [
+    "This Agreement shall commence on the Effective Date and continue for a term of {n} months.",
+    "Either party may terminate this Agreement upon {n} days prior written notice to the other party.",
+    "The Supplier shall indemnify and hold harmless the Customer against all claims arising from breach.",
+    "In no event shall either party's aggregate liability exceed the fees paid in the preceding {n} months.",
+    "This Agreement shall be governed by and construed in accordance with the laws of the State of Delaware.",
+    "Each party shall keep confidential all Confidential Information disclosed by the other party.",
+    "Invoices are payable within {n} days of receipt and late payments accrue interest at {n} percent.",
+    "Neither party shall assign this Agreement without the prior written consent of the other party.",
+    "All notices under this Agreement shall be in writing and delivered to the addresses set out above.",
+    "Force majeure events shall suspend performance for so long as the event continues, up to {n} days.",
+]
+
+def _pdf_string(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def text_pdf(pages, base_font="Helvetica", padding=0):
+    # Builds a minimal text-layer PDF by hand, one page per list of lines, so benchmarks and
+    # tests need no PDF writer dependency. padding adds unused objects up front so every real
+    # object gets a different number without changing the content.
+    count = len(pages)
+    first = 3 + padding
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{first + 2 * i} 0 R" for i in range(count))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {count} >>".encode())
+    objects.extend(b"<< /Unused true >>" for _ in range(padding))
+    font_id = first + 2 * count
+    for page, lines in enumerate(pages):
+        body = "BT /F1 9 Tf 40 760 Td 11 TL " + " ".join(f"({_pdf_string(line)}) Tj T*" for line in lines) + " ET"
+        stream = body.encode("latin-1")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {first + 2 * page + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects.append(f"<< /Type /Font /Subtype /Type1 /BaseFont /{base_font} >>".encode())
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + obj + b"\nendobj\n"
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode()
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(output)
+
+def make_contract_pdf(pages, seed=0, lines_per_page=40):
+    rng = random.Random(seed)
+    return text_pdf([
+        [rng.choice(CLAUSES).format(n=rng.randint(2, 90)) for _ in range(lines_per_page)]
+        for _ in range(pages)
+    ])
+
+def seed_store(store, evaluations, users=50, seed=0, batch=1000):
+    rng = random.Random(seed)
+    for start in range(0, evaluations, batch):
+        by_user = {}
+        for _ in range(min(batch, evaluations - start)):
+            words = rng.randint(50, 5000)
+            text = " ".join(rng.choice(CLAUSES).format(n=rng.randint(2, 90)) for _ in range(3))
+            results, texts = by_user.setdefault(f"user{rng.randrange(users)}", ([], []))
+            results.append({"word_count": words, "summary": text[:300], "contract_health": "Healthy" if words > 200 else "Unhealthy"})
+            texts.append(text)
+        for username, (results, texts) in by_user.items():
+            store.save_many(username, results, texts)
+
+# ------------------------------
+# Timing
+# ------------------------------
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def time_stage(function, repeats, warmup):
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "repeats": repeats,
+        "mean_ms": sum(samples) / len(samples),
+        "min_ms": min(samples),
+        "p50_ms": percentile(samples, 0.50),
+        "p95_ms": percentile(samples, 0.95),
+        "p99_ms": percentile(samples, 0.99),
+    }
+
+def run_benchmarks(page_sizes, store_sizes, repeats, warmup):
+    results = {}
+
+    def record(name, function):
+        results[name] = time_stage(function, repeats, warmup)
+        print(f"{name:<40} p50 {results[name]['p50_ms']:10.2f} ms   p95 {results[name]['p95_ms']:10.2f} ms")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # The cached stage goes through the real extract_pdf_text path, hashing included, so the
+        # process-wide cache is pointed at a scratch directory rather than the app's
+        extraction_cache._cache = ExtractionCache(directory=os.path.join(workdir, "cache"))
+        for pages in page_sizes:
+            pdf = make_contract_pdf(pages, seed=pages)
+            page_texts = extract_pdf_pages(pdf, parallel=False, use_cache=False)
+            text = "".join(page_texts).strip()
+
+            def analyze_stream():
+                analyzer = ContractAnalyzer()
+                for page_text in page_texts:
+                    analyzer.add_page(page_text)
+                return analyzer.result()
+
+            record(f"extract_pdf_text[{pages}p]", lambda: extract_pdf_text(pdf, parallel=False, use_cache=False))
+            if pages >= 50:
+                record(f"extract_pdf_text_parallel[{pages}p]", lambda: extract_pdf_text(pdf, parallel=True, use_cache=False))
+            extract_pdf_text(pdf, parallel=False)
+            record(f"extract_pdf_text_cached[{pages}p]", lambda: extract_pdf_text(pdf, parallel=False))
+            record(f"analyze_contract[{pages}p]", lambda: analyze_contract(text))
+            record(f"analyze_stream[{pages}p]", analyze_stream)
+
+        for size in store_sizes:
+            store = ContractStore(os.path.join(workdir, f"store_{size}.db"), legacy_dir=None)
+            seed_store(store, size)
+            username = store.users()[0]
+            # Saves go to a copy of the seeded store, so every read stage sees exactly size rows
+            # and runs stay comparable
+            save_path = os.path.join(workdir, f"store_{size}_save.db")
+            with sqlite3.connect(save_path) as target:
+                store.connection.backup(target)
+            target.close()
+            save_store = ContractStore(save_path, legacy_dir=None)
+            result = {"word_count": 1234, "summary": CLAUSES[0], "contract_health": "Healthy"}
+            record(f"save_analysis[{size}]", lambda: save_store.save(username, result, CLAUSES[1]))
+            record(f"load_saved_contracts[{size}]", lambda: store.load(username))
+            record(f"load_saved_contracts_page[{size}]", lambda: store.load(username, limit=25))
+
+            def admin_queries():
+                store.totals()
+                users = store.users()
+                store.count(health="Healthy")
+                store.list_evaluations(limit=25)
+                store.list_evaluations(users[0], "Unhealthy", limit=25)
+
+            record(f"admin_panel_queries[{size}]", admin_queries)
+
+            def dashboard_queries():
+                store.activity_series("day", 90)
+                store.activity_series("hour", 72)
+                store.user_activity_series(30)
+                store.word_count_distribution()
+
+            record(f"dashboard_queries[{size}]", dashboard_queries)
+            record(f"search[{size}]", lambda: store.search("indemnify confidential*"))
+    return results
+
+# ------------------------------
+# Compare Two Runs
+# ------------------------------
+def compare_runs(baseline, candidate, threshold, metric="p50_ms"):
+    regressions = []
+    for name, stats in sorted(candidate["results"].items()):
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<40} {'new':>10}")
+            continue
+        change = (stats[metric] - before[metric]) / before[metric] if before[metric] else 0.0
+        flag = "REGRESSION" if change > threshold else ""
+        print(f"{name:<40} {before[metric]:10.2f} -> {stats[metric]:10.2f} ms  {change:+7.1%} {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+# ------------------------------
+# Command Line
+# ------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the extract -> analyze -> save -> load pipeline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="run the benchmark suite")
+    run.add_argument("--pages", type=int, nargs="+", default=[1, 50, 500], help="synthetic PDF sizes in pages")
+    run.add_argument("--store-sizes", type=int, nargs="+", default=[100, 10000, 100000], help="seeded evaluation counts")
+    run.add_argument("--repeats", type=int, default=5)
+    run.add_argument("--warmup", type=int, default=1)
+    run.add_argument("--output", default="benchmark_results.json")
+    compare = commands.add_parser("compare", help="flag regressions between two result files")
+    compare.add_argument("baseline")
+    compare.add_argument("candidate")
+    compare.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before flagging (0.10 = 10%%)")
+    compare.add_argument("--metric", default="p50_ms", choices=["mean_ms", "min_ms", "p50_ms", "p95_ms", "p99_ms"])
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "extractor": EXTRACTOR_VERSION,
+            "config": {"pages": args.pages, "store_sizes": args.store_sizes, "repeats": args.repeats, "warmup": args.warmup},
+            "results": run_benchmarks(args.pages, args.store_sizes, args.repeats, args.warmup),
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"Saved results to {args.output}")
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.candidate) as f:
+            candidate = json.load(f)
+        regressions = compare_runs(baseline, candidate, args.threshold, args.metric)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)
+        print("No regressions")
+
+if __name__ == "__main__":
+    main()
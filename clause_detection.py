@@ -0,0 +1,168 @@
+import json
+import os
+import re
+import threading
+from collections import deque
+
+# ------------------------------
+# Clause Rules
+# ------------------------------
+# Point this at a JSON file shaped like DEFAULT_CLAUSE_RULES to change the rule set
+CLAUSE_RULES_PATH = os.environ.get("CONTRACT_CLAUSE_RULES")
+# Share of the (weighted) clauses a contract needs before it counts as Healthy
+HEALTHY_CLAUSE_SCORE = float(os.environ.get("CONTRACT_HEALTHY_CLAUSE_SCORE", "0.6"))
+
+DEFAULT_CLAUSE_RULES = {
+    "termination": {
+        "label": "Termination",
+        "weight": 1.0,
+        "patterns": ["terminate", "terminated", "termination", "right to terminate", "may be terminated"]
+    },
+    "liability_cap": {
+        "label": "Liability Cap",
+        "weight": 1.0,
+        "patterns": [
+            "limitation of liability", "limitation on liability", "limit of liability", "aggregate liability",
+            "liability shall not exceed", "shall not be liable for any indirect", "maximum liability"
+        ]
+    },
+    "indemnity": {
+        "label": "Indemnity",
+        "weight": 1.0,
+        "patterns": ["indemnify", "indemnifies", "indemnified", "indemnification", "indemnity", "hold harmless"]
+    },
+    "governing_law": {
+        "label": "Governing Law",
+        "weight": 1.0,
+        "patterns": ["governing law", "governed by the laws", "governed by and construed", "construed in accordance with the laws"]
+    },
+    "confidentiality": {
+        "label": "Confidentiality",
+        "weight": 1.0,
+        "patterns": ["confidential information", "confidentiality", "non disclosure", "nondisclosure", "keep confidential"]
+    },
+    "payment_terms": {
+        "label": "Payment Terms",
+        "weight": 1.0,
+        "patterns": ["payment terms", "payable within", "invoices are payable", "due and payable", "late payment", "net 30"]
+    }
+}
+
+# Patterns and text are compared as lowercase alphanumeric word sequences
+WORD = re.compile(r"[a-z0-9]+")
+
+def load_clause_rules(path=CLAUSE_RULES_PATH):
+    if not path:
+        return DEFAULT_CLAUSE_RULES
+    with open(path, "r") as f:
+        return json.load(f)
+
+# ------------------------------
+# Multi-Pattern Automaton
+# ------------------------------
+class ClauseAutomaton:
+    # Aho-Corasick over words: every pattern of every rule is compiled into one trie with
+    # failure links, so the text is scanned once and each word costs amortised O(1)
+    # however many rules are configured
+    def __init__(self, rules):
+        self.rules = rules
+        self.weights = {name: float(rule.get("weight", 1.0)) for name, rule in rules.items()}
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [frozenset()]
+        for name, rule in rules.items():
+            for pattern in rule["patterns"]:
+                self._add_pattern(WORD.findall(pattern.lower()), name)
+        self._link()
+
+    def _add_pattern(self, words, name):
+        if not words:
+            return
+        state = 0
+        for word in words:
+            if word not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(frozenset())
+                self._goto[state][word] = len(self._goto) - 1
+            state = self._goto[state][word]
+        self._output[state] = self._output[state] | {name}
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(word, 0)
+                self._output[child] = self._output[child] | self._output[self._fail[child]]
+
+    def scan(self, words, state, found, position):
+        # Advances over words from state; records each clause's first position in found
+        goto, fail, output = self._goto, self._fail, self._output
+        for word in words:
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            if output[state]:
+                for name in output[state]:
+                    found.setdefault(name, position)
+        return state
+
+_automaton = None
+_automaton_lock = threading.Lock()
+
+def get_clause_automaton():
+    global _automaton
+    with _automaton_lock:
+        if _automaton is None:
+            _automaton = ClauseAutomaton(load_clause_rules())
+        return _automaton
+
+# ------------------------------
+# Streaming Clause Scanner
+# ------------------------------
+class ClauseScanner:
+    # Fed page by page; pages are joined without a separator, so a word cut at the end of
+    # one page is held back and completed by the start of the next
+    def __init__(self, automaton=None):
+        self.automaton = automaton or get_clause_automaton()
+        self.found = {}  # clause name -> page number of its first match
+        self._state = 0
+        self._carry = ""
+        self._page = 0
+
+    def add_page(self, page_text):
+        self._page += 1
+        if len(self.found) == len(self.automaton.rules):
+            return  # every clause already found; nothing left to learn from the rest
+        text = self._carry + page_text.lower()
+        words = WORD.findall(text)
+        self._carry = ""
+        if words and WORD.match(text[-1:]):
+            self._carry = words.pop()
+        self._state = self.automaton.scan(words, self._state, self.found, self._page)
+
+    def finish(self):
+        if self._carry:
+            self._state = self.automaton.scan([self._carry], self._state, self.found, self._page)
+            self._carry = ""
+        return self.found
+
+    def result(self):
+        found = self.finish()
+        weights = self.automaton.weights
+        total = sum(weights.values())
+        score = sum(weights[name] for name in found) / total if total else 0.0
+        return {
+            "contract_health": "Healthy" if score >= HEALTHY_CLAUSE_SCORE else "Unhealthy",
+            "clause_score": round(score, 3),
+            "clauses_found": [name for name in self.automaton.rules if name in found],
+            "clauses_missing": [name for name in self.automaton.rules if name not in found]
+        }
+
+def clause_label(name):
+    return get_clause_automaton().rules.get(name, {}).get("label", name.replace("_", " ").title())
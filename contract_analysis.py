@@ -0,0 +1,73 @@
+from clause_detection import ClauseScanner
+from summarizer import SentenceSampler, summarize
+
+SUMMARY_LENGTH = 300
+
+# ------------------------------
+# Incremental Contract Analyzer
+# ------------------------------
+class ContractAnalyzer:
+    # Consumes page texts one at a time and produces the same result as
+    # analyze_contract("".join(pages).strip()) without building the full string
+    def __init__(self):
+        self.clauses = ClauseScanner()
+        self.sentences = SentenceSampler()
+        self.word_count = 0
+        self.page_count = 0
+        self._summary = []
+        self._summary_length = 0
+        self._content_after_summary = False
+        self._ends_inside_word = False
+
+    def add_page(self, page_text):
+        self.page_count += 1
+        self.clauses.add_page(page_text)
+        if not page_text:
+            return
+        self.sentences.add_page(page_text)
+        words = len(page_text.split())
+        # Pages are joined without a separator, so a word split across the boundary counts once
+        if words and self._ends_inside_word and not page_text[0].isspace():
+            words -= 1
+        self.word_count += words
+        self._ends_inside_word = not page_text[-1].isspace()
+        self._add_summary_text(page_text)
+
+    def _add_summary_text(self, page_text):
+        if self._summary_length >= SUMMARY_LENGTH:
+            if not self._content_after_summary and page_text.strip():
+                self._content_after_summary = True
+            return
+        if not self._summary_length:
+            page_text = page_text.lstrip()
+        room = SUMMARY_LENGTH - self._summary_length
+        chunk = page_text[:room]
+        self._summary.append(chunk)
+        self._summary_length += len(chunk)
+        if page_text[room:].strip():
+            self._content_after_summary = True
+
+    def _prefix_summary(self):
+        summary = "".join(self._summary)
+        if not self._content_after_summary:
+            summary = summary.rstrip()
+        return summary
+
+    def result(self):
+        # Extractive summary when there is enough text and it fits the time budget
+        summary = summarize(self.sentences.finish(), SUMMARY_LENGTH) or self._prefix_summary()
+        result = {"word_count": self.word_count, "summary": summary}
+        result.update(self.clauses.result())
+        return result
+
+# ------------------------------
+# Analyze Contract
+# ------------------------------
+def analyze_pages(pages):
+    analyzer = ContractAnalyzer()
+    for page_text in pages:
+        analyzer.add_page(page_text)
+    return analyzer.result()
+
+def analyze_contract(text):
+    return analyze_pages([text])
@@ -0,0 +1,177 @@
+import difflib
+import re
+from bisect import bisect_left
+from collections import Counter
+from clause_detection import WORD, get_clause_automaton
+
+# ------------------------------
+# Diff Settings
+# ------------------------------
+# Paragraphs longer than this are compared sentence by sentence instead
+MAX_BLOCK_CHARS = 600
+# Stretches with no unique anchor block fall back to difflib only while old x new blocks
+# stays under this; bigger ones are reported as one replaced run
+MAX_FALLBACK_CELLS = 250_000
+# Word-level highlighting is skipped for changes longer than this many words a side
+MAX_INLINE_WORDS = 2000
+
+# A paragraph ends at a blank line, or at a line break straight after closing punctuation
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n|(?<=[.:;!?])[ \t]*\n")
+SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+
+# ------------------------------
+# Paragraph Blocks
+# ------------------------------
+def split_blocks(text):
+    # Whitespace is normalised so a block survives being re-wrapped onto different lines
+    blocks = []
+    for paragraph in PARAGRAPH_BREAK.split(text or ""):
+        paragraph = " ".join(paragraph.split())
+        if len(paragraph) > MAX_BLOCK_CHARS:
+            blocks.extend(sentence for sentence in SENTENCE_END.split(paragraph) if sentence)
+        elif paragraph:
+            blocks.append(paragraph)
+    return blocks
+
+# ------------------------------
+# Anchored Block Diff
+# ------------------------------
+def diff_blocks(old, new):
+    # Patience diff over blocks: identical leading and trailing runs are matched in one linear
+    # pass, blocks that occur exactly once on each side (clause headings, distinctive
+    # paragraphs) anchor the rest, and only the short stretches between anchors are diffed
+    # further. Returns difflib-style opcodes.
+    opcodes = []
+    _diff_range(old, 0, len(old), new, 0, len(new), opcodes)
+    merged = []
+    for opcode in opcodes:
+        if merged and merged[-1][0] == opcode[0] and merged[-1][2] == opcode[1] and merged[-1][4] == opcode[3]:
+            merged[-1] = (opcode[0], merged[-1][1], opcode[2], merged[-1][3], opcode[4])
+        elif opcode[1] < opcode[2] or opcode[3] < opcode[4]:
+            merged.append(opcode)
+    return merged
+
+def _diff_range(old, old_start, old_stop, new, new_start, new_stop, opcodes):
+    prefix = 0
+    while old_start + prefix < old_stop and new_start + prefix < new_stop and old[old_start + prefix] == new[new_start + prefix]:
+        prefix += 1
+    opcodes.append(("equal", old_start, old_start + prefix, new_start, new_start + prefix))
+    old_start, new_start = old_start + prefix, new_start + prefix
+    suffix = 0
+    while old_start < old_stop - suffix and new_start < new_stop - suffix and old[old_stop - suffix - 1] == new[new_stop - suffix - 1]:
+        suffix += 1
+    old_stop, new_stop = old_stop - suffix, new_stop - suffix
+
+    anchors = _unique_anchors(old, old_start, old_stop, new, new_start, new_stop)
+    if anchors:
+        for old_index, new_index in anchors:
+            _diff_range(old, old_start, old_index, new, new_start, new_index, opcodes)
+            opcodes.append(("equal", old_index, old_index + 1, new_index, new_index + 1))
+            old_start, new_start = old_index + 1, new_index + 1
+        _diff_range(old, old_start, old_stop, new, new_start, new_stop, opcodes)
+    else:
+        _diff_unanchored(old, old_start, old_stop, new, new_start, new_stop, opcodes)
+    opcodes.append(("equal", old_stop, old_stop + suffix, new_stop, new_stop + suffix))
+
+def _unique_anchors(old, old_start, old_stop, new, new_start, new_stop):
+    # Blocks unique on both sides, reduced to the longest run that keeps its order on both
+    old_counts = Counter(old[old_start:old_stop])
+    new_counts = Counter(new[new_start:new_stop])
+    new_positions = {new[index]: index for index in range(new_start, new_stop) if new_counts[new[index]] == 1}
+    pairs = [
+        (index, new_positions[old[index]])
+        for index in range(old_start, old_stop)
+        if old_counts[old[index]] == 1 and old[index] in new_positions
+    ]
+    return _longest_increasing(pairs)
+
+def _longest_increasing(pairs):
+    # Patience sorting: pairs come in old order; keeps the longest chain rising in new order
+    tails, tail_pairs, previous = [], [], []
+    for position, (_, new_index) in enumerate(pairs):
+        pile = bisect_left(tails, new_index)
+        if pile == len(tails):
+            tails.append(new_index)
+            tail_pairs.append(position)
+        else:
+            tails[pile] = new_index
+            tail_pairs[pile] = position
+        previous.append(tail_pairs[pile - 1] if pile else None)
+    chain = []
+    position = tail_pairs[-1] if tail_pairs else None
+    while position is not None:
+        chain.append(pairs[position])
+        position = previous[position]
+    return chain[::-1]
+
+def _diff_unanchored(old, old_start, old_stop, new, new_start, new_stop, opcodes):
+    if old_start == old_stop or new_start == new_stop:
+        tag = "insert" if old_start == old_stop else "delete"
+        opcodes.append((tag, old_start, old_stop, new_start, new_stop))
+    elif (old_stop - old_start) * (new_stop - new_start) <= MAX_FALLBACK_CELLS:
+        matcher = difflib.SequenceMatcher(None, old[old_start:old_stop], new[new_start:new_stop], autojunk=False)
+        for tag, first_start, first_stop, second_start, second_stop in matcher.get_opcodes():
+            opcodes.append((tag, old_start + first_start, old_start + first_stop, new_start + second_start, new_start + second_stop))
+    else:
+        opcodes.append(("replace", old_start, old_stop, new_start, new_stop))
+
+# ------------------------------
+# Compare Two Evaluations
+# ------------------------------
+def compare_texts(old_text, new_text):
+    # Returns block counts and the list of changes ("hunks"), each with the clauses it touches
+    old, new = split_blocks(old_text), split_blocks(new_text)
+    automaton = get_clause_automaton()
+    hunks = []
+    counts = {"equal": 0, "replace": 0, "insert": 0, "delete": 0}
+    for tag, old_start, old_stop, new_start, new_stop in diff_blocks(old, new):
+        counts[tag] += max(old_stop - old_start, new_stop - new_start)
+        if tag == "equal":
+            continue
+        found = {}
+        for block in old[old_start:old_stop] + new[new_start:new_stop]:
+            automaton.scan(WORD.findall(block.lower()), 0, found, 0)
+        hunks.append({
+            "tag": tag,
+            "old_start": old_start,
+            "new_start": new_start,
+            "old_blocks": old[old_start:old_stop],
+            "new_blocks": new[new_start:new_stop],
+            "clauses": [name for name in automaton.rules if name in found]
+        })
+    return {
+        "old_blocks": len(old),
+        "new_blocks": len(new),
+        "unchanged_blocks": counts["equal"],
+        "changed_blocks": counts["replace"],
+        "added_blocks": counts["insert"],
+        "removed_blocks": counts["delete"],
+        "hunks": hunks
+    }
+
+def compare_results(old, new):
+    # Deltas between two stored evaluation bodies; no text needed
+    old_clauses, new_clauses = set(old.get("clauses_found", [])), set(new.get("clauses_found", []))
+    return {
+        "word_count_delta": (new.get("word_count") or 0) - (old.get("word_count") or 0),
+        "health_before": old.get("contract_health"),
+        "health_after": new.get("contract_health"),
+        "clause_score_delta": round((new.get("clause_score") or 0.0) - (old.get("clause_score") or 0.0), 3),
+        "clauses_gained": sorted(new_clauses - old_clauses),
+        "clauses_lost": sorted(old_clauses - new_clauses)
+    }
+
+def word_diff(old_text, new_text):
+    # Word-level segments [(tag, text)] with tag "equal", "delete" or "insert", for
+    # highlighting one change; None when either side is too long to be worth it
+    old_words, new_words = old_text.split(), new_text.split()
+    if len(old_words) > MAX_INLINE_WORDS or len(new_words) > MAX_INLINE_WORDS:
+        return None
+    segments = []
+    matcher = difflib.SequenceMatcher(None, old_words, new_words, autojunk=False)
+    for tag, old_start, old_stop, new_start, new_stop in matcher.get_opcodes():
+        if tag in ("equal", "delete", "replace"):
+            segments.append(("equal" if tag == "equal" else "delete", " ".join(old_words[old_start:old_stop])))
+        if tag in ("insert", "replace"):
+            segments.append(("insert", " ".join(new_words[new_start:new_stop])))
+    return segments
@@ -0,0 +1,1079 @@
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from near_duplicates import SIMILARITY_THRESHOLD, band_buckets, pack_signature, similarity, text_signature, unpack_signature
+from text_compression import DICTIONARY_MIN_DOCUMENTS, DICTIONARY_SAMPLE_DOCUMENTS, compress_text, decompress_text, train_dictionary
+from telemetry import span
+
+# ------------------------------
+# Store Settings
+# ------------------------------
+DB_PATH = os.environ.get("CONTRACT_DB_PATH", "contracts.db")
+LEGACY_DIR = "saved_contracts"
+# How often the background thread compacts the database (0 disables it)
+COMPACT_INTERVAL_SECONDS = float(os.environ.get("CONTRACT_COMPACT_INTERVAL_SECONDS", str(6 * 3600)))
+# VACUUM only runs when at least this share of the file is free pages
+VACUUM_FREE_RATIO = 0.2
+
+# A saved evaluation counts as an earlier version of an upload when at least this share of
+# its pages have identical content streams
+PREVIOUS_VERSION_MIN_SHARED = float(os.environ.get("CONTRACT_PREVIOUS_VERSION_MIN_SHARED", "0.5"))
+# Near-duplicate clustering compares every pair within an LSH bucket; a bucket bigger than
+# this (a template shared by thousands of contracts) only has its lowest ids compared
+DUPLICATE_BUCKET_LIMIT = int(os.environ.get("CONTRACT_DUPLICATE_BUCKET_LIMIT", "200"))
+# Fingerprint lookups are split into IN (...) lists of this size to stay under SQLite's variable limit
+SQL_VARIABLE_BATCH = 500
+
+# Quoted phrases, or bare terms (a trailing * makes a prefix search)
+SEARCH_TERM = re.compile(r'"([^"]*)"|(\S+)')
+# Errors SQLite raises for a query the FTS5 parser rejects; anything else is a real failure
+FTS_QUERY_ERRORS = ("fts5: syntax error", "unterminated string")
+# Words of context shown around a search hit
+SNIPPET_WORDS = 16
+
+# Legacy files are named {username}_{YYYYmmdd}_{HHMMSS}.json (batch saves add _{n})
+LEGACY_FILENAME = re.compile(r"^(?P<username>.+)_(?P<date>\d{8})_(?P<time>\d{6})(?:_\d+)?\.json$")
+
+# Recomputes every rollup from the raw evaluations; also used to repair drift
+ROLLUP_REBUILD = (
+    "DELETE FROM totals",
+    "DELETE FROM user_rollups",
+    "DELETE FROM daily_rollups",
+    """INSERT INTO user_rollups (username, evaluations, healthy, total_words, last_saved_at)
+       SELECT username, COUNT(*), SUM(contract_health IS 'Healthy'), COALESCE(SUM(word_count), 0), MAX(created_at)
+       FROM evaluations GROUP BY username""",
+    """INSERT INTO daily_rollups (day, evaluations, healthy, total_words)
+       SELECT substr(created_at, 1, 10), COUNT(*), SUM(contract_health IS 'Healthy'), COALESCE(SUM(word_count), 0)
+       FROM evaluations GROUP BY substr(created_at, 1, 10)""",
+    "INSERT INTO totals (name, value) SELECT 'evaluations', COUNT(*) FROM evaluations",
+    "INSERT INTO totals (name, value) SELECT 'users', COUNT(*) FROM user_rollups",
+)
+
+# Session lengths are counted in buckets starting at these minute marks (the last one is open-ended)
+SESSION_BUCKETS = [0, 1, 5, 15, 30, 60, 120]
+SESSION_BUCKET_SQL = "CASE " + " ".join(
+    f"WHEN duration_seconds >= {minutes * 60} THEN {minutes}" for minutes in reversed(SESSION_BUCKETS)
+) + " END"
+
+# Word counts are charted in buckets starting at these sizes (the last one is open-ended)
+WORD_COUNT_BUCKETS = [0, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000]
+WORD_COUNT_BUCKET_SQL = "CASE " + " ".join(
+    f"WHEN COALESCE(word_count, 0) >= {words} THEN {words}" for words in reversed(WORD_COUNT_BUCKETS)
+) + " END"
+
+# Backfills the dashboard rollups; runs after ROLLUP_REBUILD, which resets daily_rollups
+ANALYTICS_ROLLUP_REBUILD = (
+    "DELETE FROM hourly_rollups",
+    "DELETE FROM user_daily_rollups",
+    "DELETE FROM word_count_buckets",
+    """INSERT INTO hourly_rollups (hour, evaluations, healthy, total_words, processing_ms, processed)
+       SELECT substr(created_at, 1, 13), COUNT(*), SUM(contract_health IS 'Healthy'), COALESCE(SUM(word_count), 0),
+              COALESCE(SUM(json_extract(body, '$.processing_ms')), 0), COUNT(json_extract(body, '$.processing_ms'))
+       FROM evaluations GROUP BY substr(created_at, 1, 13)""",
+    """UPDATE daily_rollups SET processing_ms = hours.processing_ms, processed = hours.processed
+       FROM (SELECT substr(hour, 1, 10) AS day, SUM(processing_ms) AS processing_ms, SUM(processed) AS processed
+             FROM hourly_rollups GROUP BY 1) AS hours
+       WHERE hours.day = daily_rollups.day""",
+    """INSERT INTO user_daily_rollups (day, username, evaluations, healthy, total_words)
+       SELECT substr(created_at, 1, 10), username, COUNT(*), SUM(contract_health IS 'Healthy'), COALESCE(SUM(word_count), 0)
+       FROM evaluations GROUP BY substr(created_at, 1, 10), username""",
+    f"""INSERT INTO word_count_buckets (bucket_words, evaluations)
+        SELECT {WORD_COUNT_BUCKET_SQL}, COUNT(*) FROM evaluations GROUP BY 1""",
+)
+
+# Same idea for the event log rollups
+EVENT_ROLLUP_REBUILD = (
+    "DELETE FROM daily_activity",
+    "DELETE FROM session_lengths",
+    "DELETE FROM totals WHERE name = 'events'",
+    """INSERT INTO daily_activity (day, username, logins, analyses, saves)
+       SELECT substr(occurred_at, 1, 10), username, SUM(event IN ('login', 'signup')), SUM(event = 'analysis'), SUM(event = 'save')
+       FROM events GROUP BY substr(occurred_at, 1, 10), username""",
+    f"""INSERT INTO session_lengths (bucket_minutes, sessions, total_seconds)
+        SELECT {SESSION_BUCKET_SQL}, COUNT(*), SUM(duration_seconds)
+        FROM events WHERE event = 'logout' AND duration_seconds IS NOT NULL GROUP BY 1""",
+    "INSERT INTO totals (name, value) SELECT 'events', COUNT(*) FROM events",
+)
+
+def _move_texts_out_of_search(connection):
+    # Migration 9: extracted text moves from the search table into compressed rows. Evaluations
+    # saved with pages get their text rebuilt from the pages so the page offsets line up.
+    rows = connection.execute(
+        "SELECT p.evaluation_id, p.page_number, t.text FROM evaluation_pages p JOIN page_texts t USING (fingerprint) "
+        "ORDER BY p.evaluation_id, p.page_number"
+    )
+    pages = {}
+    for evaluation_id, page_number, text in rows:
+        pages.setdefault(evaluation_id, []).append((page_number, text))
+    for evaluation_id, document_pages in pages.items():
+        start = 0
+        for page_number, text in document_pages:
+            connection.execute(
+                "UPDATE evaluation_pages SET text_start = ?, text_length = ? WHERE evaluation_id = ? AND page_number = ?",
+                (start, len(text), evaluation_id, page_number),
+            )
+            start += len(text)
+        _insert_text(connection, evaluation_id, "".join(text for _, text in document_pages))
+    for evaluation_id, text in connection.execute("SELECT rowid, text FROM evaluation_search WHERE text != ''").fetchall():
+        if evaluation_id not in pages:
+            _insert_text(connection, evaluation_id, text)
+
+def _fill_search_index(connection):
+    # Indexes every evaluation's summary and decompressed text into the contentless search table
+    dictionaries = dict(connection.execute("SELECT id, data FROM text_dictionaries"))
+    rows = connection.execute(
+        "SELECT e.id, COALESCE(json_extract(e.body, '$.summary'), ''), t.dictionary_id, t.body "
+        "FROM evaluations e LEFT JOIN evaluation_texts t ON t.evaluation_id = e.id"
+    ).fetchall()
+    for evaluation_id, summary, dictionary_id, body in rows:
+        connection.execute(
+            "INSERT INTO evaluation_search (rowid, summary, text) VALUES (?, ?, ?)",
+            (evaluation_id, summary, decompress_text(body, dictionaries.get(dictionary_id)) or ""),
+        )
+
+def _insert_text(connection, evaluation_id, text, dictionary_id=None, dictionary=None):
+    connection.execute(
+        "INSERT OR REPLACE INTO evaluation_texts (evaluation_id, dictionary_id, raw_size, body) VALUES (?, ?, ?, ?)",
+        (evaluation_id, dictionary_id, len(text.encode()), compress_text(text, dictionary)),
+    )
+
+# Each entry upgrades the schema by one version (tracked in PRAGMA user_version); an entry is
+# either SQL or a function taking the connection, for steps SQL can't express
+MIGRATIONS = [
+    (
+        """CREATE TABLE evaluations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            word_count INTEGER,
+            contract_health TEXT,
+            body TEXT NOT NULL,
+            source TEXT UNIQUE
+        )""",
+        "CREATE INDEX idx_evaluations_user_created ON evaluations (username, created_at)",
+        "CREATE INDEX idx_evaluations_created ON evaluations (created_at)",
+    ),
+    (
+        "CREATE INDEX idx_evaluations_health_created ON evaluations (contract_health, created_at)",
+    ),
+    (
+        "CREATE TABLE totals (name TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0)",
+        """CREATE TABLE user_rollups (
+            username TEXT PRIMARY KEY,
+            evaluations INTEGER NOT NULL DEFAULT 0,
+            healthy INTEGER NOT NULL DEFAULT 0,
+            total_words INTEGER NOT NULL DEFAULT 0,
+            last_saved_at TEXT
+        )""",
+        """CREATE TABLE daily_rollups (
+            day TEXT PRIMARY KEY,
+            evaluations INTEGER NOT NULL DEFAULT 0,
+            healthy INTEGER NOT NULL DEFAULT 0,
+            total_words INTEGER NOT NULL DEFAULT 0
+        )""",
+    ) + ROLLUP_REBUILD,
+    (
+        "CREATE VIRTUAL TABLE evaluation_search USING fts5(summary, text, tokenize = 'porter unicode61')",
+        """INSERT INTO evaluation_search (rowid, summary, text)
+           SELECT id, COALESCE(json_extract(body, '$.summary'), ''), '' FROM evaluations""",
+    ),
+    (
+        "ALTER TABLE evaluations ADD COLUMN content_hash TEXT",
+        "CREATE INDEX idx_evaluations_content_hash ON evaluations (content_hash)",
+    ),
+    (
+        """CREATE TABLE events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            occurred_at TEXT NOT NULL,
+            username TEXT NOT NULL,
+            event TEXT NOT NULL,
+            session_id TEXT,
+            duration_seconds REAL,
+            detail TEXT
+        )""",
+        "CREATE INDEX idx_events_user_occurred ON events (username, occurred_at)",
+        "CREATE INDEX idx_events_event_occurred ON events (event, occurred_at)",
+        """CREATE TABLE daily_activity (
+            day TEXT NOT NULL,
+            username TEXT NOT NULL,
+            logins INTEGER NOT NULL DEFAULT 0,
+            analyses INTEGER NOT NULL DEFAULT 0,
+            saves INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, username)
+        )""",
+        """CREATE TABLE session_lengths (
+            bucket_minutes INTEGER PRIMARY KEY,
+            sessions INTEGER NOT NULL DEFAULT 0,
+            total_seconds REAL NOT NULL DEFAULT 0
+        )""",
+        "INSERT INTO totals (name, value) VALUES ('events', 0)",
+    ),
+    (
+        "CREATE TABLE evaluation_signatures (evaluation_id INTEGER PRIMARY KEY, signature BLOB NOT NULL)",
+        """CREATE TABLE lsh_buckets (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            evaluation_id INTEGER NOT NULL,
+            PRIMARY KEY (band, bucket, evaluation_id)
+        ) WITHOUT ROWID""",
+    ),
+    (
+        """CREATE TABLE evaluation_pages (
+            evaluation_id INTEGER NOT NULL,
+            page_number INTEGER NOT NULL,
+            fingerprint TEXT NOT NULL,
+            PRIMARY KEY (evaluation_id, page_number)
+        ) WITHOUT ROWID""",
+        "CREATE INDEX idx_evaluation_pages_fingerprint ON evaluation_pages (fingerprint)",
+        # Page text is stored once per fingerprint, so versions that share pages share rows
+        "CREATE TABLE page_texts (fingerprint TEXT PRIMARY KEY, text TEXT NOT NULL) WITHOUT ROWID",
+    ),
+    (
+        "CREATE TABLE text_dictionaries (id INTEGER PRIMARY KEY AUTOINCREMENT, created_at TEXT NOT NULL, data BLOB NOT NULL)",
+        """CREATE TABLE evaluation_texts (
+            evaluation_id INTEGER PRIMARY KEY,
+            dictionary_id INTEGER,
+            raw_size INTEGER NOT NULL,
+            body BLOB NOT NULL
+        )""",
+        # Pages are now slices of the evaluation's text instead of separate copies
+        "ALTER TABLE evaluation_pages ADD COLUMN text_start INTEGER",
+        "ALTER TABLE evaluation_pages ADD COLUMN text_length INTEGER",
+        _move_texts_out_of_search,
+        "DROP TABLE page_texts",
+        "DROP TABLE evaluation_search",
+        # The search index keeps only its inverted index (contentless, filled as evaluations are
+        # saved); the text itself is stored once, compressed, and snippets are cut from it
+        """CREATE VIRTUAL TABLE evaluation_search USING fts5(
+            summary, text, content = '', tokenize = 'porter unicode61'
+        )""",
+        _fill_search_index,
+    ),
+    (
+        "ALTER TABLE daily_rollups ADD COLUMN processing_ms REAL NOT NULL DEFAULT 0",
+        "ALTER TABLE daily_rollups ADD COLUMN processed INTEGER NOT NULL DEFAULT 0",
+        """CREATE TABLE hourly_rollups (
+            hour TEXT PRIMARY KEY,
+            evaluations INTEGER NOT NULL DEFAULT 0,
+            healthy INTEGER NOT NULL DEFAULT 0,
+            total_words INTEGER NOT NULL DEFAULT 0,
+            processing_ms REAL NOT NULL DEFAULT 0,
+            processed INTEGER NOT NULL DEFAULT 0
+        )""",
+        """CREATE TABLE user_daily_rollups (
+            day TEXT NOT NULL,
+            username TEXT NOT NULL,
+            evaluations INTEGER NOT NULL DEFAULT 0,
+            healthy INTEGER NOT NULL DEFAULT 0,
+            total_words INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, username)
+        ) WITHOUT ROWID""",
+        "CREATE TABLE word_count_buckets (bucket_words INTEGER PRIMARY KEY, evaluations INTEGER NOT NULL DEFAULT 0)",
+    ) + ANALYTICS_ROLLUP_REBUILD,
+]
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def session_bucket(duration_seconds):
+    return max(minutes for minutes in SESSION_BUCKETS if duration_seconds >= minutes * 60)
+
+def word_count_bucket(word_count):
+    return max(words for words in WORD_COUNT_BUCKETS if (word_count or 0) >= words)
+
+def build_search_query(query):
+    # Turns free text into an FTS5 query: every term must match, "..." is a phrase, term* a prefix
+    terms = []
+    for phrase, word in SEARCH_TERM.findall(query):
+        if phrase.strip():
+            terms.append('"' + phrase.replace('"', '""') + '"')
+        elif word:
+            prefix = word.endswith("*")
+            word = word.rstrip("*").replace('"', '""')
+            if word:
+                terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+def search_snippet(query, *texts, words=SNIPPET_WORDS):
+    # The search index stores no text, so snippets are cut here: a window of words around the
+    # first query term found in texts (tried in order), with matching words in bold. Terms are
+    # compared by prefix, which roughly covers the stemming the index does.
+    stems = []
+    for phrase, word in SEARCH_TERM.findall(query):
+        for term in phrase.split() or [word]:
+            term = re.sub(r"\W", "", term.lower())
+            if term:
+                stems.append(term if word.endswith("*") else term[:max(4, len(term) - 3)])
+
+    def matches(token):
+        token = re.sub(r"\W", "", token.lower())
+        return any(token.startswith(stem) for stem in stems)
+
+    for text in texts:
+        tokens = (text or "").split()
+        hit = next((index for index, token in enumerate(tokens) if matches(token)), None)
+        if hit is not None:
+            start = max(0, hit - words // 4)
+            window = [f"**{token}**" if matches(token) else token for token in tokens[start:start + words]]
+            return ("… " if start else "") + " ".join(window) + (" …" if start + words < len(tokens) else "")
+    return ""
+
+# ------------------------------
+# SQLite Evaluation Store
+# ------------------------------
+class ContractStore:
+    def __init__(self, path=DB_PATH, legacy_dir=LEGACY_DIR):
+        self.path = path
+        self.legacy_dir = legacy_dir
+        self._local = threading.local()
+        self._dictionaries = {}  # id -> preset dictionary bytes; rows never change once written
+        self._migrate()
+
+    @property
+    def connection(self):
+        # One connection per thread; Streamlit runs every session on its own thread
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _migrate(self):
+        with self._transaction() as connection:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+                for statement in statements:
+                    if callable(statement):
+                        statement(connection)
+                    else:
+                        connection.execute(statement)
+                connection.execute(f"PRAGMA user_version = {number}")
+        if version == 0 and self.legacy_dir and os.path.isdir(self.legacy_dir):
+            self.import_json_directory(self.legacy_dir)
+
+    def _insert(self, username, result, created_at, source=None, text=None, content_hash=None, pages=None):
+        cursor = self.connection.execute(
+            "INSERT OR IGNORE INTO evaluations (username, created_at, word_count, contract_health, body, source, content_hash) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                username,
+                created_at,
+                result.get("word_count"),
+                result.get("contract_health"),
+                json.dumps(result, separators=(",", ":")),
+                source,
+                content_hash,
+            ),
+        )
+        if not cursor.rowcount:
+            return None
+        self._record_rollups(username, created_at, result)
+        if pages:
+            # The stored text is the pages joined, so each page is a slice of it
+            text = "".join(page_text for _, page_text in pages)
+            self._index_pages(cursor.lastrowid, pages)
+        self.connection.execute(
+            "INSERT INTO evaluation_search (rowid, summary, text) VALUES (?, ?, ?)",
+            (cursor.lastrowid, result.get("summary") or "", text or ""),
+        )
+        if text:
+            dictionary_id = self.text_dictionary_id()
+            _insert_text(self.connection, cursor.lastrowid, text, dictionary_id, self._dictionary(dictionary_id))
+            self._index_signature(cursor.lastrowid, text_signature(text))
+        return cursor.lastrowid
+
+    def _index_signature(self, evaluation_id, signature):
+        if signature is None:
+            return
+        self.connection.execute(
+            "INSERT OR REPLACE INTO evaluation_signatures (evaluation_id, signature) VALUES (?, ?)",
+            (evaluation_id, pack_signature(signature)),
+        )
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO lsh_buckets (band, bucket, evaluation_id) VALUES (?, ?, ?)",
+            [(band, bucket, evaluation_id) for band, bucket in band_buckets(signature)],
+        )
+
+    def _index_pages(self, evaluation_id, pages):
+        # pages is a list of (fingerprint, page_text) in document order
+        rows, start = [], 0
+        for page_number, (fingerprint, page_text) in enumerate(pages, start=1):
+            rows.append((evaluation_id, page_number, fingerprint, start, len(page_text)))
+            start += len(page_text)
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO evaluation_pages (evaluation_id, page_number, fingerprint, text_start, text_length) "
+            "VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def _record_rollups(self, username, created_at, result):
+        # Runs inside the insert's transaction so the rollups never disagree with the rows
+        connection = self.connection
+        healthy = 1 if result.get("contract_health") == "Healthy" else 0
+        words = result.get("word_count") or 0
+        processing_ms = result.get("processing_ms")
+        processed = 0 if processing_ms is None else 1
+        if connection.execute("INSERT OR IGNORE INTO user_rollups (username) VALUES (?)", (username,)).rowcount:
+            connection.execute("UPDATE totals SET value = value + 1 WHERE name = 'users'")
+        connection.execute(
+            "UPDATE user_rollups SET evaluations = evaluations + 1, healthy = healthy + ?, total_words = total_words + ?, "
+            "last_saved_at = MAX(COALESCE(last_saved_at, ''), ?) WHERE username = ?",
+            (healthy, words, created_at, username),
+        )
+        for table, period in (("daily_rollups", "day"), ("hourly_rollups", "hour")):
+            connection.execute(
+                f"INSERT INTO {table} ({period}, evaluations, healthy, total_words, processing_ms, processed) VALUES (?, 1, ?, ?, ?, ?) "
+                f"ON CONFLICT ({period}) DO UPDATE SET evaluations = evaluations + 1, healthy = healthy + excluded.healthy, "
+                "total_words = total_words + excluded.total_words, processing_ms = processing_ms + excluded.processing_ms, "
+                "processed = processed + excluded.processed",
+                (created_at[:10] if period == "day" else created_at[:13], healthy, words, processing_ms or 0, processed),
+            )
+        connection.execute(
+            "INSERT INTO user_daily_rollups (day, username, evaluations, healthy, total_words) VALUES (?, ?, 1, ?, ?) "
+            "ON CONFLICT (day, username) DO UPDATE SET evaluations = evaluations + 1, healthy = healthy + excluded.healthy, "
+            "total_words = total_words + excluded.total_words",
+            (created_at[:10], username, healthy, words),
+        )
+        connection.execute(
+            "INSERT INTO word_count_buckets (bucket_words, evaluations) VALUES (?, 1) "
+            "ON CONFLICT (bucket_words) DO UPDATE SET evaluations = evaluations + 1",
+            (word_count_bucket(words),),
+        )
+        connection.execute("UPDATE totals SET value = value + 1 WHERE name = 'evaluations'")
+
+    def save(self, username, result, text=None, content_hash=None, pages=None):
+        return self.save_many(username, [result], [text], [content_hash], [pages])[0]
+
+    def save_many(self, username, results, texts=None, content_hashes=None, pages=None):
+        created_at = _now()
+        texts = texts or [None] * len(results)
+        content_hashes = content_hashes or [None] * len(results)
+        pages = pages or [None] * len(results)
+        with span("save", pages=len(results)), self._transaction():
+            return [
+                self._insert(username, result, created_at, text=text, content_hash=content_hash, pages=document_pages)
+                for result, text, content_hash, document_pages in zip(results, texts, content_hashes, pages)
+            ]
+
+    def known_content_hashes(self):
+        rows = self.connection.execute("SELECT DISTINCT content_hash FROM evaluations WHERE content_hash IS NOT NULL")
+        return {row[0] for row in rows}
+
+    def load(self, username, limit=None, offset=0):
+        with span("store_read"):
+            rows = self.connection.execute(
+                "SELECT body FROM evaluations WHERE username = ? ORDER BY created_at, id LIMIT ? OFFSET ?",
+                (username, -1 if limit is None else limit, offset),
+            )
+            return [json.loads(row["body"]) for row in rows]
+
+    def _filters(self, username=None, health=None, since=None, until=None):
+        # since and until are inclusive YYYY-MM-DD days
+        clauses, params = [], []
+        if username is not None:
+            clauses.append("username = ?")
+            params.append(username)
+        if health is not None:
+            clauses.append("contract_health = ?")
+            params.append(health)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append((datetime.strptime(until, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d"))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def count(self, username=None, health=None):
+        if health is None:
+            if username is None:
+                return self.totals()["evaluations"]
+            row = self.connection.execute("SELECT evaluations FROM user_rollups WHERE username = ?", (username,)).fetchone()
+            return row[0] if row else 0
+        where, params = self._filters(username, health)
+        return self.connection.execute(f"SELECT COUNT(*) FROM evaluations{where}", params).fetchone()[0]
+
+    def list_evaluations(self, username=None, health=None, limit=25, offset=0, until=None):
+        # Metadata only, newest first; bodies are fetched one at a time with get()
+        where, params = self._filters(username, health, until=until)
+        with span("store_read"):
+            rows = self.connection.execute(
+                "SELECT id, username, created_at, word_count, contract_health FROM evaluations"
+                f"{where} ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            )
+            return [dict(row) for row in rows]
+
+    def get(self, evaluation_id):
+        with span("store_read"):
+            row = self.connection.execute("SELECT body FROM evaluations WHERE id = ?", (evaluation_id,)).fetchone()
+        return json.loads(row["body"]) if row else None
+
+    def date_range(self):
+        row = self.connection.execute("SELECT MIN(created_at), MAX(created_at) FROM evaluations").fetchone()
+        return (row[0][:10], row[1][:10]) if row[0] else (None, None)
+
+    # ------------------------------
+    # Bulk Export
+    # ------------------------------
+    def iter_evaluations(self, username=None, since=None, until=None, first_id=None, last_id=None, batch_size=1000):
+        # Yields full rows in id order, batch_size at a time. Paged by id rather than OFFSET or
+        # one long cursor, so memory stays flat and no read transaction is held between batches.
+        where, params = self._filters(username, since=since, until=until)
+        where += " AND " if where else " WHERE "
+        after = -1 if first_id is None else first_id - 1
+        while True:
+            with span("store_read"):
+                rows = self.connection.execute(
+                    "SELECT id, username, created_at, word_count, contract_health, body FROM evaluations"
+                    f"{where}id > ? AND id <= ? ORDER BY id LIMIT ?",
+                    params + [after, sys.maxsize if last_id is None else last_id, batch_size],
+                ).fetchall()
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            after = rows[-1]["id"]
+
+    def export_chunks(self, username=None, since=None, until=None, chunk_rows=10000):
+        # Splits the matching evaluations into (first_id, last_id, rows) runs of chunk_rows,
+        # scanning ids only
+        where, params = self._filters(username, since=since, until=until)
+        chunks = []
+        with span("store_read"):
+            rows = self.connection.execute(f"SELECT id FROM evaluations{where} ORDER BY id", params)
+            for position, (evaluation_id,) in enumerate(rows):
+                if position % chunk_rows == 0:
+                    chunks.append([evaluation_id, evaluation_id, 0])
+                chunks[-1][1] = evaluation_id
+                chunks[-1][2] += 1
+        return [tuple(chunk) for chunk in chunks]
+
+    def search(self, query, username=None, limit=20):
+        # Ranked by BM25 with summary matches weighted above body matches
+        match = build_search_query(query)
+        if not match:
+            return []
+        sql = (
+            "SELECT e.id, e.username, e.created_at, e.word_count, e.contract_health, "
+            "json_extract(e.body, '$.summary') AS summary, bm25(evaluation_search, 2.0, 1.0) AS score "
+            "FROM evaluation_search JOIN evaluations e ON e.id = evaluation_search.rowid "
+            "WHERE evaluation_search MATCH ?"
+        )
+        params = [match]
+        if username is not None:
+            sql += " AND e.username = ?"
+            params.append(username)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+        try:
+            with span("store_read"):
+                results = [dict(row) for row in self.connection.execute(sql, params)]
+        except sqlite3.OperationalError as error:
+            # A malformed query is the user's typo and simply finds nothing; a locked or
+            # corrupt database must not look like an empty result
+            if not str(error).startswith(FTS_QUERY_ERRORS):
+                raise
+            return []
+        # Snippets need the decompressed text, so only the returned rows are decompressed
+        for row in results:
+            row["snippet"] = search_snippet(query, self.text(row["id"]), row.pop("summary"))
+        return results
+
+    # ------------------------------
+    # Compressed Text
+    # ------------------------------
+    def text(self, evaluation_id):
+        # The only read path that decompresses; listings never touch evaluation_texts
+        with span("store_read"):
+            row = self.connection.execute(
+                "SELECT dictionary_id, body FROM evaluation_texts WHERE evaluation_id = ?", (evaluation_id,)
+            ).fetchone()
+        return decompress_text(row["body"], self._dictionary(row["dictionary_id"])) if row else None
+
+    def text_dictionary_id(self):
+        return self.connection.execute("SELECT MAX(id) FROM text_dictionaries").fetchone()[0]
+
+    def _dictionary(self, dictionary_id):
+        if dictionary_id is None:
+            return None
+        if dictionary_id not in self._dictionaries:
+            row = self.connection.execute("SELECT data FROM text_dictionaries WHERE id = ?", (dictionary_id,)).fetchone()
+            self._dictionaries[dictionary_id] = row[0]
+        return self._dictionaries[dictionary_id]
+
+    def train_text_dictionary(self, sample_documents=DICTIONARY_SAMPLE_DOCUMENTS, min_documents=DICTIONARY_MIN_DOCUMENTS):
+        # Trains a preset dictionary on a random sample of stored texts and recompresses every
+        # text with it. Returns None when there are too few texts to learn from.
+        ids = [row[0] for row in self.connection.execute(
+            "SELECT evaluation_id FROM evaluation_texts ORDER BY random() LIMIT ?", (sample_documents,)
+        )]
+        if len(ids) < min_documents:
+            return None
+        dictionary = train_dictionary(self.text(evaluation_id) for evaluation_id in ids)
+        if not dictionary:
+            return None
+        with self._transaction() as connection:
+            dictionary_id = connection.execute(
+                "INSERT INTO text_dictionaries (created_at, data) VALUES (?, ?)", (_now(), dictionary)
+            ).lastrowid
+        return {"dictionary_id": dictionary_id, "dictionary_bytes": len(dictionary), "recompressed": self.recompress_texts()}
+
+    def recompress_texts(self, batch_size=200):
+        # Moves every text onto the newest dictionary in short transactions, then drops
+        # dictionaries nothing refers to any more
+        dictionary_id = self.text_dictionary_id()
+        dictionary = self._dictionary(dictionary_id)
+        recompressed = 0
+        while True:
+            with self._transaction() as connection:
+                rows = connection.execute(
+                    "SELECT evaluation_id FROM evaluation_texts WHERE dictionary_id IS NOT ? LIMIT ?", (dictionary_id, batch_size)
+                ).fetchall()
+                for (evaluation_id,) in rows:
+                    _insert_text(connection, evaluation_id, self.text(evaluation_id), dictionary_id, dictionary)
+            recompressed += len(rows)
+            if len(rows) < batch_size:
+                break
+        with self._transaction() as connection:
+            connection.execute(
+                "DELETE FROM text_dictionaries WHERE id IS NOT ? AND id NOT IN "
+                "(SELECT DISTINCT dictionary_id FROM evaluation_texts WHERE dictionary_id IS NOT NULL)",
+                (dictionary_id,),
+            )
+        return recompressed
+
+    def text_storage(self):
+        row = self.connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(length(body)), 0) FROM evaluation_texts"
+        ).fetchone()
+        documents, raw_bytes, compressed_bytes = row
+        return {
+            "documents": documents,
+            "raw_bytes": raw_bytes,
+            "compressed_bytes": compressed_bytes,
+            "ratio": raw_bytes / compressed_bytes if compressed_bytes else None,
+            "dictionary_id": self.text_dictionary_id()
+        }
+
+    def users(self):
+        return [row[0] for row in self.connection.execute("SELECT username FROM user_rollups ORDER BY username")]
+
+    # ------------------------------
+    # Near-Duplicate Detection
+    # ------------------------------
+    def find_similar(self, signature, threshold=SIMILARITY_THRESHOLD, limit=5):
+        # Only evaluations sharing at least one LSH band bucket are compared, so the cost
+        # follows the number of candidates rather than the size of the store
+        if signature is None:
+            return []
+        buckets = band_buckets(signature)
+        with span("store_read"):
+            candidates = self.connection.execute(
+                "SELECT s.evaluation_id, s.signature, e.username, e.created_at, e.contract_health "
+                "FROM evaluation_signatures s JOIN evaluations e ON e.id = s.evaluation_id "
+                "WHERE s.evaluation_id IN (SELECT evaluation_id FROM lsh_buckets WHERE "
+                + " OR ".join(["(band = ? AND bucket = ?)"] * len(buckets)) + ")",
+                [value for bucket in buckets for value in bucket],
+            ).fetchall()
+        matches = []
+        for row in candidates:
+            score = similarity(signature, unpack_signature(row["signature"]))
+            if score >= threshold:
+                matches.append({
+                    "id": row["evaluation_id"],
+                    "username": row["username"],
+                    "created_at": row["created_at"],
+                    "contract_health": row["contract_health"],
+                    "similarity": score
+                })
+        matches.sort(key=lambda match: (-match["similarity"], match["id"]))
+        return matches[:limit]
+
+    def duplicate_clusters(self, threshold=SIMILARITY_THRESHOLD, limit=50):
+        # Groups evaluations whose signatures collide in any band and verify as similar,
+        # joined transitively; largest clusters first
+        parent = {}
+
+        def root(node):
+            while parent.setdefault(node, node) != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        signatures = {}
+
+        def signature_of(evaluation_id):
+            if evaluation_id not in signatures:
+                row = self.connection.execute(
+                    "SELECT signature FROM evaluation_signatures WHERE evaluation_id = ?", (evaluation_id,)
+                ).fetchone()
+                signatures[evaluation_id] = unpack_signature(row[0])
+            return signatures[evaluation_id]
+
+        rows = self.connection.execute(
+            "SELECT group_concat(evaluation_id) FROM lsh_buckets GROUP BY band, bucket HAVING COUNT(*) > 1"
+        )
+        checked = set()
+        for (members,) in rows:
+            ids = sorted(int(value) for value in members.split(","))[:DUPLICATE_BUCKET_LIMIT]
+            for position, first in enumerate(ids):
+                for second in ids[position + 1:]:
+                    pair = (first, second)
+                    if pair in checked or root(first) == root(second):
+                        continue
+                    checked.add(pair)
+                    if similarity(signature_of(first), signature_of(second)) >= threshold:
+                        parent[root(second)] = root(first)
+
+        clusters = {}
+        for node in parent:
+            clusters.setdefault(root(node), []).append(node)
+        clusters = sorted((sorted(ids) for ids in clusters.values() if len(ids) > 1), key=lambda ids: (-len(ids), ids[0]))
+        result = []
+        for ids in clusters[:limit]:
+            users = self.connection.execute(
+                f"SELECT DISTINCT username FROM evaluations WHERE id IN ({','.join('?' * len(ids))}) ORDER BY username", ids
+            )
+            result.append({"ids": ids, "users": [row[0] for row in users]})
+        return result
+
+    def index_signatures(self):
+        # Backfills signatures for evaluations saved before the index existed, from their
+        # stored text; safe to re-run
+        indexed = 0
+        ids = [row[0] for row in self.connection.execute(
+            "SELECT evaluation_id FROM evaluation_texts WHERE evaluation_id NOT IN (SELECT evaluation_id FROM evaluation_signatures)"
+        )]
+        with self._transaction():
+            for evaluation_id in ids:
+                signature = text_signature(self.text(evaluation_id))
+                if signature is not None:
+                    self._index_signature(evaluation_id, signature)
+                    indexed += 1
+        return indexed
+
+    # ------------------------------
+    # Document Versions
+    # ------------------------------
+    def find_previous_version(self, fingerprints, username, min_shared=PREVIOUS_VERSION_MIN_SHARED, with_pages=True):
+        # The user's saved evaluation sharing the most page fingerprints with this upload, if at
+        # least min_shared of its pages are shared. Returns its page fingerprints in order and
+        # the stored text of the pages the upload can reuse (skipped, with no decompression,
+        # when with_pages is False). Other users' evaluations are never
+        # considered, so neither their text nor the fact they saved the contract leaks.
+        unique = sorted(set(fingerprints))
+        if not unique:
+            return None
+        with span("store_read"):
+            shared_by_id = {}
+            for start in range(0, len(unique), SQL_VARIABLE_BATCH):
+                batch = unique[start:start + SQL_VARIABLE_BATCH]
+                rows = self.connection.execute(
+                    "SELECT p.evaluation_id, COUNT(DISTINCT p.fingerprint) FROM evaluation_pages p "
+                    "JOIN evaluations e ON e.id = p.evaluation_id "
+                    f"WHERE p.fingerprint IN ({','.join('?' * len(batch))}) AND e.username = ? GROUP BY p.evaluation_id",
+                    batch + [username],
+                )
+                for evaluation_id, shared in rows:
+                    shared_by_id[evaluation_id] = shared_by_id.get(evaluation_id, 0) + shared
+            if not shared_by_id:
+                return None
+            # Most shared pages wins; ties go to the newest version
+            evaluation_id, shared = max(shared_by_id.items(), key=lambda item: (item[1], item[0]))
+            previous = self.connection.execute(
+                "SELECT fingerprint, text_start, text_length FROM evaluation_pages WHERE evaluation_id = ? ORDER BY page_number",
+                (evaluation_id,),
+            ).fetchall()
+            if shared < min_shared * max(len(previous), 1):
+                return None
+            row = self.connection.execute(
+                "SELECT username, created_at FROM evaluations WHERE id = ?", (evaluation_id,)
+            ).fetchone()
+        # The reusable pages are slices of the earlier version's text, decompressed once
+        pages = {}
+        if with_pages:
+            text = self.text(evaluation_id) or ""
+            wanted = set(unique)
+            pages = {
+                fingerprint: text[start:start + length]
+                for fingerprint, start, length in previous
+                if fingerprint in wanted and start is not None
+            }
+        return {
+            "id": evaluation_id,
+            "username": row["username"] if row else None,
+            "created_at": row["created_at"] if row else None,
+            "fingerprints": [fingerprint for fingerprint, _, _ in previous],
+            "pages": pages
+        }
+
+    # ------------------------------
+    # Event Log
+    # ------------------------------
+    def record_events(self, events):
+        # Append-only; each event is a dict with occurred_at, username, event and optional
+        # session_id, duration_seconds and detail. Rollups are updated in the same transaction.
+        with self._transaction() as connection:
+            for event in events:
+                connection.execute(
+                    "INSERT INTO events (occurred_at, username, event, session_id, duration_seconds, detail) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        event["occurred_at"],
+                        event["username"],
+                        event["event"],
+                        event.get("session_id"),
+                        event.get("duration_seconds"),
+                        event.get("detail"),
+                    ),
+                )
+                name = event["event"]
+                connection.execute(
+                    "INSERT INTO daily_activity (day, username, logins, analyses, saves) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (day, username) DO UPDATE SET logins = logins + excluded.logins, "
+                    "analyses = analyses + excluded.analyses, saves = saves + excluded.saves",
+                    (
+                        event["occurred_at"][:10],
+                        event["username"],
+                        int(name in ("login", "signup")),
+                        int(name == "analysis"),
+                        int(name == "save"),
+                    ),
+                )
+                if name == "logout" and event.get("duration_seconds") is not None:
+                    connection.execute(
+                        "INSERT INTO session_lengths (bucket_minutes, sessions, total_seconds) VALUES (?, 1, ?) "
+                        "ON CONFLICT (bucket_minutes) DO UPDATE SET sessions = sessions + 1, "
+                        "total_seconds = total_seconds + excluded.total_seconds",
+                        (session_bucket(event["duration_seconds"]), event["duration_seconds"]),
+                    )
+            connection.execute("UPDATE totals SET value = value + ? WHERE name = 'events'", (len(events),))
+
+    def count_events(self, username=None):
+        if username is None:
+            return self.totals().get("events", 0)
+        return self.connection.execute("SELECT COUNT(*) FROM events WHERE username = ?", (username,)).fetchone()[0]
+
+    def list_events(self, username=None, limit=50, offset=0):
+        # Newest first
+        where, params = ("WHERE username = ? ", [username]) if username is not None else ("", [])
+        with span("store_read"):
+            rows = self.connection.execute(
+                f"SELECT * FROM events {where}ORDER BY id DESC LIMIT ? OFFSET ?", params + [limit, offset]
+            )
+            return [dict(row) for row in rows]
+
+    def session_length_distribution(self):
+        rows = self.connection.execute("SELECT * FROM session_lengths ORDER BY bucket_minutes").fetchall()
+        return [dict(row) for row in rows]
+
+    def active_users(self, days=30):
+        # Distinct users with any activity per day, newest day last
+        rows = self.connection.execute(
+            "SELECT day, COUNT(*) AS users, SUM(logins) AS logins, SUM(analyses) AS analyses, SUM(saves) AS saves "
+            "FROM daily_activity GROUP BY day ORDER BY day DESC LIMIT ?",
+            (days,),
+        )
+        return [dict(row) for row in rows][::-1]
+
+    def active_usernames(self):
+        return [row[0] for row in self.connection.execute("SELECT DISTINCT username FROM daily_activity ORDER BY username")]
+
+    def active_user_count(self, since_day):
+        row = self.connection.execute(
+            "SELECT COUNT(DISTINCT username) FROM daily_activity WHERE day >= ?", (since_day,)
+        ).fetchone()
+        return row[0]
+
+    # ------------------------------
+    # Rollups
+    # ------------------------------
+    def totals(self):
+        totals = {"evaluations": 0, "users": 0}
+        totals.update(self.connection.execute("SELECT name, value FROM totals").fetchall())
+        return totals
+
+    def user_rollups(self):
+        return [dict(row) for row in self.connection.execute("SELECT * FROM user_rollups ORDER BY evaluations DESC")]
+
+    def daily_rollup(self, day):
+        row = self.connection.execute("SELECT * FROM daily_rollups WHERE day = ?", (day,)).fetchone()
+        return dict(row) if row else {"day": day, "evaluations": 0, "healthy": 0, "total_words": 0, "processing_ms": 0.0, "processed": 0}
+
+    def daily_rollups(self, days=30):
+        rows = self.connection.execute("SELECT * FROM daily_rollups ORDER BY day DESC LIMIT ?", (days,))
+        return [dict(row) for row in rows][::-1]
+
+    # ------------------------------
+    # Dashboard Time Series
+    # ------------------------------
+    def activity_series(self, granularity="day", periods=90):
+        # The last `periods` days or hours, oldest first, with empty periods filled in. Reads
+        # only rollup rows, so the cost follows `periods`, not the number of evaluations.
+        table, width, step = ("daily_rollups", 10, timedelta(days=1)) if granularity == "day" else ("hourly_rollups", 13, timedelta(hours=1))
+        now = datetime.now()
+        keys = [(now - step * offset).strftime("%Y-%m-%d %H")[:width] for offset in range(periods - 1, -1, -1)]
+        period = "day" if granularity == "day" else "hour"
+        rows = {
+            row["period"]: dict(row)
+            for row in self.connection.execute(
+                f"SELECT {period} AS period, evaluations, healthy, total_words, processing_ms, processed FROM {table} "
+                f"WHERE {period} >= ?",
+                (keys[0],),
+            )
+        }
+        empty = {"evaluations": 0, "healthy": 0, "total_words": 0, "processing_ms": 0.0, "processed": 0}
+        return [rows.get(key, {**empty, "period": key}) for key in keys]
+
+    def user_activity_series(self, days=30, top_users=8):
+        # Evaluations per day for the busiest users over the window, oldest first, with every
+        # day and every shown user filled in; everyone else is "Other"
+        now = datetime.now()
+        keys = [(now - timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(days - 1, -1, -1)]
+        rows = self.connection.execute(
+            "SELECT day, username, evaluations FROM user_daily_rollups WHERE day >= ? ORDER BY day", (keys[0],)
+        ).fetchall()
+        totals = {}
+        for row in rows:
+            totals[row["username"]] = totals.get(row["username"], 0) + row["evaluations"]
+        top = set(sorted(totals, key=lambda username: (-totals[username], username))[:top_users])
+        names = sorted(top) + (["Other"] if len(totals) > len(top) else [])
+        series = {key: dict.fromkeys(names, 0) for key in keys}
+        for row in rows:
+            if row["day"] in series:
+                series[row["day"]][row["username"] if row["username"] in top else "Other"] += row["evaluations"]
+        return series
+
+    def word_count_distribution(self):
+        counts = dict(self.connection.execute("SELECT bucket_words, evaluations FROM word_count_buckets").fetchall())
+        return [{"bucket_words": words, "evaluations": counts.get(words, 0)} for words in WORD_COUNT_BUCKETS]
+
+    def rebuild_rollups(self):
+        with self._transaction() as connection:
+            for statement in ROLLUP_REBUILD + EVENT_ROLLUP_REBUILD + ANALYTICS_ROLLUP_REBUILD:
+                connection.execute(statement)
+        return self.totals()
+
+    # ------------------------------
+    # Compaction
+    # ------------------------------
+    def file_size(self):
+        return sum(os.path.getsize(path) for path in (self.path, self.path + "-wal") if os.path.exists(path))
+
+    def compact(self, vacuum=None):
+        # Merges the search index's b-tree segments, refreshes planner statistics, rewrites the
+        # file when enough of it is free pages (vacuum=None decides by VACUUM_FREE_RATIO), and
+        # folds the WAL back into the main file
+        size_before = self.file_size()
+        connection = self.connection
+        connection.execute("INSERT INTO evaluation_search (evaluation_search) VALUES ('optimize')")
+        connection.execute("PRAGMA optimize")
+        if vacuum is None:
+            free_pages = connection.execute("PRAGMA freelist_count").fetchone()[0]
+            pages = connection.execute("PRAGMA page_count").fetchone()[0]
+            vacuum = pages > 0 and free_pages / pages >= VACUUM_FREE_RATIO
+        if vacuum:
+            connection.execute("VACUUM")
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return {"bytes_before": size_before, "bytes_after": self.file_size(), "vacuumed": vacuum}
+
+    def import_json_directory(self, directory=LEGACY_DIR):
+        # Safe to re-run: each file is keyed by its name in the source column
+        imported = 0
+        with self._transaction():
+            for name in sorted(os.listdir(directory)):
+                match = LEGACY_FILENAME.match(name)
+                if not match:
+                    continue
+                with open(os.path.join(directory, name), "r") as f:
+                    result = json.load(f)
+                created_at = datetime.strptime(match["date"] + match["time"], "%Y%m%d%H%M%S").strftime("%Y-%m-%d %H:%M:%S")
+                if self._insert(match["username"], result, created_at, source=name) is not None:
+                    imported += 1
+        return imported
+
+# ------------------------------
+# Shared Process-Wide Instance
+# ------------------------------
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ContractStore()
+            if COMPACT_INTERVAL_SECONDS > 0:
+                threading.Thread(target=_compact_loop, args=(_store,), name="store-compaction", daemon=True).start()
+        return _store
+
+def _compact_loop(store):
+    while True:
+        time.sleep(COMPACT_INTERVAL_SECONDS)
+        try:
+            store.compact()
+            if store.text_dictionary_id() is None:
+                store.train_text_dictionary()
+        except sqlite3.Error:
+            pass  # busy or locked; try again next interval
+
+# ------------------------------
+# Save and Load Analyses
+# ------------------------------
+def save_analysis(username, result, text=None, pages=None):
+    return get_store().save(username, result, text, pages=pages)
+
+def save_analyses(username, results, texts=None):
+    return get_store().save_many(username, results, texts)
+
+def load_saved_contracts(username, limit=None, offset=0):
+    return get_store().load(username, limit, offset)
+
+# ------------------------------
+# Command Line
+# ------------------------------
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == "import":
+        directory = sys.argv[2] if len(sys.argv) > 2 else LEGACY_DIR
+        print(f"Imported {get_store().import_json_directory(directory)} evaluations from {directory}")
+    elif command == "rebuild-rollups":
+        totals = get_store().rebuild_rollups()
+        print(f"Rebuilt rollups: {totals['evaluations']} evaluations, {totals['users']} users")
+    elif command == "index-duplicates":
+        print(f"Indexed {get_store().index_signatures()} evaluations for near-duplicate detection")
+    elif command == "train-dictionary":
+        trained = get_store().train_text_dictionary(min_documents=2)
+        if trained is None:
+            print("Not enough stored text to train a dictionary")
+        else:
+            storage = get_store().text_storage()
+            print(
+                f"Trained dictionary #{trained['dictionary_id']} ({trained['dictionary_bytes']:,} bytes), recompressed "
+                f"{trained['recompressed']} texts: {storage['raw_bytes'] / 1e6:.1f} MB -> {storage['compressed_bytes'] / 1e6:.1f} MB"
+            )
+    elif command == "compact":
+        stats = get_store().compact(vacuum=True)
+        print(f"Compacted {DB_PATH}: {stats['bytes_before'] / 1e6:.1f} MB -> {stats['bytes_after'] / 1e6:.1f} MB")
+    else:
+        print("Usage: python contract_store.py import [saved_contracts_dir] | rebuild-rollups | index-duplicates | train-dictionary | compact")
@@ -0,0 +1,153 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from contract_store import get_store
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is only offered when pyarrow is installed
+    pyarrow = None
+
+# ------------------------------
+# Export Settings
+# ------------------------------
+# Rows read from the store and written out per step; memory use follows this, not the export size
+EXPORT_BATCH_ROWS = 1000
+# Each download in the admin panel covers at most this many evaluations
+EXPORT_CHUNK_ROWS = int(os.environ.get("CONTRACT_EXPORT_CHUNK_ROWS", "10000"))
+
+EXPORT_COLUMNS = [
+    "id", "username", "created_at", "word_count", "contract_health",
+    "clause_score", "clauses_found", "clauses_missing", "summary"
+]
+EXPORT_FORMATS = ["csv", "jsonl"] + (["parquet"] if pyarrow is not None else [])
+MIME_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson", "parquet": "application/vnd.apache.parquet"}
+
+# ------------------------------
+# Export Records
+# ------------------------------
+def export_record(row):
+    body = json.loads(row["body"])
+    return {
+        "id": row["id"],
+        "username": row["username"],
+        "created_at": row["created_at"],
+        "word_count": row["word_count"],
+        "contract_health": row["contract_health"],
+        "clause_score": body.get("clause_score"),
+        "clauses_found": body.get("clauses_found", []),
+        "clauses_missing": body.get("clauses_missing", []),
+        "summary": body.get("summary")
+    }
+
+def iter_records(store=None, username=None, since=None, until=None, first_id=None, last_id=None):
+    rows = (store or get_store()).iter_evaluations(username, since, until, first_id, last_id, batch_size=EXPORT_BATCH_ROWS)
+    return (export_record(row) for row in rows)
+
+# ------------------------------
+# Streaming Writers
+# ------------------------------
+def iter_csv(records):
+    # Yields encoded chunks of EXPORT_BATCH_ROWS rows; clause lists are joined with ";"
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for count, record in enumerate(records, start=1):
+        writer.writerow([";".join(value) if isinstance(value, list) else value for value in (record[column] for column in EXPORT_COLUMNS)])
+        if count % EXPORT_BATCH_ROWS == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+def iter_jsonl(records):
+    batch = []
+    for record in records:
+        batch.append(json.dumps(record, separators=(",", ":")))
+        if len(batch) == EXPORT_BATCH_ROWS:
+            yield ("\n".join(batch) + "\n").encode()
+            batch = []
+    if batch:
+        yield ("\n".join(batch) + "\n").encode()
+
+def write_parquet(records, target):
+    # One row group per batch, so only one batch is held in memory
+    schema = pyarrow.schema([
+        ("id", pyarrow.int64()),
+        ("username", pyarrow.string()),
+        ("created_at", pyarrow.string()),
+        ("word_count", pyarrow.int64()),
+        ("contract_health", pyarrow.string()),
+        ("clause_score", pyarrow.float64()),
+        ("clauses_found", pyarrow.list_(pyarrow.string())),
+        ("clauses_missing", pyarrow.list_(pyarrow.string())),
+        ("summary", pyarrow.string()),
+    ])
+    with pyarrow.parquet.ParquetWriter(target, schema) as writer:
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) == EXPORT_BATCH_ROWS:
+                writer.write_table(pyarrow.Table.from_pylist(batch, schema))
+                batch = []
+        if batch:
+            writer.write_table(pyarrow.Table.from_pylist(batch, schema))
+
+def export_evaluations(target, export_format, username=None, since=None, until=None, first_id=None, last_id=None, store=None):
+    # Streams the matching evaluations into target (a path or a binary file object) and
+    # returns how many were written
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format {export_format!r}; choose from {', '.join(EXPORT_FORMATS)}")
+    count = 0
+
+    def counted(records):
+        nonlocal count
+        for record in records:
+            count += 1
+            yield record
+
+    records = counted(iter_records(store, username, since, until, first_id, last_id))
+    if export_format == "parquet":
+        write_parquet(records, target)
+        return count
+    chunks = iter_csv(records) if export_format == "csv" else iter_jsonl(records)
+    if isinstance(target, str):
+        with open(target, "wb") as f:
+            f.writelines(chunks)
+    else:
+        target.writelines(chunks)
+    return count
+
+def export_chunk_bytes(export_format, username=None, since=None, until=None, first_id=None, last_id=None):
+    # One admin-panel download; bounded by EXPORT_CHUNK_ROWS rather than the whole export
+    buffer = io.BytesIO()
+    export_evaluations(buffer, export_format, username, since, until, first_id, last_id)
+    return buffer.getvalue()
+
+# ------------------------------
+# Command Line
+# ------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export saved evaluations without loading them all into memory.")
+    parser.add_argument("--format", default="csv", choices=["csv", "jsonl", "parquet"])
+    parser.add_argument("--user", help="only this user's evaluations")
+    parser.add_argument("--since", help="first day to include (YYYY-MM-DD)")
+    parser.add_argument("--until", help="last day to include (YYYY-MM-DD)")
+    parser.add_argument("--output", default="-", help="file to write, or - for stdout (csv and jsonl only)")
+    args = parser.parse_args(argv)
+    if args.format not in EXPORT_FORMATS:
+        parser.error("Parquet export needs pyarrow (pip install pyarrow)")
+    if args.output == "-":
+        if args.format == "parquet":
+            parser.error("Parquet export needs an --output file")
+        count = export_evaluations(sys.stdout.buffer, args.format, args.user, args.since, args.until)
+    else:
+        count = export_evaluations(args.output, args.format, args.user, args.since, args.until)
+    print(f"Exported {count} evaluations", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from contract_store import get_store
+
+# ------------------------------
+# Event Log Settings
+# ------------------------------
+# Events wait here until the writer thread appends them to the store in one transaction
+EVENT_BUFFER_SIZE = int(os.environ.get("CONTRACT_EVENT_BUFFER_SIZE", "100000"))
+EVENT_FLUSH_SECONDS = float(os.environ.get("CONTRACT_EVENT_FLUSH_SECONDS", "1"))
+
+EVENT_TYPES = ["login", "signup", "logout", "analysis", "save"]
+
+# ------------------------------
+# Buffered Event Writer
+# ------------------------------
+class EventLog:
+    def __init__(self, store=None, buffer_size=EVENT_BUFFER_SIZE, flush_interval=EVENT_FLUSH_SECONDS):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._buffer = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._writer = None
+
+    def log(self, username, event, session_id=None, duration_seconds=None, detail=None):
+        # Never touches the database; the UI thread only appends to the buffer
+        entry = {
+            "occurred_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "username": username,
+            "event": event,
+            "session_id": session_id,
+            "duration_seconds": duration_seconds,
+            "detail": detail,
+        }
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(entry)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="event-log-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass  # the batch is put back and retried on the next tick
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._buffer)
+                self._buffer.clear()
+            if not batch:
+                return 0
+            try:
+                (self.store or get_store()).record_events(batch)
+            except sqlite3.Error:
+                with self._lock:
+                    # Events logged during the failed write are newer than the batch, so when
+                    # they don't all fit back in the buffer it is the batch's oldest that are dropped
+                    kept = batch[max(0, len(batch) - (self._buffer.maxlen - len(self._buffer))):]
+                    self.dropped += len(batch) - len(kept)
+                    self._buffer.extendleft(reversed(kept))
+                raise
+            return len(batch)
+
+# ------------------------------
+# Shared Process-Wide Instance
+# ------------------------------
+_event_log = None
+_event_log_lock = threading.Lock()
+
+def get_event_log():
+    global _event_log
+    with _event_log_lock:
+        if _event_log is None:
+            _event_log = EventLog()
+            atexit.register(_event_log.flush)
+        return _event_log
+
+def log_event(username, event, session_id=None, duration_seconds=None, detail=None):
+    get_event_log().log(username, event, session_id, duration_seconds, detail)
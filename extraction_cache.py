@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# ------------------------------
+# Cache Settings
+# ------------------------------
+CACHE_DIR = os.environ.get("CONTRACT_CACHE_DIR", ".extraction_cache")
+MEMORY_BUDGET_MB = float(os.environ.get("CONTRACT_CACHE_MEMORY_MB", "64"))
+DISK_BUDGET_MB = float(os.environ.get("CONTRACT_CACHE_DISK_MB", "512"))
+
+# ------------------------------
+# Content Keys
+# ------------------------------
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def cache_key(data, version):
+    # The extractor version is part of the key so an upgrade never serves stale text
+    return digest_key(content_hash(data), version)
+
+def digest_key(digest, version):
+    # Same key as cache_key, from a content hash already computed
+    return hashlib.sha256(f"{version}:{digest}".encode()).hexdigest()
+
+# ------------------------------
+# Two-Tier Extraction Cache
+# ------------------------------
+class ExtractionCache:
+    def __init__(self, directory=CACHE_DIR, memory_budget_mb=MEMORY_BUDGET_MB, disk_budget_mb=DISK_BUDGET_MB):
+        self.directory = directory
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.disk_budget = int(disk_budget_mb * 1024 * 1024)
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._disk_bytes = sum(size for _, _, size in self._disk_entries())
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _disk_entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, path, stat.st_size))
+        return entries
+
+    def _remember(self, key, value, size):
+        if size > self.memory_budget:
+            return
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key)[1]
+        self._memory[key] = (value, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_budget:
+            _, (_, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+
+    def _evict_disk(self):
+        # Oldest-first eviction down to 90% of the budget so we don't rescan on every write
+        target = int(self.disk_budget * 0.9)
+        for _, path, size in sorted(self._disk_entries()):
+            if self._disk_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self._disk_bytes -= size
+            except FileNotFoundError:
+                pass
+
+    def get(self, key, count=True):
+        # count=False is for lookups that aren't a document's text (side entries kept next to
+        # it), so the hit rate still means one lookup per document
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += count
+                return self._memory[key][0]
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                payload = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += count
+            return None
+        value = json.loads(payload)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.disk_hits += count
+            self._remember(key, value, len(payload))
+        return value
+
+    def put(self, key, value):
+        payload = json.dumps(value, separators=(",", ":")).encode()
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            replaced = os.stat(path).st_size
+        except FileNotFoundError:
+            replaced = 0
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._remember(key, value, len(payload))
+            self._disk_bytes += len(payload) - replaced
+            if self._disk_bytes > self.disk_budget:
+                self._evict_disk()
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_mb": self._memory_bytes / (1024 * 1024),
+                "disk_mb": self._disk_bytes / (1024 * 1024),
+            }
+
+# ------------------------------
+# Shared Process-Wide Instance
+# ------------------------------
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExtractionCache()
+        return _cache
@@ -0,0 +1,101 @@
+import hashlib
+import os
+import re
+from array import array
+
+# ------------------------------
+# Similarity Settings
+# ------------------------------
+# Signatures have NUM_HASHES slots split into LSH_BANDS bands; two documents share a band
+# bucket with high probability once their similarity passes roughly (1/bands)^(1/rows)
+NUM_HASHES = 128
+LSH_BANDS = 32
+SHINGLE_WORDS = 5
+# Matches below this estimated similarity are not reported
+SIMILARITY_THRESHOLD = float(os.environ.get("CONTRACT_SIMILARITY_THRESHOLD", "0.8"))
+
+WORD = re.compile(r"[a-z0-9]+")
+_EMPTY = (1 << 64) - 1
+
+def _hash64(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+# ------------------------------
+# Streaming MinHash
+# ------------------------------
+class MinHasher:
+    # One-permutation MinHash: each word shingle is hashed once and lands in one of
+    # NUM_HASHES bins, which keeps the minimum. Empty bins are filled from their neighbours
+    # so short documents still get a full signature. Fed page by page like ContractAnalyzer.
+    def __init__(self):
+        self._bins = [_EMPTY] * NUM_HASHES
+        self._window = []
+        self._carry = ""
+
+    def add_page(self, page_text):
+        text = self._carry + page_text.lower()
+        words = WORD.findall(text)
+        self._carry = ""
+        if words and WORD.match(text[-1:]):
+            self._carry = words.pop()
+        self._add_words(words)
+
+    def _add_words(self, words):
+        window = self._window
+        for word in words:
+            window.append(word)
+            if len(window) > SHINGLE_WORDS:
+                del window[0]
+            if len(window) == SHINGLE_WORDS:
+                self._add_shingle(window)
+
+    def _add_shingle(self, words):
+        value = _hash64(" ".join(words).encode())
+        slot, rank = value % NUM_HASHES, value // NUM_HASHES
+        if rank < self._bins[slot]:
+            self._bins[slot] = rank
+
+    def signature(self):
+        if self._carry:
+            self._add_words([self._carry])
+            self._carry = ""
+        if 0 < len(self._window) < SHINGLE_WORDS:
+            self._add_shingle(self._window)  # shorter than one shingle: the whole text is the shingle
+        bins = self._bins
+        if all(value == _EMPTY for value in bins):
+            return None
+        signature = list(bins)
+        for slot in range(NUM_HASHES):
+            # Densify by rotation: an empty bin borrows the next filled bin's value, offset
+            # by the distance so that neighbouring empty bins don't all agree
+            if bins[slot] == _EMPTY:
+                offset = 1
+                while bins[(slot + offset) % NUM_HASHES] == _EMPTY:
+                    offset += 1
+                signature[slot] = (bins[(slot + offset) % NUM_HASHES] + offset * 0x9E3779B97F4A7C15) % _EMPTY
+        return signature
+
+def text_signature(text):
+    hasher = MinHasher()
+    hasher.add_page(text or "")
+    return hasher.signature()
+
+# ------------------------------
+# Signature Encoding and Comparison
+# ------------------------------
+def pack_signature(signature):
+    return array("Q", signature).tobytes()
+
+def unpack_signature(blob):
+    return array("Q", blob).tolist()
+
+def similarity(first, second):
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_HASHES
+
+def band_buckets(signature):
+    # One signed 64-bit bucket key per band so it fits an SQLite INTEGER
+    rows = NUM_HASHES // LSH_BANDS
+    return [
+        (band, int.from_bytes(hashlib.blake2b(pack_signature(signature[band * rows:(band + 1) * rows]), digest_size=8).digest(), "little", signed=True))
+        for band in range(LSH_BANDS)
+    ]
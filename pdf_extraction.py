@@ -0,0 +1,343 @@
+import difflib
+import hashlib
+import io
+import mmap
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from contextlib import contextmanager
+import PyPDF2
+from extraction_cache import content_hash, digest_key, get_cache
+from telemetry import span
+
+# Bump the trailing number whenever the extraction output changes shape
+EXTRACTOR_VERSION = f"pypdf2-{PyPDF2.__version__}-1"
+
+# Documents with at least this many pages are split across the process pool
+PARALLEL_PAGE_THRESHOLD = int(os.environ.get("CONTRACT_PARALLEL_PAGE_THRESHOLD", "64"))
+PARALLEL_WORKERS = int(os.environ.get("CONTRACT_EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+
+# Documents bigger than this reach pool workers as a temp file they memory-map rather than a
+# pickled copy each; batch runs share the same allowance across every file they hold at once.
+# Streams not yet in memory (paths aside) are spooled the same way instead of being read in.
+UPLOAD_MEMORY_CAP_MB = float(os.environ.get("CONTRACT_UPLOAD_MEMORY_CAP_MB", "32"))
+SPOOL_DIR = os.environ.get("CONTRACT_SPOOL_DIR") or None
+
+# ------------------------------
+# Read Uploaded PDF Bytes
+# ------------------------------
+def read_pdf_bytes(file):
+    if isinstance(file, (bytes, bytearray)):
+        return bytes(file)
+    with span("upload", getattr(file, "name", None) or str(file)):
+        if isinstance(file, (str, os.PathLike)):
+            with open(file, "rb") as f:
+                return f.read()
+        if hasattr(file, "getvalue"):
+            return file.getvalue()
+        file.seek(0)
+        return file.read()
+
+# ------------------------------
+# Spool Large Uploads to Disk
+# ------------------------------
+def upload_size(file):
+    if isinstance(file, (bytes, bytearray)):
+        return len(file)
+    if isinstance(file, (str, os.PathLike)):
+        return os.path.getsize(file)
+    if getattr(file, "size", None) is not None:
+        return file.size
+    if hasattr(file, "getbuffer"):
+        return file.getbuffer().nbytes
+    file.seek(0, os.SEEK_END)
+    return file.tell()
+
+def spool_pdf(file, memory_cap_bytes=UPLOAD_MEMORY_CAP_MB * 1024 * 1024):
+    # Returns bytes when the upload fits under the cap, otherwise a path on disk.
+    # Paths are passed through; any other path returned is a temp file the caller must remove.
+    if isinstance(file, (str, os.PathLike)) or upload_size(file) <= memory_cap_bytes:
+        return file if isinstance(file, (str, os.PathLike)) else read_pdf_bytes(file)
+    with span("upload", getattr(file, "name", None)):
+        fd, path = tempfile.mkstemp(prefix="contract-upload-", suffix=".pdf", dir=SPOOL_DIR)
+        with os.fdopen(fd, "wb") as f:
+            if isinstance(file, (bytes, bytearray)):
+                f.write(file)
+            elif hasattr(file, "getbuffer"):
+                f.write(file.getbuffer())  # writes straight from the upload's buffer without a copy
+            else:
+                file.seek(0)
+                shutil.copyfileobj(file, f, 1024 * 1024)
+    return path
+
+def remove_spooled(source, original):
+    if isinstance(source, str) and source is not original:
+        try:
+            os.remove(source)
+        except OSError:
+            pass
+
+@contextmanager
+def open_pdf_buffer(file, memory_cap_bytes=UPLOAD_MEMORY_CAP_MB * 1024 * 1024):
+    # Yields (source, buffer): the bytes-or-path that can be shipped to pool workers,
+    # and a buffer to hash and parse (the bytes themselves, or a read-only mmap of the file).
+    # Bytes and in-memory uploads are used where they are: spooling them here would write a
+    # new temp file on every call, once per pipeline step.
+    if isinstance(file, (bytes, bytearray)) or hasattr(file, "getvalue"):
+        data = read_pdf_bytes(file)
+        yield data, data
+        return
+    source = spool_pdf(file, memory_cap_bytes)
+    try:
+        if isinstance(source, bytes):
+            yield source, source
+        elif os.path.getsize(source) == 0:
+            yield source, b""
+        else:
+            with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                yield source, buffer
+    finally:
+        remove_spooled(source, file)
+
+def _pdf_stream(buffer):
+    # PdfReader reads an mmap in place; plain bytes need a file-like wrapper
+    return buffer if isinstance(buffer, mmap.mmap) else io.BytesIO(buffer)
+
+def open_pdf_reader(buffer):
+    # Files encrypted with only an owner password open with an empty user password
+    reader = PyPDF2.PdfReader(_pdf_stream(buffer))
+    if reader.is_encrypted and not reader.decrypt(""):
+        raise PyPDF2.errors.FileNotDecryptedError("The PDF is encrypted with a password")
+    return reader
+
+# ------------------------------
+# Shared Extraction Process Pool
+# ------------------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_extraction_pool():
+    # One pool per server process, shared by every session. Workers are spawned
+    # once up front rather than forking the threaded Streamlit process per request.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PARALLEL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def _extract_page(page):
+    with span("extract_page"):
+        return page.extract_text()
+
+def _extract_page_indices(source, indices):
+    # source is the PDF bytes or a path; workers map spooled files themselves instead of
+    # receiving a pickled copy of the whole document
+    with open_pdf_buffer(source) as (_, buffer):
+        reader = open_pdf_reader(buffer)
+        return [_extract_page(reader.pages[index]) for index in indices]
+
+def _iter_parallel_pages(source, indices):
+    chunk_size = max(1, -(-len(indices) // (PARALLEL_WORKERS * 4)))
+    pool = get_extraction_pool()
+    # Every chunk would carry its own pickled copy of large in-memory bytes, so those are
+    # spooled once here and the workers map the file instead
+    worker_source = spool_pdf(source)
+    futures = [
+        pool.submit(_extract_page_indices, worker_source, indices[start:start + chunk_size])
+        for start in range(0, len(indices), chunk_size)
+    ]
+    try:
+        # Chunks are collected in submission order so pages come back in document order
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+        # Cancelled chunks never start, but running ones still read the file until done
+        wait(futures)
+        remove_spooled(worker_source, source)
+
+# ------------------------------
+# Page Fingerprints
+# ------------------------------
+# Stream bytes under these keys can't change the extracted text (embedded font programs),
+# and neither can image data, so only their dictionaries are hashed
+TEXT_NEUTRAL_STREAM_KEYS = {"/FontFile", "/FontFile2", "/FontFile3"}
+
+def _object_digest(value, memo):
+    # Content hash of a PDF object and everything it references, independent of object
+    # numbers so a re-saved file fingerprints the same. memo caches indirect objects across
+    # the pages of one document (fonts and forms are usually shared).
+    generic = PyPDF2.generic
+    if isinstance(value, generic.IndirectObject):
+        key = (value.idnum, value.generation)
+        if key not in memo:
+            memo[key] = b"cycle"  # a reference back into an object still being hashed
+            memo[key] = _object_digest(value.get_object(), memo)
+        return memo[key]
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(value, generic.DictionaryObject):
+        digest.update(b"<<")
+        for key in sorted(value):
+            if key == "/Parent":
+                continue  # points back up the page tree, not part of the page
+            digest.update(key.encode())
+            if key not in TEXT_NEUTRAL_STREAM_KEYS:
+                digest.update(_object_digest(value.raw_get(key), memo))
+        if isinstance(value, generic.StreamObject) and value.get("/Subtype") != "/Image":
+            digest.update(value.get_data())
+        digest.update(b">>")
+    elif isinstance(value, generic.ArrayObject):
+        digest.update(b"[")
+        for item in value:
+            digest.update(_object_digest(item, memo))
+        digest.update(b"]")
+    else:
+        digest.update(repr(value).encode())
+    return digest.digest()
+
+def page_fingerprint(page, memo=None):
+    # Hash of the page's raw content streams (the drawing operators, before any text
+    # extraction) and of its /Resources, including fonts, ToUnicode maps and form XObjects,
+    # since the same operators can show different text under different resources. The
+    # extractor version is mixed in so an upgrade never reuses old text.
+    memo = {} if memo is None else memo
+    digest = hashlib.blake2b(EXTRACTOR_VERSION.encode(), digest_size=16)
+    contents = page.get("/Contents")
+    if contents is not None:
+        contents = contents.get_object()
+        for stream in (contents if isinstance(contents, PyPDF2.generic.ArrayObject) else [contents]):
+            digest.update(stream.get_object().get_data())
+    resources = page.raw_get("/Resources") if "/Resources" in page else None
+    digest.update(_object_digest(resources, memo) if resources is not None else b"")
+    return digest.hexdigest()
+
+def pdf_page_fingerprints(file):
+    with span("pdf_parse"), open_pdf_buffer(file) as (_, buffer):
+        memo = {}
+        return [page_fingerprint(page, memo) for page in open_pdf_reader(buffer).pages]
+
+def _page_ranges(numbers):
+    ranges = []
+    for number in numbers:
+        if ranges and ranges[-1][1] == number - 1:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+    return ", ".join(str(first) if first == last else f"{first}-{last}" for first, last in ranges)
+
+def compare_page_fingerprints(previous, current):
+    # Page-level change summary between two versions of a document. Page numbers refer to
+    # the current version, except "removed", which refers to the previous one.
+    changed, added, removed = [], [], []
+    matcher = difflib.SequenceMatcher(None, previous, current, autojunk=False)
+    for tag, first_start, first_stop, second_start, second_stop in matcher.get_opcodes():
+        if tag in ("replace", "insert"):
+            # A replaced run is "changed" page for page; any extra pages on either side are added or removed
+            overlap = min(first_stop - first_start, second_stop - second_start)
+            changed.extend(range(second_start + 1, second_start + overlap + 1))
+            added.extend(range(second_start + overlap + 1, second_stop + 1))
+            removed.extend(range(first_start + overlap + 1, first_stop + 1))
+        elif tag == "delete":
+            removed.extend(range(first_start + 1, first_stop + 1))
+    return {
+        "page_count": len(current),
+        "previous_page_count": len(previous),
+        "unchanged": len(current) - len(changed) - len(added),
+        "changed": changed,
+        "added": added,
+        "removed": removed,
+        "changed_ranges": _page_ranges(changed),
+        "added_ranges": _page_ranges(added),
+        "removed_ranges": _page_ranges(removed)
+    }
+
+# ------------------------------
+# Stream PDF Pages
+# ------------------------------
+def iter_pdf_pages(file, parallel=None, use_cache=True, known_pages=None, digest=None, fingerprints=None):
+    # Yields (page_number, page_count, page_text) as each page is parsed.
+    # parallel=None picks the process pool automatically for large documents.
+    # known_pages maps page fingerprints to text from an earlier version of the document;
+    # pages whose fingerprint is in it are reused, and only the others are extracted.
+    # fingerprints are the document's page fingerprints when the caller already has them,
+    # so pages aren't hashed a second time.
+    # digest is the document's content hash when the caller already has it, having looked
+    # the pages up with cached_document; the lookup here then isn't counted a second time.
+    with open_pdf_buffer(file) as (source, data):
+        key = digest_key(digest or content_hash(data), EXTRACTOR_VERSION) if use_cache else None
+        cache = get_cache() if use_cache else None
+        pages = cache.get(key, count=digest is None) if cache is not None else None
+        if pages is not None:
+            for page_number, page_text in enumerate(pages, start=1):
+                yield page_number, len(pages), page_text
+            return
+        with span("pdf_parse"):
+            reader = open_pdf_reader(data)
+            page_count = len(reader.pages)
+            if not known_pages:
+                fingerprints = [None] * page_count
+            elif fingerprints is None or len(fingerprints) != page_count:
+                memo = {}
+                fingerprints = [page_fingerprint(page, memo) for page in reader.pages]
+        missing = [index for index, fingerprint in enumerate(fingerprints) if fingerprint not in (known_pages or {})]
+        if parallel is None:
+            parallel = PARALLEL_WORKERS > 1 and len(missing) >= PARALLEL_PAGE_THRESHOLD
+        if parallel and missing:
+            extracted = _iter_parallel_pages(source, missing)
+        else:
+            extracted = (_extract_page(reader.pages[index]) for index in missing)
+        pages = []
+        for page_number, fingerprint in enumerate(fingerprints, start=1):
+            page_text = known_pages[fingerprint] if known_pages and fingerprint in known_pages else next(extracted)
+            pages.append(page_text)
+            yield page_number, page_count, page_text
+        if cache is not None:
+            cache.put(key, pages)
+
+# ------------------------------
+# Cached Document Lookups
+# ------------------------------
+def document_digest(file):
+    # Every cache key for a document derives from this one hash of its bytes
+    with open_pdf_buffer(file) as (_, data):
+        return content_hash(data)
+
+def cached_document(digest):
+    # Returns (pages, info) for a document already seen: the extracted pages (None if not
+    # cached) and a dict holding whatever of its preflight report and page fingerprints is
+    # known. A repeat upload then costs only the hash, not a parse. Only the pages lookup
+    # counts toward the cache hit rate.
+    cache = get_cache()
+    pages = cache.get(digest_key(digest, EXTRACTOR_VERSION))
+    return pages, cache.get(digest_key(digest, EXTRACTOR_VERSION + "-info"), count=False) or {}
+
+def remember_document_info(digest, **info):
+    cache = get_cache()
+    key = digest_key(digest, EXTRACTOR_VERSION + "-info")
+    cache.put(key, {**(cache.get(key, count=False) or {}), **info})
+
+def remember_document(digest, pages=None, info=None):
+    # Stores what a pool worker worked out about a document. Workers only read the cache and
+    # hand their results back, so every write happens in the one process that tracks the
+    # disk budget rather than in each worker's own copy of the cache.
+    if pages is not None:
+        get_cache().put(digest_key(digest, EXTRACTOR_VERSION), pages)
+    if info:
+        remember_document_info(digest, **info)
+
+def replay_pages(pages):
+    for page_number, page_text in enumerate(pages, start=1):
+        yield page_number, len(pages), page_text
+
+# ------------------------------
+# Extract PDF Text
+# ------------------------------
+def extract_pdf_pages(file, parallel=None, use_cache=True):
+    return [page_text for _, _, page_text in iter_pdf_pages(file, parallel, use_cache)]
+
+def extract_pdf_text(file, parallel=None, use_cache=True):
+    return "".join(extract_pdf_pages(file, parallel, use_cache)).strip()
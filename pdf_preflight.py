@@ -0,0 +1,85 @@
+import os
+import time
+import PyPDF2
+from pdf_extraction import PARALLEL_PAGE_THRESHOLD, PARALLEL_WORKERS, open_pdf_buffer, open_pdf_reader
+from telemetry import span
+
+# ------------------------------
+# Preflight Limits
+# ------------------------------
+# Only this many leading pages are extracted to sample the text layer and per-page cost
+PREFLIGHT_SAMPLE_PAGES = int(os.environ.get("CONTRACT_PREFLIGHT_SAMPLE_PAGES", "3"))
+PREFLIGHT_MAX_PAGES = int(os.environ.get("CONTRACT_PREFLIGHT_MAX_PAGES", "1000"))
+PREFLIGHT_WARN_PAGES = int(os.environ.get("CONTRACT_PREFLIGHT_WARN_PAGES", "300"))
+PREFLIGHT_MAX_EXTRACTION_MS = float(os.environ.get("CONTRACT_PREFLIGHT_MAX_EXTRACTION_MS", "120000"))
+PREFLIGHT_WARN_EXTRACTION_MS = float(os.environ.get("CONTRACT_PREFLIGHT_WARN_EXTRACTION_MS", "10000"))
+# Documents estimated to take longer than this sequentially go to the process pool
+PREFLIGHT_PARALLEL_MS = float(os.environ.get("CONTRACT_PREFLIGHT_PARALLEL_MS", "3000"))
+# Sampled pages averaging fewer characters than this are treated as having no text layer
+MIN_TEXT_CHARS_PER_PAGE = 20
+
+# ------------------------------
+# Preflight Check
+# ------------------------------
+def preflight_pdf(file):
+    # Reads the trailer and page tree and extracts only the first few pages. Returns a report
+    # with verdict "ok", "warn" or "reject", the reasons, and whether to extract in parallel.
+    report = {
+        "page_count": 0,
+        "encrypted": False,
+        "has_text_layer": False,
+        "sampled_pages": 0,
+        "estimated_ms": 0.0,
+        "parallel": False,
+        "verdict": "ok",
+        "reasons": []
+    }
+    with span("preflight"), open_pdf_buffer(file) as (_, buffer):
+        started = time.perf_counter()
+        try:
+            reader = open_pdf_reader(buffer)
+            page_count = len(reader.pages)
+        except PyPDF2.errors.FileNotDecryptedError:
+            report["encrypted"] = True
+            return _reject(report, "The PDF is encrypted with a password")
+        except Exception as error:
+            return _reject(report, f"Not a readable PDF ({error})")
+        report["encrypted"] = reader.is_encrypted
+        parse_ms = (time.perf_counter() - started) * 1000
+        report["page_count"] = page_count
+        if page_count == 0:
+            return _reject(report, "The PDF has no pages")
+
+        sampled = min(page_count, PREFLIGHT_SAMPLE_PAGES)
+        started = time.perf_counter()
+        characters = sum(len((reader.pages[index].extract_text() or "").strip()) for index in range(sampled))
+        per_page_ms = (time.perf_counter() - started) * 1000 / sampled
+    report["sampled_pages"] = sampled
+    report["has_text_layer"] = characters >= MIN_TEXT_CHARS_PER_PAGE * sampled
+
+    sequential_ms = parse_ms + per_page_ms * page_count
+    report["parallel"] = PARALLEL_WORKERS > 1 and (page_count >= PARALLEL_PAGE_THRESHOLD or sequential_ms >= PREFLIGHT_PARALLEL_MS)
+    report["estimated_ms"] = parse_ms + per_page_ms * page_count / (PARALLEL_WORKERS if report["parallel"] else 1)
+
+    if not report["has_text_layer"]:
+        _reject(report, f"No text layer in the first {sampled} page(s); this looks like a scanned image and needs OCR first")
+    if page_count > PREFLIGHT_MAX_PAGES:
+        _reject(report, f"{page_count:,} pages is over the {PREFLIGHT_MAX_PAGES:,}-page limit")
+    elif page_count > PREFLIGHT_WARN_PAGES:
+        _warn(report, f"Large document ({page_count:,} pages)")
+    if report["estimated_ms"] > PREFLIGHT_MAX_EXTRACTION_MS:
+        _reject(report, f"Estimated extraction time {report['estimated_ms'] / 1000:.0f}s is over the {PREFLIGHT_MAX_EXTRACTION_MS / 1000:.0f}s limit")
+    elif report["estimated_ms"] > PREFLIGHT_WARN_EXTRACTION_MS:
+        _warn(report, f"Extraction will take about {report['estimated_ms'] / 1000:.0f}s")
+    return report
+
+def _reject(report, reason):
+    report["verdict"] = "reject"
+    report["reasons"].append(reason)
+    return report
+
+def _warn(report, reason):
+    if report["verdict"] == "ok":
+        report["verdict"] = "warn"
+    report["reasons"].append(reason)
+    return report
@@ -0,0 +1,111 @@
+import os
+import random
+import re
+import time
+import numpy as np
+
+# ------------------------------
+# Summarizer Settings
+# ------------------------------
+# Past this many seconds the caller falls back to the prefix summary
+SUMMARY_BUDGET_SECONDS = float(os.environ.get("CONTRACT_SUMMARY_BUDGET_SECONDS", "0.5"))
+# Long documents are reduced to a reservoir sample of this many sentences before ranking
+MAX_SENTENCES = 3000
+MAX_FEATURES = 2048
+SIMILARITY_BATCH = 512
+MIN_SENTENCE_WORDS = 6
+
+SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+WORD = re.compile(r"[a-z][a-z0-9]+")
+STOPWORDS = frozenset(
+    "the and for that this with shall any all such other from are not have has been will may its their "
+    "which who whom under upon into than then there these those each either party parties agreement".split()
+)
+
+# ------------------------------
+# Streaming Sentence Sampler
+# ------------------------------
+class SentenceSampler:
+    # Collects sentences from streamed pages and keeps a fixed-size, deterministic reservoir
+    # sample, so memory stays bounded however long the document is
+    def __init__(self, capacity=MAX_SENTENCES):
+        self.capacity = capacity
+        self.sentences = []  # (position, sentence)
+        self._seen = 0
+        self._carry = ""
+        self._random = random.Random(0)
+
+    def add_page(self, page_text):
+        parts = SENTENCE_END.split(self._carry + page_text)
+        self._carry = parts.pop()
+        for sentence in parts:
+            self._add(sentence)
+
+    def _add(self, sentence):
+        sentence = " ".join(sentence.split())
+        if len(sentence.split()) < MIN_SENTENCE_WORDS:
+            return
+        self._seen += 1
+        if len(self.sentences) < self.capacity:
+            self.sentences.append((self._seen, sentence))
+        else:
+            slot = self._random.randrange(self._seen)
+            if slot < self.capacity:
+                self.sentences[slot] = (self._seen, sentence)
+
+    def finish(self):
+        if self._carry:
+            self._add(self._carry)
+            self._carry = ""
+        return [sentence for _, sentence in sorted(self.sentences)]
+
+# ------------------------------
+# TF-IDF Centrality Summary
+# ------------------------------
+def _tfidf_matrix(sentences):
+    tokens = [[word for word in WORD.findall(sentence.lower()) if word not in STOPWORDS] for sentence in sentences]
+    document_frequency = {}
+    for words in tokens:
+        for word in set(words):
+            document_frequency[word] = document_frequency.get(word, 0) + 1
+    vocabulary = sorted(document_frequency, key=lambda word: (-document_frequency[word], word))[:MAX_FEATURES]
+    column = {word: index for index, word in enumerate(vocabulary)}
+    rows, columns = [], []
+    for row, words in enumerate(tokens):
+        for word in words:
+            index = column.get(word)
+            if index is not None:
+                rows.append(row)
+                columns.append(index)
+    matrix = np.zeros((len(sentences), len(vocabulary)), dtype=np.float32)
+    np.add.at(matrix, (np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)), 1.0)
+    frequency = np.array([document_frequency[word] for word in vocabulary], dtype=np.float32)
+    matrix *= np.log((1 + len(sentences)) / (1 + frequency)) + 1
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+def summarize(sentences, max_chars, budget_seconds=SUMMARY_BUDGET_SECONDS):
+    # Ranks sentences by their total cosine similarity to every other sentence (degree
+    # centrality over TF-IDF vectors) and returns the top ones in document order. Returns
+    # None when there is too little text or the time budget runs out.
+    deadline = time.perf_counter() + budget_seconds
+    if len(sentences) < 2:
+        return None
+    matrix = _tfidf_matrix(sentences)
+    centrality = np.zeros(len(sentences), dtype=np.float32)
+    for start in range(0, len(sentences), SIMILARITY_BATCH):
+        if time.perf_counter() > deadline:
+            return None
+        block = matrix[start:start + SIMILARITY_BATCH] @ matrix.T
+        centrality[start:start + SIMILARITY_BATCH] = block.sum(axis=1)
+    chosen, seen, length = [], set(), 0
+    for index in np.argsort(-centrality, kind="stable"):
+        if sentences[index] in seen:
+            continue  # repeated boilerplate would otherwise fill the summary with copies
+        if length + len(sentences[index]) > max_chars and chosen:
+            break
+        chosen.append(index)
+        seen.add(sentences[index])
+        length += len(sentences[index]) + 1
+    summary = " ".join(sentences[index] for index in sorted(chosen))
+    return summary[:max_chars]
@@ -0,0 +1,225 @@
+import atexit
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# ------------------------------
+# Telemetry Settings
+# ------------------------------
+TELEMETRY_DB_PATH = os.environ.get("CONTRACT_TELEMETRY_DB", "telemetry.db")
+# Spans wait in this ring buffer until the flusher writes them; if it falls behind the oldest are dropped
+RING_SIZE = int(os.environ.get("CONTRACT_TELEMETRY_RING_SIZE", "10000"))
+FLUSH_INTERVAL_SECONDS = float(os.environ.get("CONTRACT_TELEMETRY_FLUSH_SECONDS", "2"))
+RETENTION_DAYS = float(os.environ.get("CONTRACT_TELEMETRY_RETENTION_DAYS", "7"))
+# When set, every flush also rewrites this file in Prometheus text format (textfile collector)
+PROMETHEUS_FILE = os.environ.get("CONTRACT_PROMETHEUS_FILE")
+# Percentiles are computed over at most this many recent spans per stage
+PERCENTILE_SAMPLE = 5000
+
+STAGES = ["upload", "preflight", "pdf_parse", "extract_page", "analysis", "save", "store_read"]
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+# ------------------------------
+# Span Recorder
+# ------------------------------
+class Telemetry:
+    def __init__(self, path=TELEMETRY_DB_PATH, ring_size=RING_SIZE, flush_interval=FLUSH_INTERVAL_SECONDS):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._ring = deque(maxlen=ring_size)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+        self._last_prune = 0.0
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS spans ("
+                "id INTEGER PRIMARY KEY, stage TEXT NOT NULL, started_at REAL NOT NULL, "
+                "duration_ms REAL NOT NULL, document TEXT, pages INTEGER)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS idx_spans_stage_started ON spans (stage, started_at)")
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def record(self, stage, duration_ms, document=None, pages=None):
+        with self._lock:
+            if len(self._ring) == self._ring.maxlen:
+                self.dropped += 1
+            self._ring.append((stage, time.time() - duration_ms / 1000, duration_ms, document, pages))
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="telemetry-flusher", daemon=True)
+                self._flusher.start()
+
+    @contextmanager
+    def span(self, stage, document=None, pages=None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - started) * 1000, document, pages)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass  # telemetry must never take the app down; spans stay buffered for the next try
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._ring)
+                self._ring.clear()
+            if not batch:
+                return 0
+            try:
+                with self._connect() as connection:
+                    connection.executemany(
+                        "INSERT INTO spans (stage, started_at, duration_ms, document, pages) VALUES (?, ?, ?, ?, ?)", batch
+                    )
+                    if time.time() - self._last_prune > 3600:
+                        connection.execute("DELETE FROM spans WHERE started_at < ?", (time.time() - RETENTION_DAYS * 86400,))
+                        self._last_prune = time.time()
+            except sqlite3.Error:
+                with self._lock:
+                    # Spans recorded during the failed write are newer than the batch, so when
+                    # they don't all fit back in the ring it is the batch's oldest that are dropped
+                    kept = batch[max(0, len(batch) - (self._ring.maxlen - len(self._ring))):]
+                    self.dropped += len(batch) - len(kept)
+                    self._ring.extendleft(reversed(kept))
+                raise
+            if PROMETHEUS_FILE:
+                write_prometheus_file(PROMETHEUS_FILE, self)
+            return len(batch)
+
+    # ------------------------------
+    # Queries for the Operations Panel
+    # ------------------------------
+    def stage_summary(self, hours=24):
+        since = time.time() - hours * 3600
+        summary = []
+        with self._connect() as connection:
+            # Stage names are walked through the (stage, started_at) index one MIN() at a time, so
+            # listing them costs one index seek per stage rather than a scan of the whole table
+            stages = [row[0] for row in connection.execute(
+                "WITH RECURSIVE names(stage) AS ("
+                "SELECT MIN(stage) FROM spans UNION ALL "
+                "SELECT (SELECT MIN(stage) FROM spans WHERE stage > names.stage) FROM names WHERE stage IS NOT NULL"
+                ") SELECT stage FROM names WHERE stage IS NOT NULL"
+            )]
+            for stage in sorted(stages, key=lambda name: STAGES.index(name) if name in STAGES else len(STAGES)):
+                count, total = connection.execute(
+                    "SELECT COUNT(*), SUM(duration_ms) FROM spans WHERE stage = ? AND started_at >= ?", (stage, since)
+                ).fetchone()
+                if not count:
+                    continue
+                durations = sorted(row[0] for row in connection.execute(
+                    "SELECT duration_ms FROM spans WHERE stage = ? AND started_at >= ? ORDER BY started_at DESC LIMIT ?",
+                    (stage, since, PERCENTILE_SAMPLE),
+                ))
+                summary.append({
+                    "stage": stage,
+                    "count": count,
+                    "sum_ms": total or 0.0,
+                    "p50_ms": percentile(durations, 0.50),
+                    "p95_ms": percentile(durations, 0.95),
+                    "p99_ms": percentile(durations, 0.99),
+                })
+        return summary
+
+    def slowest_documents(self, hours=24, limit=10):
+        since = time.time() - hours * 3600
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT document, duration_ms, pages, started_at FROM spans "
+                "WHERE stage = 'analysis' AND started_at >= ? AND document IS NOT NULL "
+                "ORDER BY duration_ms DESC LIMIT ?",
+                (since, limit),
+            ).fetchall()
+        return [{"document": d, "duration_ms": ms, "pages": p, "started_at": s} for d, ms, p, s in rows]
+
+    def throughput(self, hours=24, bucket_seconds=300):
+        since = time.time() - hours * 3600
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT CAST(started_at / ? AS INTEGER) * ? AS bucket, COUNT(*), COALESCE(SUM(pages), 0) FROM spans "
+                "WHERE stage = 'analysis' AND started_at >= ? GROUP BY bucket ORDER BY bucket",
+                (bucket_seconds, bucket_seconds, since),
+            ).fetchall()
+        return [{"bucket": bucket, "documents": documents, "pages": pages} for bucket, documents, pages in rows]
+
+# ------------------------------
+# Prometheus Text Export
+# ------------------------------
+def prometheus_text(telemetry=None, hours=24):
+    telemetry = telemetry or get_telemetry()
+    lines = [
+        "# HELP contract_stage_duration_ms Stage latency over the reporting window.",
+        "# TYPE contract_stage_duration_ms summary",
+    ]
+    for row in telemetry.stage_summary(hours):
+        label = f'stage="{row["stage"]}"'
+        for quantile, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+            lines.append(f'contract_stage_duration_ms{{{label},quantile="{quantile}"}} {row[key]:.3f}')
+        lines.append(f"contract_stage_duration_ms_sum{{{label}}} {row['sum_ms']:.3f}")
+        lines.append(f"contract_stage_duration_ms_count{{{label}}} {row['count']}")
+    lines.append("# HELP contract_telemetry_dropped_spans_total Spans dropped because the ring buffer was full.")
+    lines.append("# TYPE contract_telemetry_dropped_spans_total counter")
+    lines.append(f"contract_telemetry_dropped_spans_total {telemetry.dropped}")
+    return "\n".join(lines) + "\n"
+
+def write_prometheus_file(path, telemetry=None):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(prometheus_text(telemetry))
+    os.replace(tmp_path, path)
+
+# ------------------------------
+# Shared Process-Wide Instance
+# ------------------------------
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+def get_telemetry():
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            _telemetry = Telemetry()
+            atexit.register(_telemetry.flush)
+        return _telemetry
+
+def span(stage, document=None, pages=None):
+    return get_telemetry().span(stage, document, pages)
+
+# ------------------------------
+# Command Line
+# ------------------------------
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "prometheus":
+        if len(sys.argv) > 2:
+            write_prometheus_file(sys.argv[2])
+        else:
+            sys.stdout.write(prometheus_text())
+    else:
+        print("Usage: python telemetry.py prometheus [output_file]")
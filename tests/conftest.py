@@ -0,0 +1,28 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# The modules live at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Telemetry and the extraction cache write next to the working directory by default; tests
+# keep them in a scratch directory instead
+_scratch = tempfile.mkdtemp(prefix="contract-tests-")
+os.environ.setdefault("CONTRACT_TELEMETRY_DB", os.path.join(_scratch, "telemetry.db"))
+os.environ.setdefault("CONTRACT_CACHE_DIR", os.path.join(_scratch, "extraction_cache"))
+
+from benchmarks import text_pdf
+
+def build_pdf(pages, base_font="Helvetica", padding=0):
+    # One page per string, one line per newline
+    return text_pdf([text.split("\n") for text in pages], base_font, padding)
+
+@pytest.fixture
+def make_pdf():
+    return build_pdf
+
+@pytest.fixture
+def store(tmp_path):
+    from contract_store import ContractStore
+    return ContractStore(str(tmp_path / "contracts.db"), legacy_dir=None)
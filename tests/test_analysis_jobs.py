@@ -0,0 +1,47 @@
+import io
+import tempfile
+import time
+import analysis_jobs
+import extraction_cache
+import pdf_extraction
+
+def wait_for(job_id):
+    job = analysis_jobs.get_job(job_id)
+    deadline = time.time() + 30
+    while not job.done and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+def test_in_memory_bytes_are_never_spooled(make_pdf, monkeypatch):
+    spooled = []
+    original = tempfile.mkstemp
+    monkeypatch.setattr(tempfile, "mkstemp", lambda *args, **kwargs: spooled.append(args) or original(*args, **kwargs))
+    data = make_pdf(["Termination on notice."] * 3)
+    with pdf_extraction.open_pdf_buffer(data, memory_cap_bytes=10) as (source, buffer):
+        assert source is data and buffer is data
+    upload = io.BytesIO(data)
+    with pdf_extraction.open_pdf_buffer(upload, memory_cap_bytes=10) as (source, buffer):
+        assert buffer == data
+    assert spooled == []
+
+def test_job_reads_an_upload_without_temp_files(make_pdf, monkeypatch):
+    spooled = []
+    original = tempfile.mkstemp
+    monkeypatch.setattr(tempfile, "mkstemp", lambda *args, **kwargs: spooled.append(args) or original(*args, **kwargs))
+    upload = io.BytesIO(make_pdf(["Either party may terminate.", "Payment is due within 30 days."]))
+    upload.name = "contract.pdf"
+    job = wait_for(analysis_jobs.submit_analysis_job(upload))
+    assert (job.status, job.error, job.page_count) == ("done", None, 2)
+    assert job.result["clauses_found"] == ["termination"]
+    assert spooled == []
+
+def test_each_upload_counts_as_one_cache_lookup(make_pdf, monkeypatch, tmp_path):
+    cache = extraction_cache.ExtractionCache(directory=str(tmp_path / "cache"))
+    monkeypatch.setattr(extraction_cache, "_cache", cache)
+    data = make_pdf(["Confidential information stays private.", "Governed by the laws of Ontario."])
+    first = wait_for(analysis_jobs.submit_analysis_job(io.BytesIO(data)))
+    assert first.status == "done"
+    assert (cache.memory_hits + cache.disk_hits, cache.misses) == (0, 1)
+    second = wait_for(analysis_jobs.submit_analysis_job(io.BytesIO(data)))
+    assert second.result["clauses_found"] == first.result["clauses_found"]
+    assert (cache.memory_hits + cache.disk_hits, cache.misses) == (1, 1)
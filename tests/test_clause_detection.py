@@ -0,0 +1,62 @@
+from clause_detection import ClauseAutomaton, ClauseScanner, DEFAULT_CLAUSE_RULES, WORD
+
+RULES = {
+    "cap": {"label": "Cap", "weight": 1.0, "patterns": ["limit of liability"]},
+    "liability": {"label": "Liability", "weight": 1.0, "patterns": ["liability cap"]},
+    "limits": {"label": "Limits", "weight": 2.0, "patterns": ["limit of time"]},
+}
+
+def scan(automaton, text):
+    found = {}
+    automaton.scan(WORD.findall(text.lower()), 0, found, 1)
+    return found
+
+def test_overlapping_patterns_are_found_through_failure_links():
+    automaton = ClauseAutomaton(RULES)
+    assert set(scan(automaton, "The limit of liability cap applies.")) == {"cap", "liability"}
+
+def test_partial_match_falls_back_and_still_matches():
+    # "limit of" starts both patterns; the scan must recover when "time" doesn't follow
+    automaton = ClauseAutomaton(RULES)
+    assert set(scan(automaton, "a limit of limit of liability")) == {"cap"}
+    assert set(scan(automaton, "a limit of limit of time")) == {"limits"}
+
+def test_matching_ignores_case_and_punctuation():
+    automaton = ClauseAutomaton(RULES)
+    assert set(scan(automaton, "LIMIT-OF, Liability!")) == {"cap"}
+
+def test_words_must_match_whole():
+    automaton = ClauseAutomaton(RULES)
+    assert scan(automaton, "limits of liability") == {}
+
+def test_scanner_records_first_page_and_joins_split_words():
+    scanner = ClauseScanner(ClauseAutomaton(RULES))
+    scanner.add_page("Nothing here. The limit of liab")
+    scanner.add_page("ility is set. Limit of time.")
+    scanner.add_page("limit of liability again")
+    assert scanner.finish() == {"cap": 2, "limits": 2}
+
+def test_match_at_the_very_end_is_kept():
+    scanner = ClauseScanner(ClauseAutomaton(RULES))
+    scanner.add_page("subject to the liability ca")
+    scanner.add_page("p")
+    assert scanner.finish() == {"liability": 2}
+
+def test_result_scores_by_weight():
+    scanner = ClauseScanner(ClauseAutomaton(RULES))
+    scanner.add_page("limit of time")
+    result = scanner.result()
+    assert result["clause_score"] == 0.5
+    assert result["clauses_found"] == ["limits"]
+    assert result["clauses_missing"] == ["cap", "liability"]
+
+def test_default_rules_mark_a_complete_contract_healthy():
+    scanner = ClauseScanner(ClauseAutomaton(DEFAULT_CLAUSE_RULES))
+    scanner.add_page(
+        "Either party may terminate. Aggregate liability is capped. Supplier shall indemnify Customer. "
+        "This Agreement is governed by the laws of Ontario. Confidential information stays private. "
+        "Invoices are payable within 30 days."
+    )
+    result = scanner.result()
+    assert result["contract_health"] == "Healthy"
+    assert result["clauses_missing"] == []
@@ -0,0 +1,87 @@
+import random
+import contract_diff
+from contract_diff import _longest_increasing, compare_results, compare_texts, diff_blocks, split_blocks, word_diff
+
+def apply(opcodes, old, new):
+    # Rebuilds new from old using only the opcodes, checking they tile both sides in order
+    rebuilt, old_at, new_at = [], 0, 0
+    for tag, old_start, old_stop, new_start, new_stop in opcodes:
+        assert (old_start, new_start) == (old_at, new_at)
+        if tag == "equal":
+            assert old[old_start:old_stop] == new[new_start:new_stop]
+        rebuilt.extend(new[new_start:new_stop])
+        old_at, new_at = old_stop, new_stop
+    assert (old_at, new_at) == (len(old), len(new))
+    return rebuilt
+
+def test_blocks_survive_rewrapping():
+    assert split_blocks("First  clause\nwraps here.\nSecond clause.\n\n\nThird") == [
+        "First clause wraps here.", "Second clause.", "Third"
+    ]
+    assert split_blocks("A line\nthat continues") == ["A line that continues"]
+
+def test_long_paragraphs_are_split_into_sentences(monkeypatch):
+    monkeypatch.setattr(contract_diff, "MAX_BLOCK_CHARS", 30)
+    assert split_blocks("One short sentence here. Another one follows; and a third!") == [
+        "One short sentence here.", "Another one follows;", "and a third!"
+    ]
+
+def test_longest_increasing_keeps_the_longest_ordered_chain():
+    assert _longest_increasing([(0, 3), (1, 1), (2, 2), (3, 0), (4, 4)]) == [(1, 1), (2, 2), (4, 4)]
+    assert _longest_increasing([(0, 2), (1, 1), (2, 0)]) in ([(0, 2)], [(1, 1)], [(2, 0)])
+    assert _longest_increasing([]) == []
+
+def test_unique_blocks_anchor_the_diff():
+    old = ["Heading A", "same", "Heading B", "old body", "same", "Heading C"]
+    new = ["Heading A", "same", "Heading B", "new body", "extra", "same", "Heading C"]
+    opcodes = diff_blocks(old, new)
+    assert apply(opcodes, old, new) == new
+    assert [opcode for opcode in opcodes if opcode[0] != "equal"] == [("replace", 3, 4, 3, 5)]
+
+def test_moved_paragraph_is_one_delete_and_one_insert():
+    old = ["alpha", "beta", "gamma", "delta", "epsilon"]
+    new = ["alpha", "gamma", "delta", "beta", "epsilon"]
+    opcodes = diff_blocks(old, new)
+    assert apply(opcodes, old, new) == new
+    assert sorted(opcode[0] for opcode in opcodes if opcode[0] != "equal") == ["delete", "insert"]
+
+def test_random_edits_always_produce_valid_opcodes():
+    rng = random.Random(7)
+    for _ in range(200):
+        old = [rng.choice("abcdefgh") for _ in range(rng.randrange(0, 30))]
+        new = list(old)
+        for _ in range(rng.randrange(0, 6)):
+            position = rng.randrange(0, len(new) + 1)
+            if new and rng.random() < 0.5:
+                del new[min(position, len(new) - 1)]
+            else:
+                new.insert(position, rng.choice("abcdefghxyz"))
+        assert apply(diff_blocks(old, new), old, new) == new
+
+def test_huge_unanchored_stretch_is_one_replace(monkeypatch):
+    monkeypatch.setattr(contract_diff, "MAX_FALLBACK_CELLS", 10)
+    old, new = ["x", "y"] * 5, ["y", "x"] * 5
+    assert diff_blocks(old, new) == [("replace", 0, 10, 0, 10)]
+
+def test_compare_texts_counts_blocks_and_tags_clauses():
+    old = "Either party may terminate on notice.\n\nGoods are delivered weekly.\n\nPayment is due in full."
+    new = "Either party may terminate on 30 days notice.\n\nGoods are delivered weekly.\n\nSupplier shall indemnify Customer."
+    comparison = compare_texts(old, new)
+    assert (comparison["unchanged_blocks"], comparison["changed_blocks"]) == (1, 2)
+    assert [hunk["clauses"] for hunk in comparison["hunks"]] == [["termination"], ["indemnity"]]
+    assert compare_texts(old, old)["hunks"] == []
+
+def test_compare_results_reports_clause_deltas():
+    deltas = compare_results(
+        {"word_count": 100, "clause_score": 0.5, "clauses_found": ["termination"], "contract_health": "Unhealthy"},
+        {"word_count": 120, "clause_score": 0.667, "clauses_found": ["indemnity", "termination"], "contract_health": "Healthy"},
+    )
+    assert deltas["word_count_delta"] == 20 and deltas["clause_score_delta"] == 0.167
+    assert (deltas["clauses_gained"], deltas["clauses_lost"]) == (["indemnity"], [])
+
+def test_word_diff_rebuilds_both_sides(monkeypatch):
+    segments = word_diff("pay within 30 days of invoice", "pay within 60 days of receipt")
+    assert " ".join(text for tag, text in segments if tag != "insert") == "pay within 30 days of invoice"
+    assert " ".join(text for tag, text in segments if tag != "delete") == "pay within 60 days of receipt"
+    monkeypatch.setattr(contract_diff, "MAX_INLINE_WORDS", 3)
+    assert word_diff("a b c d", "a b") is None
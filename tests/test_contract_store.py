@@ -0,0 +1,140 @@
+import json
+import pytest
+import contract_store
+from contract_store import ContractStore, MIGRATIONS
+
+def schema_version(store):
+    return store.connection.execute("PRAGMA user_version").fetchone()[0]
+
+def test_new_store_is_at_the_latest_version(store):
+    assert schema_version(store) == len(MIGRATIONS)
+
+def test_reopening_keeps_data_and_version(store):
+    evaluation_id = store.save("ann", {"summary": "kept", "word_count": 3, "contract_health": "Healthy"}, text="kept text")
+    reopened = ContractStore(store.path, legacy_dir=None)
+    assert schema_version(reopened) == len(MIGRATIONS)
+    assert reopened.get(evaluation_id)["summary"] == "kept"
+    assert reopened.text(evaluation_id) == "kept text"
+
+@pytest.mark.parametrize("version", range(len(MIGRATIONS)))
+def test_every_version_upgrades_to_the_latest(tmp_path, monkeypatch, version):
+    path = str(tmp_path / "contracts.db")
+    monkeypatch.setattr(contract_store, "MIGRATIONS", MIGRATIONS[:version])
+    ContractStore(path, legacy_dir=None).connection.close()
+    monkeypatch.undo()
+    store = ContractStore(path, legacy_dir=None)
+    assert schema_version(store) == len(MIGRATIONS)
+    evaluation_id = store.save("ann", {"summary": "upgraded", "word_count": 5, "contract_health": "Healthy"}, text="governing law")
+    assert [row["id"] for row in store.search("governing")] == [evaluation_id]
+    assert store.totals()["evaluations"] == 1
+
+def test_failed_migration_leaves_the_version_untouched(tmp_path, monkeypatch):
+    path = str(tmp_path / "contracts.db")
+    monkeypatch.setattr(contract_store, "MIGRATIONS", MIGRATIONS + [("CREATE TABLE broken (",)])
+    with pytest.raises(Exception):
+        ContractStore(path, legacy_dir=None)
+    monkeypatch.undo()
+    assert schema_version(ContractStore(path, legacy_dir=None)) == len(MIGRATIONS)
+
+def test_legacy_json_files_are_imported_once(tmp_path):
+    legacy = tmp_path / "saved_contracts"
+    legacy.mkdir()
+    (legacy / "ann_20260105_093000.json").write_text(json.dumps({"summary": "old", "word_count": 7, "contract_health": "Healthy"}))
+    (legacy / "bob_20260106_101500_2.json").write_text(json.dumps({"summary": "batch", "word_count": 9, "contract_health": "Unhealthy"}))
+    (legacy / "notes.txt").write_text("ignored")
+    store = ContractStore(str(tmp_path / "contracts.db"), legacy_dir=str(legacy))
+    assert [(row["username"], row["created_at"]) for row in store.iter_evaluations()] == [
+        ("ann", "2026-01-05 09:30:00"), ("bob", "2026-01-06 10:15:00")
+    ]
+    assert store.import_json_directory(str(legacy)) == 0
+    assert store.totals()["evaluations"] == 2
+
+ROLLUP_TABLES = [
+    "totals", "user_rollups", "daily_rollups", "hourly_rollups", "user_daily_rollups", "word_count_buckets",
+    "daily_activity", "session_lengths",
+]
+
+def rollup_snapshot(store):
+    snapshot = {}
+    for table in ROLLUP_TABLES:
+        rows = store.connection.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall()
+        snapshot[table] = [tuple(round(value, 6) if isinstance(value, float) else value for value in row) for row in rows]
+    return snapshot
+
+def seed_activity(store, monkeypatch):
+    saves = [
+        ("ann", "2026-03-01 09:15:00", {"word_count": 80, "contract_health": "Healthy", "processing_ms": 120.5}),
+        ("ann", "2026-03-01 09:45:00", {"word_count": 480, "contract_health": "Unhealthy", "processing_ms": 300.25}),
+        ("bob", "2026-03-01 17:05:00", {"word_count": 12000, "contract_health": "Healthy"}),
+        ("bob", "2026-03-02 08:00:00", {"word_count": None, "contract_health": None, "processing_ms": 55.0}),
+        ("cat", "2026-03-04 23:59:59", {"word_count": 250, "contract_health": "Healthy", "processing_ms": 990.0}),
+    ]
+    for username, created_at, result in saves:
+        monkeypatch.setattr(contract_store, "_now", lambda created_at=created_at: created_at)
+        store.save(username, {"summary": "s", **result})
+    store.save_many("ann", [{"word_count": 1000, "contract_health": "Healthy", "processing_ms": 10.0}] * 3)
+    store.record_events([
+        {"occurred_at": "2026-03-01 09:00:00", "username": "ann", "event": "login", "session_id": "a"},
+        {"occurred_at": "2026-03-01 09:50:00", "username": "ann", "event": "save", "session_id": "a"},
+        {"occurred_at": "2026-03-01 10:00:00", "username": "ann", "event": "logout", "session_id": "a", "duration_seconds": 3600},
+        {"occurred_at": "2026-03-02 08:00:00", "username": "bob", "event": "signup", "session_id": "b"},
+        {"occurred_at": "2026-03-02 08:02:00", "username": "bob", "event": "logout", "session_id": "b", "duration_seconds": 120},
+    ])
+
+def test_rollup_rebuild_matches_incremental_rollups(store, monkeypatch):
+    seed_activity(store, monkeypatch)
+    incremental = rollup_snapshot(store)
+    assert store.rebuild_rollups() == {"evaluations": 8, "users": 3, "events": 5}
+    assert rollup_snapshot(store) == incremental
+
+def test_dashboard_rollups_are_backfilled_on_upgrade(tmp_path, monkeypatch):
+    path = str(tmp_path / "contracts.db")
+    incremental = ContractStore(str(tmp_path / "incremental.db"), legacy_dir=None)
+    seed_activity(incremental, monkeypatch)
+    expected = rollup_snapshot(incremental)
+
+    monkeypatch.setattr(contract_store, "MIGRATIONS", MIGRATIONS[:-1])
+    old = ContractStore(path, legacy_dir=None)
+    rows = incremental.connection.execute(
+        "SELECT username, created_at, word_count, contract_health, body FROM evaluations ORDER BY id"
+    ).fetchall()
+    old.connection.executemany(
+        "INSERT INTO evaluations (username, created_at, word_count, contract_health, body) VALUES (?, ?, ?, ?, ?)", rows
+    )
+    events = incremental.connection.execute(
+        "SELECT occurred_at, username, event, session_id, duration_seconds, detail FROM events ORDER BY id"
+    ).fetchall()
+    old.connection.executemany(
+        "INSERT INTO events (occurred_at, username, event, session_id, duration_seconds, detail) VALUES (?, ?, ?, ?, ?, ?)", events
+    )
+    with old._transaction() as connection:
+        for statement in contract_store.ROLLUP_REBUILD + contract_store.EVENT_ROLLUP_REBUILD:
+            connection.execute(statement)
+    old.connection.close()
+    monkeypatch.undo()
+    assert rollup_snapshot(ContractStore(path, legacy_dir=None)) == expected
+
+def test_activity_series_fill_empty_periods(store, monkeypatch):
+    today = contract_store.datetime.now()
+    monkeypatch.setattr(contract_store, "_now", lambda: today.strftime("%Y-%m-%d %H:%M:%S"))
+    for username in ["ann", "ann", "bob", "cat"]:
+        store.save(username, {"word_count": 10, "contract_health": "Healthy", "processing_ms": 5.0})
+
+    days = store.activity_series("day", 7)
+    assert [row["period"] for row in days] == [
+        (today - contract_store.timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(6, -1, -1)
+    ]
+    assert [row["evaluations"] for row in days] == [0] * 6 + [4]
+    assert len(store.activity_series("hour", 24)) == 24
+
+    by_user = store.user_activity_series(days=7, top_users=2)
+    assert list(by_user) == [row["period"] for row in days]
+    assert all(counts == {"ann": 0, "bob": 0, "Other": 0} for counts in list(by_user.values())[:-1])
+    assert by_user[days[-1]["period"]] == {"ann": 2, "bob": 1, "Other": 1}
+
+def test_word_count_distribution_lists_every_bucket(store):
+    for words in [0, 99, 100, 150000]:
+        store.save("ann", {"word_count": words})
+    distribution = {row["bucket_words"]: row["evaluations"] for row in store.word_count_distribution()}
+    assert list(distribution) == contract_store.WORD_COUNT_BUCKETS
+    assert (distribution[0], distribution[100], distribution[100000], distribution[500]) == (2, 1, 1, 0)
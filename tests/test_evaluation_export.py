@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+import pytest
+import contract_store
+import evaluation_export
+from evaluation_export import export_chunk_bytes, export_evaluations
+
+def save_at(store, monkeypatch, username, created_at, **result):
+    monkeypatch.setattr(contract_store, "_now", lambda: created_at)
+    return store.save(username, {"word_count": 10, "contract_health": "Healthy", "summary": "s", **result})
+
+@pytest.fixture
+def seeded(store, monkeypatch):
+    # 25 evaluations, one per day from 2026-03-01, alternating between two users
+    for day in range(25):
+        save_at(store, monkeypatch, "ann" if day % 2 == 0 else "bob", f"2026-03-{day + 1:02d} 12:00:00",
+                clauses_found=["termination", "indemnity"])
+    return store
+
+def test_chunks_split_on_row_counts(seeded):
+    assert seeded.export_chunks(chunk_rows=10) == [(1, 10, 10), (11, 20, 10), (21, 25, 5)]
+    assert seeded.export_chunks(chunk_rows=25) == [(1, 25, 25)]
+    assert seeded.export_chunks(username="nobody") == []
+
+def test_filtered_chunks_count_only_matching_rows(seeded):
+    chunks = seeded.export_chunks(username="bob", chunk_rows=5)
+    assert chunks == [(2, 10, 5), (12, 20, 5), (22, 24, 2)]
+
+def test_chunks_cover_every_row_exactly_once(seeded):
+    exported = []
+    for first_id, last_id, rows in seeded.export_chunks(username="ann", chunk_rows=4):
+        chunk = [row["id"] for row in seeded.iter_evaluations("ann", first_id=first_id, last_id=last_id, batch_size=3)]
+        assert len(chunk) == rows
+        exported.extend(chunk)
+    assert exported == [row["id"] for row in seeded.iter_evaluations("ann")] == list(range(1, 26, 2))
+
+def test_date_filters_include_whole_days(store, monkeypatch):
+    save_at(store, monkeypatch, "ann", "2026-03-01 23:59:59")
+    inside = save_at(store, monkeypatch, "ann", "2026-03-02 00:00:00")
+    last = save_at(store, monkeypatch, "ann", "2026-03-03 23:59:59")
+    save_at(store, monkeypatch, "ann", "2026-03-04 00:00:00")
+    rows = store.iter_evaluations(since="2026-03-02", until="2026-03-03")
+    assert [row["id"] for row in rows] == [inside, last]
+    assert store.export_chunks(since="2026-03-02", until="2026-03-03") == [(inside, last, 2)]
+
+def test_csv_export_streams_in_batches(seeded, monkeypatch):
+    monkeypatch.setattr(evaluation_export, "EXPORT_BATCH_ROWS", 4)
+    target = io.BytesIO()
+    assert export_evaluations(target, "csv", store=seeded) == 25
+    rows = list(csv.DictReader(io.StringIO(target.getvalue().decode())))
+    assert [int(row["id"]) for row in rows] == list(range(1, 26))
+    assert rows[0]["clauses_found"] == "termination;indemnity"
+
+def test_jsonl_export_respects_chunk_bounds(seeded, monkeypatch):
+    monkeypatch.setattr(evaluation_export, "get_store", lambda: seeded)
+    data = export_chunk_bytes("jsonl", username="bob", since="2026-03-05", first_id=8, last_id=20)
+    records = [json.loads(line) for line in data.decode().splitlines()]
+    assert [record["id"] for record in records] == [8, 10, 12, 14, 16, 18, 20]
+    assert records[0]["clauses_found"] == ["termination", "indemnity"]
+
+def test_empty_export_still_writes_a_header(store):
+    target = io.BytesIO()
+    assert export_evaluations(target, "csv", store=store) == 0
+    assert target.getvalue().decode().strip() == ",".join(evaluation_export.EXPORT_COLUMNS)
+
+def test_unknown_format_is_rejected(store):
+    with pytest.raises(ValueError):
+        export_evaluations(io.BytesIO(), "xml", store=store)
+
+def test_parquet_export(seeded, tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "export.parquet")
+    assert export_evaluations(path, "parquet", username="ann", store=seeded) == 13
+    table = parquet.read_table(path)
+    assert table.column("id").to_pylist() == list(range(1, 26, 2))
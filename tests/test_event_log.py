@@ -0,0 +1,61 @@
+import sqlite3
+import pytest
+from event_log import EventLog
+
+class LockedStore:
+    # Fails every write; events passed in on_write are logged while the write is "in progress"
+    def __init__(self, event_log=None, on_write=()):
+        self.event_log = event_log
+        self.on_write = on_write
+
+    def record_events(self, events):
+        for name in self.on_write:
+            self.event_log.log("ann", name)
+        raise sqlite3.OperationalError("database is locked")
+
+def quiet_log(store, buffer_size=100):
+    event_log = EventLog(store, buffer_size=buffer_size)
+    event_log._writer = object()  # flushed by hand, no background thread
+    return event_log
+
+def buffered(event_log):
+    return [entry["event"] for entry in event_log._buffer]
+
+def test_flush_writes_buffered_events_in_order(store):
+    event_log = quiet_log(store)
+    event_log.log("ann", "login", "s1")
+    event_log.log("ann", "analysis", "s1", detail="lease.pdf")
+    assert store.count_events() == 0
+    assert event_log.flush() == 2
+    assert [event["event"] for event in reversed(store.list_events())] == ["login", "analysis"]
+    assert event_log.flush() == 0
+
+def test_failed_flush_puts_the_batch_back(store):
+    event_log = quiet_log(LockedStore())
+    event_log.log("ann", "login")
+    event_log.log("ann", "save")
+    with pytest.raises(sqlite3.OperationalError):
+        event_log.flush()
+    assert buffered(event_log) == ["login", "save"]
+    assert event_log.dropped == 0
+    event_log.store = store
+    assert event_log.flush() == 2
+    assert store.count_events() == 2
+
+def test_events_logged_during_a_failed_flush_stay_after_the_batch():
+    event_log = quiet_log(None)
+    event_log.store = LockedStore(event_log, on_write=["logout"])
+    event_log.log("ann", "login")
+    with pytest.raises(sqlite3.OperationalError):
+        event_log.flush()
+    assert buffered(event_log) == ["login", "logout"]
+
+def test_a_full_buffer_drops_the_batch_oldest_first():
+    event_log = quiet_log(None, buffer_size=4)
+    event_log.store = LockedStore(event_log, on_write=["save", "logout"])
+    for name in ("login", "analysis", "save"):
+        event_log.log("ann", name)
+    with pytest.raises(sqlite3.OperationalError):
+        event_log.flush()
+    assert buffered(event_log) == ["analysis", "save", "save", "logout"]
+    assert event_log.dropped == 1
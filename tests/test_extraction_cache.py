@@ -0,0 +1,59 @@
+import os
+from extraction_cache import ExtractionCache, cache_key
+
+# Each of these entries is 102 bytes once serialized
+ENTRY = ["x" * 98]
+MB = 1024 * 1024
+
+def test_memory_tier_evicts_the_least_recently_used(tmp_path):
+    cache = ExtractionCache(str(tmp_path), memory_budget_mb=250 / MB)
+    cache.put("a", ENTRY)
+    cache.put("b", ENTRY)
+    cache.get("a")
+    cache.put("c", ENTRY)
+    assert cache.stats()["memory_entries"] == 2
+    cache.get("a")
+    cache.get("b")
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"]) == (2, 1)
+
+def test_entries_larger_than_the_memory_budget_stay_on_disk(tmp_path):
+    cache = ExtractionCache(str(tmp_path), memory_budget_mb=50 / MB)
+    cache.put("a", ENTRY)
+    assert cache.stats()["memory_entries"] == 0
+    assert cache.get("a") == ENTRY
+    assert cache.stats()["disk_hits"] == 1
+
+def test_disk_tier_evicts_the_oldest_files_past_its_budget(tmp_path):
+    cache = ExtractionCache(str(tmp_path), disk_budget_mb=300 / MB)
+    cache.put("a", ENTRY)
+    cache.put("b", ENTRY)
+    os.utime(tmp_path / "a.json", (1000, 1000))
+    os.utime(tmp_path / "b.json", (2000, 2000))
+    cache.put("c", ENTRY)
+    assert sorted(os.listdir(tmp_path)) == ["b.json", "c.json"]
+    assert cache.stats()["disk_mb"] * MB == 204
+    # A restarted cache picks up what is already on disk
+    assert ExtractionCache(str(tmp_path)).stats()["disk_mb"] * MB == 204
+
+def test_counters_and_hit_rate(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    key = cache_key(b"%PDF-1.4 contract", "v1")
+    assert cache.get(key) is None
+    cache.put(key, ["page one"])
+    assert cache.get(key) == ["page one"]
+    assert ExtractionCache(str(tmp_path)).get(key) == ["page one"]
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 0, 1)
+    assert stats["hit_rate"] == 0.5
+
+def test_uncounted_lookups_leave_the_hit_rate_alone(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    cache.put("info", {"pages": 3})
+    cache.get("info", count=False)
+    cache.get("missing", count=False)
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"], stats["hit_rate"]) == (0, 0, 0, 0.0)
+
+def test_version_is_part_of_the_key():
+    assert cache_key(b"same bytes", "v1") != cache_key(b"same bytes", "v2")
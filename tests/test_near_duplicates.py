@@ -0,0 +1,88 @@
+import random
+from near_duplicates import (
+    LSH_BANDS, MinHasher, NUM_HASHES, SHINGLE_WORDS, SIMILARITY_THRESHOLD, band_buckets, pack_signature, similarity,
+    text_signature, unpack_signature
+)
+
+def contract(seed, words=600):
+    rng = random.Random(seed)
+    vocabulary = [f"term{index}" for index in range(2000)]
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+def shingles(text):
+    words = text.split()
+    return {tuple(words[index:index + SHINGLE_WORDS]) for index in range(len(words) - SHINGLE_WORDS + 1)}
+
+def jaccard(first, second):
+    first, second = shingles(first), shingles(second)
+    return len(first & second) / len(first | second)
+
+def shared_buckets(first, second):
+    return set(band_buckets(first)) & set(band_buckets(second))
+
+def edited(text, every):
+    words = text.split()
+    return " ".join("changed" if index % every == 0 else word for index, word in enumerate(words))
+
+def test_streamed_pages_give_the_whole_text_signature():
+    text = contract(1)
+    hasher = MinHasher()
+    for start in range(0, len(text), 97):  # cuts land mid-word
+        hasher.add_page(text[start:start + 97])
+    assert hasher.signature() == text_signature(text)
+
+def test_identical_texts_match_exactly():
+    text = contract(2)
+    assert similarity(text_signature(text), text_signature(text.upper())) == 1.0
+
+def test_estimate_tracks_true_similarity():
+    base = contract(3)
+    for every in (40, 15, 8):
+        other = edited(base, every)
+        assert abs(similarity(text_signature(base), text_signature(other)) - jaccard(base, other)) < 0.15
+
+def test_near_duplicates_pass_the_threshold_and_share_a_bucket():
+    base = contract(4)
+    other = edited(base, 100)
+    first, second = text_signature(base), text_signature(other)
+    assert jaccard(base, other) > SIMILARITY_THRESHOLD
+    assert similarity(first, second) >= SIMILARITY_THRESHOLD
+    assert shared_buckets(first, second)
+
+def test_unrelated_texts_stay_below_the_threshold_and_apart():
+    first, second = text_signature(contract(5)), text_signature(contract(6))
+    assert similarity(first, second) < 0.1
+    assert not shared_buckets(first, second)
+
+def test_short_texts_still_get_a_full_signature():
+    signature = text_signature("net 30")
+    assert len(signature) == NUM_HASHES
+    assert len(band_buckets(signature)) == LSH_BANDS
+    assert text_signature("") is None
+
+def test_signatures_round_trip_through_storage():
+    signature = text_signature(contract(7))
+    assert unpack_signature(pack_signature(signature)) == signature
+
+def test_store_finds_near_duplicates_only(store):
+    base = contract(8)
+    original = store.save("ann", {"summary": "a"}, text=base)
+    duplicate = store.save("bob", {"summary": "b"}, text=edited(base, 100))
+    store.save("cat", {"summary": "c"}, text=contract(9))
+    assert [match["id"] for match in store.find_similar(text_signature(base))] == [original, duplicate]
+    assert store.duplicate_clusters() == [{"ids": [original, duplicate], "users": ["ann", "bob"]}]
+
+def test_clusters_check_every_pair_in_a_shared_bucket(store):
+    # All three share only their first band, so the one bucket they meet in has A, the lowest
+    # id, first. B and C differ in one slot of every other band: similar, but never bucketed
+    # without A. Neither is similar to A.
+    rows = NUM_HASHES // LSH_BANDS
+    shared_band = list(range(1, rows + 1))
+    a = shared_band + [100 + slot for slot in range(NUM_HASHES - rows)]
+    b = shared_band + [500 + slot for slot in range(NUM_HASHES - rows)]
+    c = [value + 10_000 if slot >= rows and slot % rows == 0 else value for slot, value in enumerate(b)]
+    ids = [store.save(username, {"summary": username}) for username in ("ann", "bob", "cat")]
+    for evaluation_id, signature in zip(ids, (a, b, c)):
+        store._index_signature(evaluation_id, signature)
+    assert similarity(b, c) > 0.7 > similarity(a, b)
+    assert store.duplicate_clusters(threshold=0.7) == [{"ids": ids[1:], "users": ["bob", "cat"]}]
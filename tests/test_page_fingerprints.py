@@ -0,0 +1,71 @@
+import pytest
+
+import pdf_extraction
+from pdf_extraction import compare_page_fingerprints, iter_pdf_pages, pdf_page_fingerprints
+
+PAGES = ["Termination on notice.", "Payment is due within 30 days.", "Governed by the laws of Ontario."]
+
+def test_fingerprints_ignore_object_numbering(make_pdf):
+    assert pdf_page_fingerprints(make_pdf(PAGES)) == pdf_page_fingerprints(make_pdf(PAGES, padding=5))
+
+def test_only_the_edited_page_changes(make_pdf):
+    before = pdf_page_fingerprints(make_pdf(PAGES))
+    after = pdf_page_fingerprints(make_pdf([PAGES[0], "Payment is due within 60 days.", PAGES[2]]))
+    assert [first == second for first, second in zip(before, after)] == [True, False, True]
+    changes = compare_page_fingerprints(before, after)
+    assert (changes["unchanged"], changes["changed"], changes["added"], changes["removed"]) == (2, [2], [], [])
+
+def test_inserted_and_removed_pages(make_pdf):
+    before = pdf_page_fingerprints(make_pdf(PAGES))
+    after = pdf_page_fingerprints(make_pdf([PAGES[0], "A new schedule.", PAGES[2]] + ["An appendix."]))
+    changes = compare_page_fingerprints(before, after)
+    assert changes["changed"] == [2] and changes["added"] == [4]
+    assert compare_page_fingerprints(after, before)["removed"] == [4]
+
+def test_resources_are_part_of_the_fingerprint(make_pdf):
+    # Same content stream drawn with a different font can extract differently
+    plain = pdf_page_fingerprints(make_pdf(PAGES))
+    other_font = pdf_page_fingerprints(make_pdf(PAGES, base_font="Courier"))
+    assert not set(plain) & set(other_font)
+
+def test_known_pages_are_reused_without_extraction(make_pdf, monkeypatch):
+    previous = make_pdf(PAGES)
+    known = dict(zip(pdf_page_fingerprints(previous), ["kept 1", "kept 2", "kept 3"]))
+    extracted = []
+    original = pdf_extraction._extract_page
+    monkeypatch.setattr(pdf_extraction, "_extract_page", lambda page: extracted.append(page) or original(page))
+    revised = make_pdf([PAGES[0], "Payment is due within 60 days.", PAGES[2]])
+    texts = [text for _, _, text in iter_pdf_pages(revised, parallel=False, use_cache=False, known_pages=known)]
+    assert texts[0] == "kept 1" and texts[2] == "kept 3"
+    assert "60 days" in texts[1]
+    assert len(extracted) == 1
+
+def test_previous_version_is_found_among_the_uploaders_own_evaluations(make_pdf, store):
+    data = make_pdf(PAGES)
+    fingerprints = pdf_page_fingerprints(data)
+    texts = [text for _, _, text in iter_pdf_pages(data, parallel=False, use_cache=False)]
+    saved = store.save("ann", {"summary": "v1"}, pages=list(zip(fingerprints, texts)))
+
+    revised = pdf_page_fingerprints(make_pdf([PAGES[0], "Payment is due within 60 days.", PAGES[2]]))
+    previous = store.find_previous_version(revised, "ann")
+    assert previous["id"] == saved
+    assert previous["fingerprints"] == fingerprints
+    assert previous["pages"] == {fingerprints[0]: texts[0], fingerprints[2]: texts[2]}
+    assert store.find_previous_version(revised, "ann", with_pages=False)["pages"] == {}
+    assert store.find_previous_version(revised, "bob") is None
+
+def test_too_few_shared_pages_is_not_a_previous_version(make_pdf, store):
+    fingerprints = pdf_page_fingerprints(make_pdf(PAGES))
+    store.save("ann", {"summary": "v1"}, pages=list(zip(fingerprints, PAGES)))
+    unrelated = pdf_page_fingerprints(make_pdf([PAGES[0], "Other", "Entirely", "Different", "Pages"]))
+    assert store.find_previous_version(unrelated, "ann") is None
+
+def test_known_fingerprints_are_not_computed_again(make_pdf, monkeypatch):
+    previous = make_pdf(PAGES)
+    known = dict(zip(pdf_page_fingerprints(previous), ["kept 1", "kept 2", "kept 3"]))
+    revised = make_pdf([PAGES[0], "Payment is due within 60 days.", PAGES[2]])
+    fingerprints = pdf_page_fingerprints(revised)
+    monkeypatch.setattr(pdf_extraction, "page_fingerprint", lambda page, memo=None: pytest.fail("page hashed twice"))
+    texts = [text for _, _, text in iter_pdf_pages(revised, parallel=False, use_cache=False,
+                                                   known_pages=known, fingerprints=fingerprints)]
+    assert texts[0] == "kept 1" and "60 days" in texts[1] and texts[2] == "kept 3"
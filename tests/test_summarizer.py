@@ -0,0 +1,55 @@
+from contract_analysis import analyze_contract, analyze_pages
+from summarizer import SentenceSampler, summarize
+
+SENTENCES = [
+    "The supplier shall deliver the goods to the customer within thirty days.",
+    "The customer shall pay the supplier for the goods within sixty days.",
+    "Payment for the goods is due to the supplier after the customer accepts delivery.",
+    "Lunch will be provided on the second floor every Friday afternoon.",
+]
+
+def test_sampler_joins_sentences_split_across_pages():
+    sampler = SentenceSampler()
+    sampler.add_page("The supplier shall deliver the goods within thirty")
+    sampler.add_page(" days of the order. Short one. The customer shall pay for the goods on delivery")
+    assert sampler.finish() == [
+        "The supplier shall deliver the goods within thirty days of the order.",
+        "The customer shall pay for the goods on delivery",
+    ]
+
+def test_sampler_keeps_a_bounded_sample_in_document_order():
+    sampler = SentenceSampler(capacity=10)
+    sampler.add_page(" ".join(f"Clause number {index} applies to every order placed." for index in range(500)))
+    sentences = sampler.finish()
+    assert len(sentences) == 10
+    positions = [int(sentence.split()[2]) for sentence in sentences]
+    assert positions == sorted(positions)
+    # Deterministic, so the same document always gets the same summary
+    again = SentenceSampler(capacity=10)
+    again.add_page(" ".join(f"Clause number {index} applies to every order placed." for index in range(500)))
+    assert again.finish() == sentences
+
+def test_summary_prefers_central_sentences_in_document_order():
+    summary = summarize(SENTENCES, max_chars=150)
+    chosen = [sentence for sentence in SENTENCES if sentence in summary]
+    assert len(chosen) == 2 and SENTENCES[3] not in chosen
+    assert summary == " ".join(chosen)
+
+def test_summary_respects_the_length_limit():
+    assert len(summarize(SENTENCES, max_chars=40)) <= 40
+
+def test_repeated_boilerplate_is_used_once():
+    boilerplate = "The supplier shall deliver the goods to the customer on time."
+    summary = summarize([boilerplate] * 5 + SENTENCES[1:3], max_chars=300)
+    assert summary.count(boilerplate) == 1
+
+def test_no_summary_for_too_little_text_or_an_exhausted_budget():
+    assert summarize(SENTENCES[:1], max_chars=300) is None
+    assert summarize(SENTENCES, max_chars=300, budget_seconds=-1) is None
+
+def test_analyzer_falls_back_to_the_prefix_summary():
+    assert analyze_contract("Too short to rank.")["summary"] == "Too short to rank."
+
+def test_streamed_pages_summarize_like_the_joined_text():
+    pages = [" ".join(SENTENCES[:2]) + " ", " ".join(SENTENCES[2:])]
+    assert analyze_pages(pages)["summary"] == analyze_contract("".join(pages))["summary"]
@@ -0,0 +1,34 @@
+import sqlite3
+import time
+from telemetry import Telemetry
+
+def insert_spans(telemetry, spans):
+    connection = sqlite3.connect(telemetry.path)
+    with connection:
+        connection.executemany("INSERT INTO spans (stage, started_at, duration_ms) VALUES (?, ?, ?)", spans)
+    connection.close()
+
+def test_stage_summary_skips_stages_outside_the_window(tmp_path):
+    telemetry = Telemetry(str(tmp_path / "telemetry.db"))
+    now = time.time()
+    week_ago = now - 7 * 86400
+    insert_spans(telemetry, [
+        ("analysis", now - 60, 40.0), ("analysis", week_ago, 900.0),
+        ("upload", now - 60, 2.0), ("custom", now - 60, 1.0),
+        ("store_read", week_ago, 3.0)
+    ])
+    summary = telemetry.stage_summary(hours=24)
+    assert [(row["stage"], row["count"], row["sum_ms"]) for row in summary] == [
+        ("upload", 1, 2.0), ("analysis", 1, 40.0), ("custom", 1, 1.0)
+    ]
+
+def test_stage_names_come_from_the_index(tmp_path):
+    telemetry = Telemetry(str(tmp_path / "telemetry.db"))
+    statements = []
+    connection = sqlite3.connect(telemetry.path)
+    connection.set_trace_callback(statements.append)
+    telemetry._connect = lambda: connection
+    telemetry.stage_summary()
+    listing = statements[0]
+    plan = " ".join(row[3] for row in sqlite3.connect(telemetry.path).execute("EXPLAIN QUERY PLAN " + listing))
+    assert "SCAN spans" not in plan and "idx_spans_stage_started" in plan
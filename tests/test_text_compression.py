@@ -0,0 +1,73 @@
+import random
+import sqlite3
+import contract_store
+from text_compression import compress_text, decompress_text, train_dictionary
+
+BOILERPLATE = [
+    "This Agreement shall be governed by and construed in accordance with the laws of the Province of Ontario.",
+    "Either party may terminate this Agreement upon thirty days written notice to the other party.",
+    "The Receiving Party shall keep confidential all Confidential Information disclosed by the Disclosing Party.",
+    "Invoices are payable within thirty days of receipt; late payment accrues interest at one percent per month.",
+]
+
+def contract(seed):
+    rng = random.Random(seed)
+    own = " ".join(f"Clause {rng.randrange(10_000)} covers item {rng.randrange(10_000)}." for _ in range(20))
+    return "\n".join(BOILERPLATE) + "\n" + own + " Résumé of fees: €1,200."
+
+def test_round_trip_with_and_without_a_dictionary():
+    texts = [contract(seed) for seed in range(10)]
+    dictionary = train_dictionary(texts)
+    assert dictionary
+    for text in texts:
+        assert decompress_text(compress_text(text)) == text
+        assert decompress_text(compress_text(text, dictionary), dictionary) == text
+    assert decompress_text(None) is None
+
+def test_dictionary_keeps_shared_segments_and_shrinks_output():
+    texts = [contract(seed) for seed in range(10)]
+    dictionary = train_dictionary(texts)
+    assert BOILERPLATE[0].encode() in dictionary
+    assert b"Clause" not in dictionary  # segments seen in only one document are left out
+    fresh = contract(99)
+    assert len(compress_text(fresh, dictionary)) < len(compress_text(fresh))
+
+def test_dictionary_respects_its_size():
+    assert len(train_dictionary([contract(seed) for seed in range(10)], size=200)) <= 200
+
+def test_store_recompresses_onto_a_trained_dictionary(store):
+    texts = {store.save("ann", {"summary": f"contract {seed}"}, text=contract(seed)): contract(seed) for seed in range(6)}
+    assert store.train_text_dictionary(min_documents=10) is None
+    trained = store.train_text_dictionary(min_documents=5)
+    assert trained["recompressed"] == 6
+    later = store.save("ann", {"summary": "after training"}, text=contract(50))
+    texts[later] = contract(50)
+    assert {evaluation_id: store.text(evaluation_id) for evaluation_id in texts} == texts
+    storage = store.text_storage()
+    assert storage["documents"] == 7 and storage["dictionary_id"] == trained["dictionary_id"]
+    assert storage["compressed_bytes"] < storage["raw_bytes"]
+
+def test_search_index_reads_without_any_custom_sql_function(store):
+    evaluation_id = store.save("ann", {"summary": "lease"}, text=contract(1))
+    store.train_text_dictionary(min_documents=1)
+    plain = sqlite3.connect(store.path)
+    assert plain.execute("SELECT rowid FROM evaluation_search WHERE evaluation_search MATCH 'ontario'").fetchall() == [(evaluation_id,)]
+    [result] = store.search("ontario")
+    assert result["id"] == evaluation_id and "**Ontario.**" in result["snippet"]
+
+def test_upgrade_moves_search_text_into_compressed_storage(tmp_path, monkeypatch):
+    path = str(tmp_path / "old.db")
+    monkeypatch.setattr(contract_store, "MIGRATIONS", contract_store.MIGRATIONS[:8])
+    old = contract_store.ContractStore(path, legacy_dir=None)
+    old.connection.execute(
+        "INSERT INTO evaluations (username, created_at, word_count, contract_health, body) "
+        "VALUES ('ann', '2026-01-05 09:00:00', 4, 'Healthy', '{\"summary\": \"Lease\"}')"
+    )
+    old.connection.execute("INSERT INTO evaluation_search (rowid, summary, text) VALUES (1, 'Lease', 'Rent is payable monthly.')")
+    old.connection.close()
+    monkeypatch.undo()
+
+    store = contract_store.ContractStore(path, legacy_dir=None)
+    assert store.text(1) == "Rent is payable monthly."
+    assert [row["id"] for row in store.search("rent")] == [1]
+    assert [row["id"] for row in store.search("lease")] == [1]
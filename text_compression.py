@@ -0,0 +1,55 @@
+import os
+import re
+import zlib
+from collections import Counter
+
+# ------------------------------
+# Compression Settings
+# ------------------------------
+# zlib only looks back 32 KB, so a larger preset dictionary would never be referenced
+DICTIONARY_SIZE = 32 * 1024
+# Training samples at most this many stored texts
+DICTIONARY_SAMPLE_DOCUMENTS = int(os.environ.get("CONTRACT_DICTIONARY_SAMPLE_DOCUMENTS", "500"))
+# A dictionary is only worth training once there is a corpus to learn boilerplate from
+DICTIONARY_MIN_DOCUMENTS = int(os.environ.get("CONTRACT_DICTIONARY_MIN_DOCUMENTS", "20"))
+COMPRESSION_LEVEL = 9
+MIN_SEGMENT_CHARS = 12
+
+# Sentences and lines; boilerplate repeats at this granularity across contracts
+SEGMENT = re.compile(r"[^.;:\n]+[.;:\n]?")
+
+# ------------------------------
+# Dictionary Training
+# ------------------------------
+def train_dictionary(samples, size=DICTIONARY_SIZE):
+    # Keeps the segments that recur across the most documents, weighted by length. zlib
+    # encodes matches near the end of the dictionary with shorter distances, so the most
+    # valuable segments go last.
+    documents = Counter()
+    for text in samples:
+        documents.update({segment.strip() for segment in SEGMENT.findall(text) if len(segment.strip()) >= MIN_SEGMENT_CHARS})
+    ranked = sorted(
+        (segment for segment, count in documents.items() if count > 1),
+        key=lambda segment: (documents[segment] * len(segment), segment),
+        reverse=True,
+    )
+    chosen, used = [], 0
+    for segment in ranked:
+        data = segment.encode() + b" "
+        if used + len(data) <= size:
+            chosen.append(data)
+            used += len(data)
+    return b"".join(reversed(chosen))
+
+# ------------------------------
+# Compress and Decompress
+# ------------------------------
+def compress_text(text, dictionary=None):
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=dictionary) if dictionary else zlib.compressobj(COMPRESSION_LEVEL)
+    return compressor.compress(text.encode()) + compressor.flush()
+
+def decompress_text(blob, dictionary=None):
+    if blob is None:
+        return None
+    decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+    return (decompressor.decompress(blob) + decompressor.flush()).decode()